@@ -56,7 +56,8 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
-    from app.database import engine
+    # Bulk/maintenance pool: no statement_timeout, so long index builds can finish
+    from app.database import import_engine as engine
 
     with engine.connect() as connection:
         context.configure(
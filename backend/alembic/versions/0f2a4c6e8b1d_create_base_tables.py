@@ -0,0 +1,61 @@
+"""
+create products, webhooks and import_jobs
+
+Revision ID: 0f2a4c6e8b1d
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0f2a4c6e8b1d'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# The schema the API used to create with create_all at import. IF NOT EXISTS keeps it a
+# no-op on databases that were set up that way; later revisions add the rest.
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS products (
+            id SERIAL PRIMARY KEY,
+            sku VARCHAR(128) NOT NULL,
+            sku_lower VARCHAR(128) NOT NULL,
+            name VARCHAR(512) NOT NULL,
+            description TEXT,
+            price_cents INTEGER,
+            active BOOLEAN,
+            created_at TIMESTAMP WITH TIME ZONE,
+            updated_at TIMESTAMP WITH TIME ZONE,
+            CONSTRAINT uq_products_sku_lower UNIQUE (sku_lower)
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_products_sku_lower ON products (sku_lower)")
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS webhooks (
+            id SERIAL PRIMARY KEY,
+            url VARCHAR(1024) NOT NULL,
+            event VARCHAR(64) NOT NULL,
+            enabled BOOLEAN,
+            created_at TIMESTAMP WITH TIME ZONE
+        )
+    """)
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS import_jobs (
+            id SERIAL PRIMARY KEY,
+            status VARCHAR(32) NOT NULL,
+            total_rows INTEGER,
+            processed_rows INTEGER,
+            error TEXT,
+            created_at TIMESTAMP WITH TIME ZONE,
+            updated_at TIMESTAMP WITH TIME ZONE
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS import_jobs")
+    op.execute("DROP TABLE IF EXISTS webhooks")
+    op.execute("DROP TABLE IF EXISTS products")
@@ -1,7 +1,7 @@
 """add file_path and original_filename to import_jobs
 
 Revision ID: 3b8c8f6b0a9e
-Revises:
+Revises: 0f2a4c6e8b1d
 Create Date: 2025-11-13
 """
 
@@ -10,7 +10,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision = '3b8c8f6b0a9e'
-down_revision = None
+down_revision = '0f2a4c6e8b1d'
 branch_labels = None
 depends_on = None
 
@@ -0,0 +1,40 @@
+"""
+add webhook_deliveries
+
+Revision ID: a4c6e8f0b2d7
+Revises: f3a1b5c7d0e6
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a4c6e8f0b2d7'
+down_revision = 'f3a1b5c7d0e6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS webhook_deliveries (
+            id BIGSERIAL PRIMARY KEY,
+            webhook_id INTEGER,
+            delivery_id VARCHAR(64) NOT NULL,
+            url VARCHAR(1024) NOT NULL,
+            event VARCHAR(64) NOT NULL,
+            attempt INTEGER NOT NULL DEFAULT 1,
+            status VARCHAR(16) NOT NULL,
+            http_status INTEGER,
+            duration_ms INTEGER,
+            error TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_webhook_deliveries_webhook_id ON webhook_deliveries (webhook_id, id)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_webhook_deliveries_delivery_id ON webhook_deliveries (delivery_id)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_webhook_deliveries_created_at ON webhook_deliveries (created_at)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS webhook_deliveries")
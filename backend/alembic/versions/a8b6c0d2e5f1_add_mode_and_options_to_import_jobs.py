@@ -0,0 +1,29 @@
+"""
+add mode and options to import_jobs
+
+Revision ID: a8b6c0d2e5f1
+Revises: f7a5b9c1d4e0
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a8b6c0d2e5f1'
+down_revision = 'f7a5b9c1d4e0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Use raw SQL for IF NOT EXISTS to be idempotent across environments
+    op.execute("""
+        ALTER TABLE import_jobs
+        ADD COLUMN IF NOT EXISTS mode VARCHAR(16) NOT NULL DEFAULT 'upsert',
+        ADD COLUMN IF NOT EXISTS options JSONB
+    """)
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS options")
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS mode")
@@ -0,0 +1,33 @@
+"""
+add cache_generations
+
+Revision ID: b5d7f9a1c3e8
+Revises: a4c6e8f0b2d7
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b5d7f9a1c3e8'
+down_revision = 'a4c6e8f0b2d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS cache_generations (
+            name VARCHAR(32) PRIMARY KEY,
+            value BIGINT NOT NULL DEFAULT 0
+        )
+    """)
+    op.execute("""
+        INSERT INTO cache_generations (name, value)
+        VALUES ('catalog', 0), ('jobs', 0), ('webhooks', 0)
+        ON CONFLICT (name) DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS cache_generations")
@@ -0,0 +1,40 @@
+"""
+add admission columns to import_jobs
+
+Revision ID: b9c7d1e3f6a2
+Revises: a8b6c0d2e5f1
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b9c7d1e3f6a2'
+down_revision = 'a8b6c0d2e5f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Use raw SQL for IF NOT EXISTS to be idempotent across environments
+    op.execute("""
+        ALTER TABLE import_jobs
+        ADD COLUMN IF NOT EXISTS uploader VARCHAR(128),
+        ADD COLUMN IF NOT EXISTS wait_reason VARCHAR(256),
+        ADD COLUMN IF NOT EXISTS sku_min VARCHAR(128),
+        ADD COLUMN IF NOT EXISTS sku_max VARCHAR(128),
+        ADD COLUMN IF NOT EXISTS sku_filter BYTEA,
+        ADD COLUMN IF NOT EXISTS started_at TIMESTAMPTZ
+    """)
+    # Admission and queue estimates only look at queued/running jobs
+    op.execute("CREATE INDEX IF NOT EXISTS ix_import_jobs_active ON import_jobs (id) WHERE status IN ('queued', 'running')")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_import_jobs_active")
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS started_at")
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS sku_filter")
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS sku_max")
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS sku_min")
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS wait_reason")
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS uploader")
@@ -0,0 +1,29 @@
+"""
+add control and checkpoint to import_jobs
+
+Revision ID: c0d8e2f4a7b3
+Revises: b9c7d1e3f6a2
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c0d8e2f4a7b3'
+down_revision = 'b9c7d1e3f6a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Use raw SQL for IF NOT EXISTS to be idempotent across environments
+    op.execute("""
+        ALTER TABLE import_jobs
+        ADD COLUMN IF NOT EXISTS control VARCHAR(16),
+        ADD COLUMN IF NOT EXISTS checkpoint JSONB
+    """)
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS checkpoint")
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS control")
@@ -0,0 +1,27 @@
+"""
+add metrics to import_jobs
+
+Revision ID: c4d2e6f8a1b7
+Revises: b3c1a1d2e3f4
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c4d2e6f8a1b7'
+down_revision = 'b3c1a1d2e3f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Use raw SQL for IF NOT EXISTS to be idempotent across environments
+    op.execute("""
+        ALTER TABLE import_jobs
+        ADD COLUMN IF NOT EXISTS metrics JSONB
+    """)
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS metrics")
@@ -0,0 +1,61 @@
+"""
+drop the duplicate sku_lower index; undo hash partitioning on downgrade
+
+Partitioning itself is an explicit step (`python -m app.partitions N`, see
+app/partitions.py), so upgrading always yields the same schema. Earlier
+versions of this revision partitioned here; downgrade inspects the catalog and
+turns a partitioned products back into one table either way.
+
+Revision ID: d1e9f3a5b8c4
+Revises: c0d8e2f4a7b3
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd1e9f3a5b8c4'
+down_revision = 'c0d8e2f4a7b3'
+branch_labels = None
+depends_on = None
+
+
+def _is_partitioned(conn) -> bool:
+    return conn.execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'products'::regclass"
+    )).scalar() is not None
+
+
+def _unpartition_products(conn):
+    """Copy a hash-partitioned products into one plain table and swap it in."""
+    # Plain indexes (trigram search etc.) are recreated from their definitions once the data is in
+    indexes = conn.execute(sa.text(
+        "SELECT pg_get_indexdef(x.indexrelid) FROM pg_index x "
+        "WHERE x.indrelid = 'products'::regclass "
+        "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)"
+    )).scalars().all()
+    sequence = conn.execute(sa.text("SELECT pg_get_serial_sequence('products', 'id')")).scalar()
+    op.execute("LOCK TABLE products IN EXCLUSIVE MODE")
+    op.execute("CREATE TABLE products_rebuild (LIKE products INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO products_rebuild SELECT * FROM products")
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY products_rebuild.id")
+    op.execute("DROP TABLE products")
+    op.execute("ALTER TABLE products_rebuild RENAME TO products")
+    op.execute("ALTER TABLE products ADD CONSTRAINT products_pkey PRIMARY KEY (id)")
+    op.execute("ALTER TABLE products ADD CONSTRAINT uq_products_sku_lower UNIQUE (sku_lower)")
+    for definition in indexes:
+        op.execute(definition)
+    op.execute("ANALYZE products")
+
+
+def upgrade() -> None:
+    # Duplicate of the index behind uq_products_sku_lower
+    op.execute("DROP INDEX IF EXISTS ix_products_sku_lower")
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if _is_partitioned(conn):
+        _unpartition_products(conn)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_products_sku_lower ON products (sku_lower)")
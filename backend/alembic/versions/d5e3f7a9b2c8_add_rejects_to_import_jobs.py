@@ -0,0 +1,29 @@
+"""
+add rejected_rows and rejects_path to import_jobs
+
+Revision ID: d5e3f7a9b2c8
+Revises: c4d2e6f8a1b7
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd5e3f7a9b2c8'
+down_revision = 'c4d2e6f8a1b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Use raw SQL for IF NOT EXISTS to be idempotent across environments
+    op.execute("""
+        ALTER TABLE import_jobs
+        ADD COLUMN IF NOT EXISTS rejected_rows INTEGER DEFAULT 0,
+        ADD COLUMN IF NOT EXISTS rejects_path VARCHAR(1024)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS rejects_path")
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS rejected_rows")
@@ -0,0 +1,28 @@
+"""
+add attributes to products
+
+Revision ID: e2f0a4b6c9d5
+Revises: d1e9f3a5b8c4
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e2f0a4b6c9d5'
+down_revision = 'd1e9f3a5b8c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Use raw SQL for IF NOT EXISTS to be idempotent across environments
+    op.execute("ALTER TABLE products ADD COLUMN IF NOT EXISTS attributes JSONB")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_products_attributes ON products USING gin (attributes jsonb_path_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_products_attributes")
+    op.execute("ALTER TABLE products DROP COLUMN IF EXISTS attributes")
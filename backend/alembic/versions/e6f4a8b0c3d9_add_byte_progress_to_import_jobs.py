@@ -0,0 +1,29 @@
+"""
+add total_bytes and processed_bytes to import_jobs
+
+Revision ID: e6f4a8b0c3d9
+Revises: d5e3f7a9b2c8
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e6f4a8b0c3d9'
+down_revision = 'd5e3f7a9b2c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Use raw SQL for IF NOT EXISTS to be idempotent across environments
+    op.execute("""
+        ALTER TABLE import_jobs
+        ADD COLUMN IF NOT EXISTS total_bytes BIGINT,
+        ADD COLUMN IF NOT EXISTS processed_bytes BIGINT DEFAULT 0
+    """)
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS processed_bytes")
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS total_bytes")
@@ -0,0 +1,80 @@
+"""
+trigram search indexes on products name and description
+
+Revision ID: f3a1b5c7d0e6
+Revises: e2f0a4b6c9d5
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f3a1b5c7d0e6'
+down_revision = 'e2f0a4b6c9d5'
+branch_labels = None
+depends_on = None
+
+# index name -> column; GIN trigram indexes serve the ILIKE search in list_products
+INDEXES = {
+    "idx_products_name_trgm": "name",
+    "idx_products_description_trgm": "description",
+}
+
+
+def _drop_if_invalid(conn, name: str):
+    # A failed CONCURRENTLY build leaves an invalid index behind that IF NOT EXISTS would keep
+    invalid = conn.execute(sa.text(
+        "SELECT 1 FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid "
+        "WHERE i.relname = :name AND i.relkind = 'i' AND NOT x.indisvalid"
+    ), {"name": name}).scalar()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def _is_valid(conn, name: str) -> bool:
+    return bool(conn.execute(sa.text(
+        "SELECT x.indisvalid FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid WHERE i.relname = :name"
+    ), {"name": name}).scalar())
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if conn.execute(sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).scalar() is None:
+        print("pg_trgm is not available; skipping trigram search indexes")
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    partitions = conn.execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'products'::regclass ORDER BY c.relname"
+    )).scalars().all()
+    # CONCURRENTLY can't run in a transaction, and builds without blocking imports and API writes
+    with op.get_context().autocommit_block():
+        for name, column in INDEXES.items():
+            if not partitions:
+                _drop_if_invalid(conn, name)
+                op.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON products USING gin ({column} gin_trgm_ops)"
+                )
+                continue
+            if _is_valid(conn, name):
+                continue
+            # Partitioned tables don't take CONCURRENTLY: define the parent on its own, then build
+            # each partition's index concurrently and attach it. The parent is valid once all are.
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY products USING gin ({column} gin_trgm_ops)")
+            for partition in partitions:
+                child = f"{partition}_{column}_trgm"
+                _drop_if_invalid(conn, child)
+                op.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} USING gin ({column} gin_trgm_ops)"
+                )
+                attached = conn.execute(sa.text(
+                    "SELECT 1 FROM pg_inherits WHERE inhrelid = CAST(:child AS regclass) "
+                    "AND inhparent = CAST(:name AS regclass)"
+                ), {"child": child, "name": name}).scalar()
+                if not attached:
+                    op.execute(f"ALTER INDEX {name} ATTACH PARTITION {child}")
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
@@ -0,0 +1,31 @@
+"""
+add content_sha256 and duplicate_of to import_jobs
+
+Revision ID: f7a5b9c1d4e0
+Revises: e6f4a8b0c3d9
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f7a5b9c1d4e0'
+down_revision = 'e6f4a8b0c3d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Use raw SQL for IF NOT EXISTS to be idempotent across environments
+    op.execute("""
+        ALTER TABLE import_jobs
+        ADD COLUMN IF NOT EXISTS content_sha256 VARCHAR(64),
+        ADD COLUMN IF NOT EXISTS duplicate_of INTEGER
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_import_jobs_content_sha256 ON import_jobs (content_sha256)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_import_jobs_content_sha256")
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS duplicate_of")
+    op.execute("ALTER TABLE import_jobs DROP COLUMN IF EXISTS content_sha256")
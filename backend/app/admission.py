@@ -0,0 +1,173 @@
+# app/admission.py
+"""
+Admission control for imports.
+
+Celery hands import messages to whichever worker is free; this module decides
+whether a job may actually start. Before touching `products` a job must fit:
+
+  - IMPORT_MAX_CONCURRENT running imports overall
+  - IMPORT_MAX_CONCURRENT_PER_UPLOADER running imports per uploader
+  - no running (or earlier queued) job whose SKU set overlaps its own, so
+    concurrent upserts never fight over the same `sku_lower` rows
+
+A job's SKU set is summarized once, by the pass that counts its rows, as a
+SkuProfile: the min/max `sku_lower` plus a fixed-size hash bitmap. Two
+profiles overlap only if both their ranges and their bitmaps intersect, so
+feeds with disjoint SKU prefixes (or few SKUs) run side by side while a
+false positive only ever serializes two jobs. Delta and replace imports
+overlap every other job (they may deactivate or remove any SKU).
+
+The decision runs under a transaction-level advisory lock, so two workers
+can't admit conflicting jobs at the same moment. A job that doesn't fit
+records why in `wait_reason` and is re-queued. Running jobs of crashed workers
+stop counting once they go IMPORT_STALE_SECONDS without a progress write.
+"""
+import heapq
+import zlib
+from datetime import datetime, timezone
+
+from .config import settings
+from .validation import SKU_MAX_LENGTH
+
+# pg_advisory_xact_lock key serializing admission decisions
+ADMISSION_LOCK_KEY = 0x61646D74
+SKU_FILTER_BITS = 1 << 16
+
+_PEERS_SQL = """
+SELECT id, status, uploader, mode, sku_min, sku_max, sku_filter
+FROM import_jobs
+WHERE id <> %s
+  AND (
+    (status = 'running' AND updated_at > CURRENT_TIMESTAMP - make_interval(secs => %s))
+    OR (status = 'queued' AND id < %s AND sku_filter IS NOT NULL
+        AND updated_at > CURRENT_TIMESTAMP - make_interval(secs => %s))
+  )
+ORDER BY id
+"""
+
+
+class SkuProfile:
+    """Range and hash bitmap of the (lowercased) SKUs in one feed."""
+
+    def __init__(self, sku_min: str | None = None, sku_max: str | None = None, sku_filter: bytes | None = None):
+        self.sku_min = sku_min
+        self.sku_max = sku_max
+        self.bits = bytearray(sku_filter or bytes(SKU_FILTER_BITS // 8))
+
+    def add(self, sku: str):
+        key = sku.lower()
+        if not key or len(key) > SKU_MAX_LENGTH:
+            return
+        if self.sku_min is None or key < self.sku_min:
+            self.sku_min = key
+        if self.sku_max is None or key > self.sku_max:
+            self.sku_max = key
+        bit = zlib.crc32(key.encode("utf-8")) % SKU_FILTER_BITS
+        self.bits[bit >> 3] |= 1 << (bit & 7)
+
+    def fields(self) -> dict:
+        return {"sku_min": self.sku_min, "sku_max": self.sku_max, "sku_filter": bytes(self.bits)}
+
+
+def overlaps(a: dict, b: dict) -> bool:
+    """Whether two jobs (mappings with mode/sku_min/sku_max/sku_filter) may write the same SKUs."""
+    if a["mode"] in ("delta", "replace") or b["mode"] in ("delta", "replace"):
+        return True
+    if a["sku_min"] is None or b["sku_min"] is None:
+        return False  # a feed without SKUs writes nothing
+    if a["sku_max"] < b["sku_min"] or b["sku_max"] < a["sku_min"]:
+        return False
+    return bool(int.from_bytes(bytes(a["sku_filter"]), "big") & int.from_bytes(bytes(b["sku_filter"]), "big"))
+
+
+def admit(conn, cur, job: dict) -> str | None:
+    """
+    Mark `job` running if it fits, else record why it has to wait. Returns the
+    wait reason (None = admitted). Commits either way.
+    """
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (ADMISSION_LOCK_KEY,))
+    # A waiting job re-checks every LIMIT_RETRY_SECONDS; one that stopped doing so (canceled, lost) loses its place
+    queued_window = max(settings.LIMIT_RETRY_SECONDS * 6, 30)
+    cur.execute(_PEERS_SQL, (job["id"], settings.IMPORT_STALE_SECONDS, job["id"], queued_window))
+    columns = [d[0] for d in cur.description]
+    peers = [dict(zip(columns, row)) for row in cur.fetchall()]
+    running = [p for p in peers if p["status"] == "running"]
+    reason = None
+    if settings.IMPORT_MAX_CONCURRENT and len(running) >= settings.IMPORT_MAX_CONCURRENT:
+        reason = f"{len(running)} imports running (limit {settings.IMPORT_MAX_CONCURRENT})"
+    elif settings.IMPORT_MAX_CONCURRENT_PER_UPLOADER and job["uploader"] and (
+        sum(1 for p in running if p["uploader"] == job["uploader"]) >= settings.IMPORT_MAX_CONCURRENT_PER_UPLOADER
+    ):
+        reason = f"uploader limit reached ({settings.IMPORT_MAX_CONCURRENT_PER_UPLOADER} running)"
+    else:
+        # Running jobs first, then earlier queued ones: overlapping feeds start in upload order
+        for peer in running + [p for p in peers if p["status"] == "queued"]:
+            if overlaps(job, peer):
+                reason = f"SKUs overlap import #{peer['id']} ({peer['status']})"
+                break
+    if reason is None:
+        cur.execute(
+            "UPDATE import_jobs SET status = 'running', wait_reason = NULL, started_at = CURRENT_TIMESTAMP, "
+            "updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+            (job["id"],),
+        )
+    else:
+        # Also refreshes updated_at, which keeps a waiting job's place ahead of later overlapping ones
+        cur.execute(
+            "UPDATE import_jobs SET wait_reason = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+            (reason, job["id"]),
+        )
+    conn.commit()
+    return reason
+
+
+def _seconds_since(ts, now: datetime) -> float:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return max((now - ts).total_seconds(), 0.0)
+
+
+def throughput(recent: list) -> float | None:
+    """Bytes per second over recently completed imports (mappings with total_bytes, started_at, updated_at)."""
+    nbytes = seconds = 0.0
+    for r in recent:
+        if r["total_bytes"] and r["started_at"] and r["updated_at"]:
+            nbytes += r["total_bytes"]
+            seconds += max((r["updated_at"] - r["started_at"]).total_seconds(), 0.0)
+    return nbytes / seconds if nbytes and seconds else None
+
+
+def queue_estimates(active: list, bytes_per_second: float | None, now: datetime | None = None) -> dict:
+    """
+    {job_id: {"queue_position", "eta_seconds"}} for queued and running jobs.
+
+    Position counts queued jobs in upload order. ETA (seconds until complete)
+    plays the queue out over IMPORT_MAX_CONCURRENT slots: running jobs finish at
+    their own observed rate, queued ones take the next free slot at the recent
+    average rate. Overlap and per-uploader waits aren't modelled, so it's a lower bound.
+    """
+    now = now or datetime.now(timezone.utc)
+    slots = []
+    out = {}
+    for job in active:
+        if job["status"] != "running":
+            continue
+        remaining = max((job["total_bytes"] or 0) - (job["processed_bytes"] or 0), 0)
+        elapsed = _seconds_since(job["started_at"], now) if job["started_at"] else 0.0
+        rate = job["processed_bytes"] / elapsed if job["processed_bytes"] and elapsed else bytes_per_second
+        eta = remaining / rate if rate else None
+        out[job["id"]] = {"queue_position": 0, "eta_seconds": None if eta is None else round(eta)}
+        slots.append(eta or 0.0)
+    capacity = settings.IMPORT_MAX_CONCURRENT or max(len(slots), 1)
+    heapq.heapify(slots)
+    while len(slots) < capacity:
+        heapq.heappush(slots, 0.0)
+    queued = sorted((j for j in active if j["status"] == "queued"), key=lambda j: j["id"])
+    for position, job in enumerate(queued, 1):
+        eta = None
+        if bytes_per_second:
+            finish = heapq.heappop(slots) + (job["total_bytes"] or 0) / bytes_per_second
+            heapq.heappush(slots, finish)
+            eta = round(finish)
+        out[job["id"]] = {"queue_position": position, "eta_seconds": eta}
+    return out
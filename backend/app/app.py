@@ -1,17 +1,49 @@
-from fastapi import FastAPI, UploadFile, File, WebSocket, Depends, HTTPException
+import time
+
+# Cold-start clock: everything below, including the imports, counts against STARTUP_BUDGET_SECONDS
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, WebSocket, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, Response
+from .responses import FastJSONResponse
 from sqlalchemy.orm import Session
-from .database import SessionLocal, engine
-from sqlalchemy import text
-from . import models, crud, tasks
-from .celery_worker import celery_app
-from celery.result import AsyncResult
-import uuid, os, requests, json, asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from loguru import logger
+from .database import SessionLocal, AsyncWriteSessionLocal, import_engine
+from . import models, crud, dedupe, janitor, profiling, generations
+import uuid, os, json, asyncio, hashlib
+from sqlalchemy import insert, select
 from .config import settings
+from .compression import UnsupportedUpload, check_upload, compression_for
+from .content_encoding import CompressionMiddleware
+from .validation import rejects_path_for
 from .upstash_redis import get_upstash_client
+from .replicas import router as read_router
 from pathlib import Path
 
-app = FastAPI()
+
+def _tasks():
+    # Imported on first use: Celery, the import pipeline and their HTTP clients are about a
+    # third of the cold start (benchmarks/bench_startup.py), and most requests never need them
+    from . import tasks
+    return tasks
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # No database or Redis work here: schema changes belong to `alembic upgrade head`
+    # and clients connect on first use, so a new replica serves as soon as it has imported
+    startup_seconds = time.perf_counter() - _import_started
+    app.state.startup_seconds = startup_seconds
+    if settings.STARTUP_BUDGET_SECONDS and startup_seconds > settings.STARTUP_BUDGET_SECONDS:
+        logger.warning(f"Startup took {startup_seconds:.3f}s, over the {settings.STARTUP_BUDGET_SECONDS}s budget")
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for the Next.js dev server and Vercel deployment
 app.add_middleware(
@@ -26,27 +58,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.RESPONSE_COMPRESSION:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.RESPONSE_COMPRESSION_MIN_BYTES)
 
-models.Base.metadata.create_all(bind=engine)
-
-# Ensure Postgres trigram extension and GIN indexes for faster ILIKE search
-def ensure_search_indexes():
-    try:
-        with engine.begin() as conn:
-            # Create extension if available (Postgres only)
-            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
-            # Create GIN trigram indexes to accelerate ILIKE on name/description
-            conn.execute(text(
-                "CREATE INDEX IF NOT EXISTS idx_products_name_trgm ON products USING gin (name gin_trgm_ops)"
-            ))
-            conn.execute(text(
-                "CREATE INDEX IF NOT EXISTS idx_products_description_trgm ON products USING gin (description gin_trgm_ops)"
-            ))
-    except Exception as _:
-        # If running on non-Postgres or without permissions, ignore gracefully
-        pass
-
-ensure_search_indexes()
+# Profiles single requests on demand (see app/profiling.py); not installed without a token
+if settings.PROFILE_TOKEN:
+    app.add_middleware(profiling.RequestProfiler, token=settings.PROFILE_TOKEN, header=settings.PROFILE_HEADER)
 
 def get_db():
     db = SessionLocal()
@@ -55,8 +72,22 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db(request: Request):
+    # Read-only endpoints: a replica when one is configured and fresh enough (see app/replicas.py)
+    sessionmaker, request.state.db_route = await read_router.route(_uploader(request))
+    async with sessionmaker() as db:
+        yield db
+
+async def get_async_write_db():
+    async with AsyncWriteSessionLocal() as db:
+        yield db
+
+def _write_and_hash(f, hasher, chunk: bytes):
+    hasher.update(chunk)
+    f.write(chunk)
+
 # Cross-platform upload directory (works on Windows and Unix)
-UPLOAD_DIR = os.path.join(os.getcwd(), "uploads")
+UPLOAD_DIR = janitor.upload_dir()
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
@@ -77,27 +108,88 @@ def root():
     }
 
 
+def _uploader(request: Request) -> str | None:
+    uploader = (request.headers.get(settings.IMPORT_UPLOADER_HEADER) or "").strip()
+    if not uploader and request.client:
+        uploader = request.client.host
+    return uploader[:128] or None
+
+
+if read_router.replicas:
+    @app.middleware("http")
+    async def read_your_writes(request: Request, call_next):
+        response = await call_next(request)
+        if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+            read_router.mark_write(_uploader(request))
+        route = getattr(request.state, "db_route", None)
+        if route:
+            response.headers["X-DB-Route"] = route
+        return response
+
+
 @app.post("/upload-csv")
-async def upload_csv(file:UploadFile = File(...),db:Session = Depends(get_db)):
+async def upload_csv(
+    request: Request,
+    file:UploadFile = File(...),
+    mode: str = "upsert",
+    deactivate_missing: bool = False,
+    profile: bool = False,
+    db:AsyncSession = Depends(get_async_write_db),
+):
     """
     Upload and process a CSV file containing product data.
-    Maximum file size: 5GB (configurable via MAX_UPLOAD_BYTES)
+    Accepts .csv, .csv.gz, .csv.zst or a .zip holding a single CSV; compressed
+    uploads are stored as-is and decompressed while importing.
+    Maximum file size: 5GB as uploaded (configurable via MAX_UPLOAD_BYTES)
     Required columns: sku, name, description, price
+
+    mode=delta only writes rows that changed since the last delta import;
+    with deactivate_missing=true, SKUs absent from the feed are set inactive.
+    mode=replace makes the feed the whole catalog (SKUs absent from it are removed).
+
+    The uploader (IMPORT_UPLOADER_HEADER, else the client address) is recorded
+    for per-uploader concurrency limits.
+
+    profile=true records a sampled CPU profile and an allocation snapshot of the
+    import, downloadable from /import-jobs/{job_id}/profile (see app/profiling.py).
+
+    With a SQLite DATABASE_URL (local development, CI) only mode=upsert without
+    profile is supported; anything else is refused with 422.
     """
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
+    if mode not in _tasks().IMPORT_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(_tasks().IMPORT_MODES)}")
+    if deactivate_missing and mode != "delta":
+        raise HTTPException(status_code=400, detail="deactivate_missing requires mode=delta")
+    if import_engine.dialect.name == "sqlite" and (mode != "upsert" or profile):
+        # The SQLite import (tasks._import_sqlite) only upserts and doesn't profile
+        raise HTTPException(status_code=422, detail="With a SQLite database only mode=upsert without profile is supported")
 
-    if not file.filename.endswith(".csv"):
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid file type. Expected .csv file, got: {file.filename}"
-        )
-
-    job  = crud.create_import_job(db, original_filename=file.filename)
+    try:
+        compression_for(file.filename)
+    except UnsupportedUpload as e:
+        raise HTTPException(status_code=400, detail=f"Invalid file type. {e}")
+
+    options = {}
+    if deactivate_missing:
+        options["deactivate_missing"] = True
+    if profile:
+        options["profile"] = True
+    job  = await crud.create_import_job_async(
+        db,
+        original_filename=file.filename,
+        mode=mode,
+        options=options or None,
+        uploader=_uploader(request),
+    )
     file_id = f"{job.id}_{uuid.uuid4().hex}_{file.filename}"
     dest_path = os.path.join(UPLOAD_DIR,file_id)
     size = 0
-    with open(dest_path, "wb") as out_f:
+    hasher = hashlib.sha256()
+    # Disk writes (and hashing) go through the threadpool so large uploads never stall the event loop
+    out_f = await run_in_threadpool(open, dest_path, "wb")
+    try:
         while True:
             chunk = await file.read(4 * 1024 * 1024)
             if not chunk:
@@ -110,28 +202,55 @@ async def upload_csv(file:UploadFile = File(...),db:Session = Depends(get_db)):
                 except:
                     pass
                 max_size_mb = settings.MAX_UPLOAD_BYTES / (1024 * 1024)
-                raise HTTPException(
-                    status_code=413,
-                    detail=f"File too large. Maximum size: {max_size_mb:.0f}MB"
-                )
-            out_f.write(chunk)
-
-    # update job with file path for potential retry
-    crud.update_job_progress(db, job.id, processed=0, status="queued", file_path=dest_path)
-    # enqueue task and save task_id for revoke/cancel support
-    async_result = tasks.import_csv_task.delay(dest_path, job.id)
+                detail = f"File too large. Maximum size: {max_size_mb:.0f}MB"
+                await crud.update_import_job_async(db, job.id, status="failed", error=detail)
+                raise HTTPException(status_code=413, detail=detail)
+            await run_in_threadpool(_write_and_hash, out_f, hasher, chunk)
+    finally:
+        out_f.close()
+
     try:
-        job_ref = db.get(models.ImportJob, job.id)
-        if job_ref:
-            job_ref.task_id = async_result.id
-            db.add(job_ref)
-            db.commit()
-    except Exception:
-        pass
-    return {"job_id": job.id}
+        await run_in_threadpool(check_upload, dest_path)
+    except UnsupportedUpload as e:
+        await run_in_threadpool(os.remove, dest_path)
+        await crud.update_import_job_async(db, job.id, status="failed", error=str(e))
+        raise HTTPException(status_code=400, detail=str(e))
 
-# Initialize Upstash Redis client for pub/sub messaging
-upstash_client = get_upstash_client()
+    # Byte-identical re-upload of an already imported file (see app/dedupe.py)
+    content_sha256 = hasher.hexdigest()
+    prior = None
+    if settings.IMPORT_DEDUPE_MODE in ("reuse", "verify"):
+        prior = await crud.find_completed_import_async(db, content_sha256, mode, options or None, exclude_id=job.id)
+    if prior and settings.IMPORT_DEDUPE_MODE == "reuse":
+        fields = await run_in_threadpool(dedupe.duplicate_result, dict(prior), "reuse", rejects_path_for(dest_path, job.id))
+        await run_in_threadpool(os.remove, dest_path)
+        await crud.update_import_job_async(
+            db, job.id, content_sha256=content_sha256, total_bytes=size, processed_bytes=size, **fields
+        )
+        try:
+            await run_in_threadpool(
+                _tasks().fire_event.delay,
+                "import.completed",
+                {"job_id": job.id, "total_rows": fields["total_rows"], "rejected_rows": fields["rejected_rows"], "duplicate_of": prior["id"]},
+            )
+        except Exception:
+            pass
+        return {"job_id": job.id, "status": "complete", "duplicate_of": prior["id"]}
+
+    # Save file path (for retry), hash, dedupe candidate and a pre-assigned task_id (for revoke/cancel)
+    # in one UPDATE, then enqueue; broker I/O is blocking so it goes through the threadpool
+    task_id = str(uuid.uuid4())
+    await crud.update_import_job_async(
+        db,
+        job.id,
+        file_path=dest_path,
+        total_bytes=size,
+        content_sha256=content_sha256,
+        duplicate_of=prior["id"] if prior else None,
+        task_id=task_id,
+    )
+    await run_in_threadpool(_tasks().import_csv_task.apply_async, (dest_path, job.id), task_id=task_id)
+    return {"job_id": job.id}
 
 @app.websocket("/ws/import-progress/{job_id}")
 async def ws_import_progress(websocket: WebSocket, job_id: int):
@@ -147,7 +266,7 @@ async def ws_import_progress(websocket: WebSocket, job_id: int):
         # Poll for messages stored in Redis
         while True:
             # Try to get the latest message
-            latest_message = upstash_client.get(f"{channel}:latest")
+            latest_message = await run_in_threadpool(get_upstash_client().get, f"{channel}:latest")
 
             if latest_message:
                 try:
@@ -158,8 +277,8 @@ async def ws_import_progress(websocket: WebSocket, job_id: int):
                         await websocket.send_json(data)
                         last_message_id = message_id
 
-                        # Check if import is complete or failed
-                        if data.get("status") in ["complete", "failed"]:
+                        # Stop once the import is complete, failed, paused or canceled
+                        if data.get("status") in ["complete", "failed", "paused", "canceled"]:
                             break
                 except json.JSONDecodeError:
                     pass
@@ -170,13 +289,11 @@ async def ws_import_progress(websocket: WebSocket, job_id: int):
     except Exception as e:
         print(f"WebSocket error: {e}")
         await websocket.close()
-    finally:
-        # Cleanup: optionally delete the message after completion
-        upstash_client.delete(f"{channel}:latest")
+    # The latest message is left for other viewers of the job (and late joiners); it expires
+    # after an hour and is removed with the job
 
 # app/main.py (continued)
 
-from sqlalchemy import or_
 from pydantic import BaseModel
 
 class ProductCreate(BaseModel):
@@ -186,39 +303,29 @@ class ProductCreate(BaseModel):
     price_cents: int = None
     active: bool = True
 
-@app.get("/products")
-def list_products(q: str = None, sku: str = None, active: bool = None, page: int = 1, per_page: int = 50, db: Session = Depends(get_db)):
+def _revalidate(request: Request, etag: str | None) -> Response | None:
+    """304 when the client's copy is current; callers check this before querying any rows."""
+    if generations.not_modified(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    return None
+
+def _cache_headers(etag: str | None) -> dict:
+    # no-cache: browsers may keep the body but must revalidate it on every poll
+    return {"ETag": etag, "Cache-Control": "private, no-cache"} if etag else {"Cache-Control": "no-store"}
+
+@app.get("/products", response_class=FastJSONResponse)
+async def list_products(request: Request, q: str = None, sku: str = None, active: bool = None, page: int = 1, per_page: int = 50, db: AsyncSession = Depends(get_async_db)):
     # Clamp per_page to protect DB
     per_page = max(1, min(per_page, 200))
     page = max(1, page)
-    query = db.query(models.Product)
-    if sku:
-        query = query.filter(models.Product.sku_lower == sku.lower())
-    if q:
-        qlike = f"%{q}%"
-        query = query.filter(or_(models.Product.name.ilike(qlike), models.Product.description.ilike(qlike)))
-    if active is not None:
-        query = query.filter(models.Product.active == active)
-    total = query.count()
-    items = (
-        query.order_by(models.Product.id.desc())
-        .offset((page - 1) * per_page)
-        .limit(per_page)
-        .all()
-    )
-    def to_dict(p):
-        return {
-            "id": p.id,
-            "sku": p.sku,
-            "sku_lower": p.sku_lower,
-            "name": p.name,
-            "description": p.description,
-            "price_cents": p.price_cents,
-            "active": p.active,
-            "created_at": p.created_at,
-            "updated_at": p.updated_at,
-        }
-    return {"total": total, "page": page, "per_page": per_page, "items": [to_dict(p) for p in items]}
+    etag = await generations.etag_async(db, generations.CATALOG)
+    if (not_modified := _revalidate(request, etag)) is not None:
+        return not_modified
+    # attr.<key>=value filters on products.attributes (extra CSV columns); all must match
+    attributes = {k[5:]: v for k, v in request.query_params.items() if k.startswith("attr.") and len(k) > 5}
+    total, items = await crud.list_products_async(db, q=q, sku=sku, active=active, page=page, per_page=per_page, attributes=attributes)
+    # Return the response directly so rows skip jsonable_encoder and go straight to orjson
+    return FastJSONResponse({"total": total, "page": page, "per_page": per_page, "items": items}, headers=_cache_headers(etag))
 
 @app.post("/products")
 def create_product(payload: ProductCreate, db: Session = Depends(get_db)):
@@ -230,7 +337,9 @@ def create_product(payload: ProductCreate, db: Session = Depends(get_db)):
         existing.description = payload.description
         existing.price_cents = payload.price_cents
         existing.active = payload.active
-        db.add(existing); db.commit(); db.refresh(existing)
+        db.add(existing); db.commit()
+        generations.bump(db, generations.CATALOG)
+        db.refresh(existing)
         return {
             "id": existing.id,
             "sku": existing.sku,
@@ -250,10 +359,12 @@ def create_product(payload: ProductCreate, db: Session = Depends(get_db)):
         price_cents=payload.price_cents,
         active=payload.active
     )
-    db.add(prod); db.commit(); db.refresh(prod)
+    db.add(prod); db.commit()
+    generations.bump(db, generations.CATALOG)
+    db.refresh(prod)
     # Fire product.created asynchronously (best effort)
     try:
-        tasks.fire_event.delay("product.created", {
+        _tasks().fire_event.delay("product.created", {
             "id": prod.id,
             "sku": prod.sku,
             "name": prod.name,
@@ -279,63 +390,47 @@ def bulk_delete(confirm: bool = False, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Must provide confirm=true to delete all products")
     deleted = db.query(models.Product).delete()
     db.commit()
+    generations.bump(db, generations.CATALOG)
     return {"deleted": deleted}
 
-@app.get("/stats")
-def get_stats(db: Session = Depends(get_db)):
-    total_products = db.query(models.Product).count()
-    recent_uploads = db.query(models.ImportJob).filter(models.ImportJob.status == "complete").count()
-    active_webhooks = db.query(models.Webhook).filter(models.Webhook.enabled == True).count()
-    return {
-        "total_products": total_products,
-        "recent_uploads": recent_uploads,
-        "active_webhooks": active_webhooks
-    }
+@app.get("/stats", response_class=FastJSONResponse)
+async def get_stats(request: Request, db: AsyncSession = Depends(get_async_db)):
+    etag = await generations.etag_async(db, generations.CATALOG, generations.JOBS, generations.WEBHOOKS)
+    if (not_modified := _revalidate(request, etag)) is not None:
+        return not_modified
+    return FastJSONResponse(await crud.get_stats_async(db), headers=_cache_headers(etag))
 
-@app.get("/import-jobs")
-def list_import_jobs(limit: int = 10, db: Session = Depends(get_db)):
+@app.get("/import-jobs", response_class=FastJSONResponse)
+async def list_import_jobs(request: Request, limit: int = 10, db: AsyncSession = Depends(get_async_db)):
     limit = max(1, min(limit, 50))
-    jobs = db.query(models.ImportJob).order_by(models.ImportJob.created_at.desc()).limit(limit).all()
-    def to_dict(j):
-        pct = 0
-        if j.total_rows:
-            pct = round((j.processed_rows / j.total_rows) * 100, 2)
-        return {
-            "id": j.id,
-            "status": j.status,
-            "processed_rows": j.processed_rows,
-            "total_rows": j.total_rows,
-            "percent": pct,
-            "error": j.error,
-            "original_filename": j.original_filename,
-            "created_at": j.created_at,
-            "updated_at": j.updated_at,
-        }
-    return {"jobs": [to_dict(j) for j in jobs]}
+    etag = await generations.etag_async(db, generations.JOBS)
+    if (not_modified := _revalidate(request, etag)) is not None:
+        return not_modified
+    return FastJSONResponse({"jobs": await crud.list_import_jobs_async(db, limit=limit)}, headers=_cache_headers(etag))
 
 @app.post("/import-jobs/{job_id}/retry")
-def retry_import_job(job_id: int, db: Session = Depends(get_db)):
-    from datetime import datetime
-    job = db.get(models.ImportJob, job_id)
+def retry_import_job(job_id: int, profile: bool = False, db: Session = Depends(get_db)):
+    """Re-run a finished job from its stored upload; profile=true profiles this run (see upload-csv)."""
+    job = crud.get_import_job_fields(db, job_id, "status", "file_path", "options")
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    if job.status not in ["failed", "complete"]:
+    if job["status"] not in ["failed", "complete", "canceled", "paused"]:
         raise HTTPException(status_code=400, detail="Job is still running or queued")
-    if not job.file_path or not os.path.exists(job.file_path):
+    if not job["file_path"] or not os.path.exists(job["file_path"]):
         raise HTTPException(status_code=400, detail="Original file not available for retry")
-    # reset job for retry
-    job.status = "queued"
-    job.processed_rows = 0
-    job.error = None
-    job.updated_at = datetime.utcnow()
-    db.add(job); db.commit(); db.refresh(job)
-    async_result = tasks.import_csv_task.delay(job.file_path, job.id)
-    try:
-        job.task_id = async_result.id
-        db.add(job); db.commit(); db.refresh(job)
-    except Exception:
-        pass
-    return {"job_id": job.id, "status": job.status}
+    options = dict(job["options"] or {})
+    if profile:
+        options["profile"] = True
+    else:
+        options.pop("profile", None)
+    # reset job for retry and record the task_id up front (single UPDATE), then enqueue
+    task_id = str(uuid.uuid4())
+    crud.update_import_job(
+        db, job_id, status="queued", processed_rows=0, processed_bytes=0, rejected_rows=0, rejects_path=None,
+        error=None, control=None, checkpoint=None, task_id=task_id, options=options or None,
+    )
+    _tasks().import_csv_task.apply_async((job["file_path"], job_id), task_id=task_id)
+    return {"job_id": job_id, "status": "queued"}
 
 
 @app.delete("/import-jobs/{job_id}")
@@ -343,45 +438,137 @@ def delete_import_job(job_id: int, db: Session = Depends(get_db)):
     job = db.get(models.ImportJob, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    # If queued or running, revoke the Celery task before delete (best-effort)
-    if job.task_id and job.status in ["queued", "running"]:
+    # If queued, revoke the Celery task before delete (best-effort); a running import
+    # notices the row is gone after its current batch and stops cleanly
+    if job.task_id and job.status == "queued":
         try:
-            celery_app.control.revoke(job.task_id, terminate=(job.status == "running"))
+            _tasks().celery_app.control.revoke(job.task_id)
         except Exception:
             pass
 
     # Best-effort cleanup of progress key
     try:
-        upstash_client.delete(f"import_progress:{job_id}:latest")
+        get_upstash_client().delete(f"import_progress:{job_id}:latest")
     except Exception:
         pass
 
-    # Remove uploaded file if it still exists (typically for failed jobs retained for retry)
-    try:
-        if job.file_path and os.path.exists(job.file_path):
-            os.remove(job.file_path)
-    except Exception:
-        pass
+    # Remove uploaded file if it still exists (typically for failed jobs retained for retry),
+    # the rejects file and profiles, if any
+    profiles = [profiling.job_profile_path(job_id, kind) for kind in profiling.JOB_PROFILE_KINDS]
+    for path in (job.file_path, job.rejects_path, *profiles):
+        try:
+            if path and os.path.exists(path):
+                os.remove(path)
+        except Exception:
+            pass
 
     db.delete(job)
     db.commit()
+    generations.bump(db, generations.JOBS)
     return {"deleted": True}
 
 
+@app.get("/import-jobs/{job_id}/rejects")
+def download_import_rejects(job_id: int, db: Session = Depends(get_db)):
+    """Rows the import could not load, as CSV: record, reason, then the original sku/name/description/price."""
+    job = crud.get_import_job_fields(db, job_id, "rejects_path")
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not job["rejects_path"] or not os.path.exists(job["rejects_path"]):
+        raise HTTPException(status_code=404, detail="No rejected rows for this job")
+    return FileResponse(job["rejects_path"], media_type="text/csv", filename=f"import_{job_id}_rejects.csv")
+
+
+@app.get("/import-jobs/{job_id}/profile")
+def download_import_profile(job_id: int, kind: str = "cpu"):
+    """The profile of a job imported with profile=true, as collapsed stacks (flamegraph.pl, speedscope).
+    kind=cpu: wall-clock samples per stack; kind=alloc: bytes allocated per stack at peak traced memory."""
+    if kind not in profiling.JOB_PROFILE_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of: {', '.join(profiling.JOB_PROFILE_KINDS)}")
+    path = profiling.job_profile_path(job_id, kind)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No profile for this job")
+    return FileResponse(path, media_type="text/plain", filename=f"import_{job_id}_{kind}.folded")
+
+
+@app.get("/profiles/{profile_id}")
+def download_request_profile(profile_id: str):
+    """A request profile (the X-Profile-Id of a profiled response), as collapsed stacks."""
+    path = profiling.request_profile_path(profile_id) if profiling.PROFILE_ID.match(profile_id) else None
+    if not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"request_{profile_id}.folded")
+
+
+def _stop_import_job(db: Session, job_id: int, action: str) -> dict:
+    """Ask a running import to pause/cancel after its current batch; stop a queued one right away."""
+    job = crud.get_import_job_fields(db, job_id, "status", "task_id")
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "running":
+        # Checked by the worker between batches (see tasks.ImportInterrupted)
+        crud.update_import_job(db, job_id, control=action)
+        return {"job_id": job_id, "status": "running", "requested": action}
+    if job["status"] == "queued" or (job["status"] == "paused" and action == "cancel"):
+        if job["task_id"]:
+            try:
+                _tasks().celery_app.control.revoke(job["task_id"])
+            except Exception:
+                pass
+        status = "paused" if action == "pause" else "canceled"
+        crud.update_import_job(db, job_id, status=status, control=None, wait_reason=None)
+        return {"job_id": job_id, "status": status}
+    raise HTTPException(status_code=400, detail=f"Job is {job['status']}")
+
+
 @app.post("/import-jobs/{job_id}/cancel")
 def cancel_import_job(job_id: int, force: bool = False, db: Session = Depends(get_db)):
-    job = db.get(models.ImportJob, job_id)
+    """
+    Stop an import. A running job finishes its current batch, drops its staging
+    table and ends as 'canceled' (batches already committed stay applied).
+    force=true also revokes and terminates the Celery task, for a worker that
+    is stuck; that can interrupt a COPY mid-way.
+    """
+    result = _stop_import_job(db, job_id, "cancel")
+    if force and result["status"] == "running":
+        task_id = crud.get_import_job_fields(db, job_id, "task_id")["task_id"]
+        try:
+            _tasks().celery_app.control.revoke(task_id, terminate=True)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        crud.update_import_job(db, job_id, status="canceled", control=None)
+        result = {"job_id": job_id, "status": "canceled"}
+    return result
+
+
+@app.post("/import-jobs/{job_id}/pause")
+def pause_import_job(job_id: int, db: Session = Depends(get_db)):
+    """Pause an import after its current batch, keeping a checkpoint so it can be resumed (frees the worker)."""
+    return _stop_import_job(db, job_id, "pause")
+
+
+@app.post("/import-jobs/{job_id}/resume")
+def resume_import_job(job_id: int, db: Session = Depends(get_db)):
+    job = crud.get_import_job_fields(db, job_id, "status", "file_path")
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    if not job.task_id:
-        raise HTTPException(status_code=400, detail="No task_id to cancel")
+    if job["status"] != "paused":
+        raise HTTPException(status_code=400, detail="Job is not paused")
+    if not job["file_path"] or not os.path.exists(job["file_path"]):
+        raise HTTPException(status_code=400, detail="Original file not available to resume")
+    # The checkpoint stays on the job; the worker skips the records it already handled
+    task_id = str(uuid.uuid4())
+    crud.update_import_job(db, job_id, status="queued", control=None, task_id=task_id)
+    _tasks().import_csv_task.apply_async((job["file_path"], job_id), task_id=task_id)
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.post("/maintenance/janitor")
+def enqueue_janitor(dry_run: bool = False):
+    """Run the janitor now (it also runs on the beat schedule); poll /tasks/{task_id} for the report."""
     try:
-        # force=True will try to terminate running task (best-effort, platform-dependent)
-        celery_app.control.revoke(job.task_id, terminate=force)
-        job.status = "failed" if job.status == "running" else "queued"
-        job.error = (job.error or "") + (" | canceled" if "canceled" not in (job.error or "") else "")
-        db.add(job); db.commit(); db.refresh(job)
-        return {"canceled": True}
+        async_result = _tasks().janitor_task.delay(dry_run)
+        return {"task_id": async_result.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -390,7 +577,7 @@ def cancel_import_job(job_id: int, force: bool = False, db: Session = Depends(ge
 def worker_health():
     """Ping Celery workers to verify they are reachable."""
     try:
-        replies = celery_app.control.ping(timeout=2.0) or []
+        replies = _tasks().celery_app.control.ping(timeout=2.0) or []
         return {"workers": replies, "ok": len(replies) > 0}
     except Exception as e:
         return {"workers": [], "ok": False, "error": str(e)}
@@ -399,8 +586,10 @@ def worker_health():
 @app.get("/tasks/{task_id}")
 def task_status(task_id: str):
     """Check status/result of a Celery task by id."""
+    from celery.result import AsyncResult
+
     try:
-        res = AsyncResult(task_id, app=celery_app)
+        res = AsyncResult(task_id, app=_tasks().celery_app)
         payload = {"id": task_id, "state": res.state}
         if res.ready():
             try:
@@ -416,7 +605,7 @@ def task_status(task_id: str):
 def enqueue_ping():
     """Enqueue a tiny ping task to verify async execution."""
     try:
-        async_result = tasks.ping_task.delay()
+        async_result = _tasks().ping_task.delay()
         return {"task_id": async_result.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -442,7 +631,7 @@ def _mask_url(url: str) -> str:
 def debug_celery():
     """Return masked Celery configuration and ping result for quick diagnosis."""
     try:
-        replies = celery_app.control.ping(timeout=2.0) or []
+        replies = _tasks().celery_app.control.ping(timeout=2.0) or []
     except Exception as e:
         replies = [{"error": str(e)}]
     from app.celery_worker import broker_url as bk, result_backend as rb
@@ -476,20 +665,20 @@ class WebhookUpdate(BaseModel):
     event: str = None
     enabled: bool = None
 
-@app.get("/webhooks")
-def list_webhooks(db: Session = Depends(get_db)):
-    webhooks = db.query(models.Webhook).all()
-    return [{"id": w.id, "url": w.url, "event": w.event, "enabled": w.enabled, "created_at": w.created_at} for w in webhooks]
+@app.get("/webhooks", response_class=FastJSONResponse)
+async def list_webhooks(db: AsyncSession = Depends(get_async_db)):
+    return FastJSONResponse(await crud.list_webhooks_async(db))
 
 @app.post("/webhooks")
 def create_webhook(payload: WebhookCreate, db: Session = Depends(get_db)):
-    webhooks = []
+    created = []
     for event in payload.events:
         wh = models.Webhook(url=payload.url, event=event, enabled=payload.enabled)
         db.add(wh)
-        webhooks.append(wh)
+        created.append(wh)
     db.commit()
-    return [{"id": w.id, "url": w.url, "event": w.event, "enabled": w.enabled, "created_at": w.created_at} for w in webhooks]
+    generations.bump(db, generations.WEBHOOKS)
+    return [{"id": w.id, "url": w.url, "event": w.event, "enabled": w.enabled, "created_at": w.created_at} for w in created]
 
 @app.put("/webhooks/{webhook_id}")
 def update_webhook(webhook_id: int, payload: WebhookUpdate, db: Session = Depends(get_db)):
@@ -503,6 +692,7 @@ def update_webhook(webhook_id: int, payload: WebhookUpdate, db: Session = Depend
     if payload.enabled is not None:
         wh.enabled = payload.enabled
     db.commit()
+    generations.bump(db, generations.WEBHOOKS)
     db.refresh(wh)
     return {"id": wh.id, "url": wh.url, "event": wh.event, "enabled": wh.enabled, "created_at": wh.created_at}
 
@@ -513,39 +703,36 @@ def delete_webhook(webhook_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Webhook not found")
     db.delete(wh)
     db.commit()
+    generations.bump(db, generations.WEBHOOKS)
     return {"deleted": True}
 
 @app.post("/webhooks/{webhook_id}/test")
-def test_webhook(webhook_id: int, db: Session = Depends(get_db)):
-    wh = db.query(models.Webhook).filter(models.Webhook.id == webhook_id).first()
+async def test_webhook(webhook_id: int, db: AsyncSession = Depends(get_async_write_db)):
+    wh = (await db.execute(select(models.Webhook).where(models.Webhook.id == webhook_id))).scalar_one_or_none()
     if not wh:
         raise HTTPException(status_code=404, detail="Webhook not found")
+    from . import webhooks  # httpx, only needed here
+
+    # Same body, signing and headers as real deliveries, sent from the event loop
+    delivery_id = f"test-{uuid.uuid4().hex}"
+    body = webhooks.encode(wh.event, {"test": True, "timestamp": time.time()})
+    result = await webhooks.send_async(wh.url, wh.event, body, delivery_id)
     try:
-        from .config import settings as _settings
-        import hmac, hashlib, json as _json, time as _time
-        payload = {"event": wh.event, "test": True, "timestamp": _time.time()}
-        headers = {"Content-Type": "application/json", "X-Event": wh.event}
-        if _settings.WEBHOOK_SECRET:
-            body = _json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
-            sig = hmac.new(_settings.WEBHOOK_SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
-            headers["X-Signature"] = sig
-            headers["X-Signature-Alg"] = "HMAC-SHA256"
-        start = __import__("time").perf_counter()
-        res = requests.post(
-            wh.url,
-            json=payload,
-            headers=headers,
-            timeout=max(1, int(_settings.WEBHOOK_TIMEOUT_SECONDS or 5)),
-        )
-        duration_ms = int((__import__("time").perf_counter() - start) * 1000)
-        body_preview = None
-        try:
-            body_preview = res.text[:500]
-        except Exception:
-            body_preview = None
-        return {"status": res.status_code, "success": res.ok, "duration_ms": duration_ms, "body": body_preview}
-    except Exception as e:
-        return {"status": 0, "success": False, "error": str(e)}
+        await db.execute(insert(models.WebhookDelivery).values(**webhooks.attempt_row(
+            wh.id, wh.url, wh.event, delivery_id, attempt=0, status="test", result=result,
+        )))
+        await db.commit()
+    except Exception:
+        await db.rollback()
+    if result["success"]:
+        # A receiver that answers again closes its circuit without waiting out the cooldown
+        await run_in_threadpool(webhooks.CircuitBreaker(wh.url).record, True)
+    return result
+
+@app.get("/webhooks/{webhook_id}/deliveries", response_class=FastJSONResponse)
+async def list_webhook_deliveries(webhook_id: int, limit: int = 50, db: AsyncSession = Depends(get_async_db)):
+    limit = max(1, min(limit, 500))
+    return FastJSONResponse({"deliveries": await crud.list_webhook_deliveries_async(db, webhook_id, limit=limit)})
 
 @app.put("/products/{product_id}")
 def update_product(product_id: int, payload: ProductCreate, db: Session = Depends(get_db)):
@@ -563,10 +750,11 @@ def update_product(product_id: int, payload: ProductCreate, db: Session = Depend
     prod.price_cents = payload.price_cents
     prod.active = payload.active
     db.commit()
+    generations.bump(db, generations.CATALOG)
     db.refresh(prod)
     # Fire product.updated asynchronously (best effort)
     try:
-        tasks.fire_event.delay("product.updated", {
+        _tasks().fire_event.delay("product.updated", {
             "id": prod.id,
             "sku": prod.sku,
             "name": prod.name,
@@ -585,9 +773,10 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
     sku = prod.sku
     db.delete(prod)
     db.commit()
+    generations.bump(db, generations.CATALOG)
     # Fire product.deleted asynchronously (best effort)
     try:
-        tasks.fire_event.delay("product.deleted", {"id": pid, "sku": sku})
+        _tasks().fire_event.delay("product.deleted", {"id": pid, "sku": sku})
     except Exception:
         pass
     return {"deleted": True}
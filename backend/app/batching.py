@@ -0,0 +1,78 @@
+# app/batching.py
+"""
+Adaptive COPY batch sizing.
+
+Batches flush on whichever comes first: the current row target or the byte
+budget. After each batch the row target moves toward the size that would have
+hit the target latency at the observed throughput, clamped to [min, max].
+"""
+from .config import settings
+
+
+class AdaptiveBatchSizer:
+    # Fraction of the new estimate blended in per batch, and max growth per step;
+    # keeps one slow batch (autovacuum, lock wait) from collapsing the size.
+    SMOOTHING = 0.5
+    MAX_GROWTH = 2.0
+
+    def __init__(
+        self,
+        initial_rows: int | None = None,
+        min_rows: int | None = None,
+        max_rows: int | None = None,
+        max_bytes: int | None = None,
+        target_seconds: float | None = None,
+        adaptive: bool | None = None,
+    ):
+        self.min_rows = max(1, min_rows or settings.CSV_BATCH_MIN_ROWS)
+        self.max_rows = max(self.min_rows, max_rows or settings.CSV_BATCH_MAX_ROWS)
+        self.max_bytes = max_bytes or settings.CSV_BATCH_MAX_BYTES
+        self.target_seconds = target_seconds or settings.CSV_BATCH_TARGET_SECONDS
+        self.adaptive = settings.CSV_ADAPTIVE_BATCHING if adaptive is None else adaptive
+        self.rows = self._clamp(initial_rows or settings.CSV_BATCH_SIZE)
+
+        self.batches = 0
+        self.total_rows = 0
+        self.total_bytes = 0
+        self.total_seconds = 0.0
+        # [batch_index, rows] each time the target changes (compact for multi-GB files)
+        self.size_changes = [[0, self.rows]]
+
+    def _clamp(self, rows: float) -> int:
+        return int(min(self.max_rows, max(self.min_rows, rows)))
+
+    def should_flush(self, buffered_rows: int, buffered_bytes: int) -> bool:
+        return buffered_rows >= self.rows or buffered_bytes >= self.max_bytes
+
+    def observe(self, rows: int, nbytes: int, seconds: float):
+        """Record one flushed batch and retune the row target."""
+        if rows <= 0:
+            return
+        self.batches += 1
+        self.total_rows += rows
+        self.total_bytes += nbytes
+        self.total_seconds += seconds
+        if not self.adaptive or seconds <= 0:
+            return
+        ideal = rows * (self.target_seconds / seconds)
+        blended = self.rows * (1 - self.SMOOTHING) + ideal * self.SMOOTHING
+        new_rows = self._clamp(min(blended, self.rows * self.MAX_GROWTH))
+        if new_rows != self.rows:
+            self.rows = new_rows
+            self.size_changes.append([self.batches, new_rows])
+
+    def metrics(self) -> dict:
+        return {
+            "adaptive": self.adaptive,
+            "batches": self.batches,
+            "current_rows": self.rows,
+            "min_rows": self.min_rows,
+            "max_rows": self.max_rows,
+            "max_bytes": self.max_bytes,
+            "target_seconds": self.target_seconds,
+            "avg_rows": round(self.total_rows / self.batches, 1) if self.batches else 0,
+            "avg_bytes": round(self.total_bytes / self.batches, 1) if self.batches else 0,
+            "avg_seconds": round(self.total_seconds / self.batches, 4) if self.batches else 0,
+            "rows_per_second": round(self.total_rows / self.total_seconds, 1) if self.total_seconds else 0,
+            "size_changes": self.size_changes,
+        }
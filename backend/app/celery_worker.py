@@ -1,4 +1,5 @@
 from celery import Celery
+from kombu import Queue
 from app.config import settings
 import ssl
 
@@ -28,8 +29,40 @@ except Exception:
     pass
 
 # Reasonable defaults
-celery_app.conf.broker_transport_options = {"visibility_timeout": 3600}
+celery_app.conf.broker_transport_options = {
+    "visibility_timeout": 3600,
+    # Redis emulates priorities with one list per step; 0 is consumed first
+    "priority_steps": list(range(10)),
+    "sep": ":",
+    "queue_order_strategy": "priority",
+}
+# Without Redis (e.g. the load-test harness): kombu's SQLAlchemy transport keeps the queues in
+# Postgres (sqla+postgresql://...). Its transport options are engine arguments, and it has no
+# priorities; limits.py can't enforce cross-worker limits without Redis either.
+if broker_url.startswith("sqla+"):
+    celery_app.conf.broker_transport_options = {}
 celery_app.conf.worker_prefetch_multiplier = 1
 
+# Dedicated queues (see the topology notes in config.py); a worker started without -Q consumes all of them
+celery_app.conf.task_queues = (
+    Queue(settings.CELERY_CONTROL_QUEUE),
+    Queue(settings.CELERY_WEBHOOKS_QUEUE),
+    Queue(settings.CELERY_IMPORTS_QUEUE),
+)
+celery_app.conf.task_default_queue = settings.CELERY_CONTROL_QUEUE
+celery_app.conf.task_default_priority = settings.CELERY_CONTROL_PRIORITY
+celery_app.conf.task_routes = {
+    "import_csv_task": {"queue": settings.CELERY_IMPORTS_QUEUE, "priority": settings.CELERY_IMPORT_PRIORITY},
+    "fire_event": {"queue": settings.CELERY_WEBHOOKS_QUEUE, "priority": settings.CELERY_WEBHOOK_PRIORITY},
+    "deliver_webhook": {"queue": settings.CELERY_WEBHOOKS_QUEUE, "priority": settings.CELERY_WEBHOOK_PRIORITY},
+    "ping_task": {"queue": settings.CELERY_CONTROL_QUEUE, "priority": settings.CELERY_CONTROL_PRIORITY},
+    "janitor_task": {"queue": settings.CELERY_CONTROL_QUEUE, "priority": settings.CELERY_CONTROL_PRIORITY},
+}
+
+# Periodic housekeeping; needs `celery -A app.celery_worker.celery_app beat` running alongside the workers
+celery_app.conf.beat_schedule = {
+    "janitor": {"task": "janitor_task", "schedule": float(settings.JANITOR_INTERVAL_SECONDS)},
+}
+
 celery_app.autodiscover_tasks(["app.tasks"])
 
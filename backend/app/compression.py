@@ -0,0 +1,131 @@
+# app/compression.py
+"""
+Compressed upload support.
+
+Uploads may be plain `.csv`, `.csv.gz`, `.csv.zst` or a `.zip` holding a
+single CSV. They are stored as uploaded and decompressed as a stream while
+parsing, so nothing is ever expanded on disk. Readers expose how many
+*compressed* bytes they have consumed, which is what import progress is
+measured against when the row count isn't known up front.
+
+zstd needs the optional `zstandard` package (requirements-optional.txt):
+without it `.csv.zst` uploads are refused at upload time. The pyarrow engine
+decompresses gzip/zstd natively, but the header and fallback reads go
+through UploadReader.
+"""
+import gzip
+import io
+import os
+import zipfile
+
+# suffix -> compression (None = plain CSV)
+SUFFIXES = {
+    ".csv": None,
+    ".csv.gz": "gzip",
+    ".csv.zst": "zstd",
+    ".zip": "zip",
+}
+
+
+class UnsupportedUpload(ValueError):
+    pass
+
+
+def compression_for(filename: str) -> str | None:
+    """Compression implied by the file name; raises UnsupportedUpload for anything else."""
+    lower = filename.lower()
+    # longest suffix first so ".csv.gz" isn't mistaken for something else
+    for suffix in sorted(SUFFIXES, key=len, reverse=True):
+        if lower.endswith(suffix):
+            return SUFFIXES[suffix]
+    raise UnsupportedUpload(f"Expected one of {', '.join(SUFFIXES)}, got: {filename}")
+
+
+def zip_member(zf: zipfile.ZipFile) -> zipfile.ZipInfo:
+    """The single file entry of an uploaded archive."""
+    entries = [i for i in zf.infolist() if not i.is_dir()]
+    if len(entries) != 1:
+        raise UnsupportedUpload(f"Zip upload must contain exactly one file, found {len(entries)}")
+    return entries[0]
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise UnsupportedUpload("zstd uploads need the 'zstandard' package")
+    return zstandard
+
+
+def check_upload(path: str):
+    """Cheap structural check after an upload is stored (zip entry count, gzip/zstd magic)."""
+    compression = compression_for(path)
+    if compression == "zip":
+        try:
+            with zipfile.ZipFile(path) as zf:
+                zip_member(zf)
+        except zipfile.BadZipFile:
+            raise UnsupportedUpload("Not a valid zip archive")
+        return
+    if compression == "zstd":
+        _zstandard()
+    magic = {"gzip": b"\x1f\x8b", "zstd": b"\x28\xb5\x2f\xfd"}.get(compression)
+    if magic:
+        with open(path, "rb") as f:
+            if f.read(len(magic)) != magic:
+                raise UnsupportedUpload(f"File is not {compression}-compressed")
+
+
+class UploadReader(io.BufferedIOBase):
+    """Binary reader over the decompressed contents of an upload."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.compression = compression_for(path)
+        self.total_bytes = os.path.getsize(path)
+        self._raw = open(path, "rb")
+        self._zip = None
+        try:
+            if self.compression == "gzip":
+                self._stream = gzip.GzipFile(fileobj=self._raw, mode="rb")
+            elif self.compression == "zstd":
+                self._stream = _zstandard().ZstdDecompressor().stream_reader(self._raw)
+            elif self.compression == "zip":
+                self._zip = zipfile.ZipFile(self._raw)
+                self._stream = self._zip.open(zip_member(self._zip))
+            else:
+                self._stream = self._raw
+        except Exception:
+            self._raw.close()
+            raise
+
+    @property
+    def bytes_read(self) -> int:
+        """Compressed (on-disk) bytes consumed so far."""
+        return 0 if self._raw.closed else self._raw.tell()
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+    def read1(self, size=-1):
+        return self._stream.read(size)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._stream is not self._raw:
+                self._stream.close()
+            if self._zip is not None:
+                self._zip.close()
+        finally:
+            self._raw.close()
+            super().close()
+
+
+def open_upload_text(path: str):
+    """Text stream over an upload; utf-8-sig drops a leading BOM so the first header is "sku", not "﻿sku"."""
+    return io.TextIOWrapper(UploadReader(path), encoding="utf-8-sig", errors="ignore", newline="")
@@ -4,8 +4,41 @@ from pathlib import Path
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "postgresql://postgres:postgres@db:5432/postgres"
+    # Read replicas for the API's read-only endpoints (see app/replicas.py); comma-separated, empty = primary only
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_MAX_LAG_SECONDS: float = 5.0  # replicas further behind are skipped
+    REPLICA_LAG_CHECK_SECONDS: float = 2.0  # how long a replica's lag measurement is reused
+    READ_YOUR_WRITES_SECONDS: float = 10.0  # a client's reads stay on the primary this long after its own write
 
-    # Upstash Redis REST API credentials (for pub/sub messaging)
+    # Connection pools per role. Every API/worker process builds its own pools, so
+    # peak connections ~= processes * (pool_size + max_overflow) for each role in use.
+    DB_READ_POOL_SIZE: int = 10  # API read endpoints (async engine)
+    DB_READ_MAX_OVERFLOW: int = 10
+    DB_WRITE_POOL_SIZE: int = 5  # API mutations (CRUD, job bookkeeping)
+    DB_WRITE_MAX_OVERFLOW: int = 5
+    DB_IMPORT_POOL_SIZE: int = 1  # per Celery worker process; one import at a time
+    DB_IMPORT_MAX_OVERFLOW: int = 1
+    # Each import worker process also pools max(IMPORT_MERGE_PARALLELISM, REPLACE_INDEX_PARALLELISM)
+    # side connections (partition merges, replace index builds), no overflow
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    # statement_timeout per role in milliseconds (0 = server default / unlimited)
+    DB_READ_STATEMENT_TIMEOUT_MS: int = 15000
+    DB_WRITE_STATEMENT_TIMEOUT_MS: int = 0
+    DB_IMPORT_STATEMENT_TIMEOUT_MS: int = 0
+    # asyncpg server-side prepared statement cache (0 disables server-side prepares).
+    # psycopg2 interpolates client-side, so this only affects the async engines.
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    # Behind PgBouncer in transaction mode: no client-side pooling (NullPool), no
+    # server-side prepared statements, no startup options. Set statement_timeout on
+    # the database role instead (ALTER ROLE ... SET statement_timeout = ...).
+    DB_PGBOUNCER_MODE: bool = False
+
+    # API cold start, from importing app.app to serving (see benchmarks/bench_startup.py). FastAPI and
+    # SQLAlchemy alone take ~0.8s on one vCPU; 1.25s leaves the app ~0.4s, which eager Celery imports would blow
+    STARTUP_BUDGET_SECONDS: float = 1.25  # logged when exceeded; 0 disables the check
+
+    # Upstash Redis REST API credentials (for pub/sub messaging); optional, import progress isn't streamed without them
     UPSTASH_REDIS_REST_URL: str = ""
     UPSTASH_REDIS_REST_TOKEN: str = ""
 
@@ -16,12 +49,82 @@ class Settings(BaseSettings):
     CELERY_BROKER_URL: str = ""
     CELERY_RESULT_BACKEND: str = ""
 
+    # Celery routing: three queues so a long import never sits in front of a webhook.
+    #   imports  - import_csv_task (long-running, CPU and DB heavy)
+    #   webhooks - fire_event, deliver_webhook (short, network bound)
+    #   control  - ping_task and housekeeping
+    # Recommended worker topologies:
+    #   development: one worker on every queue (the default when -Q is omitted)
+    #       celery -A app.celery_worker.celery_app worker -c 2
+    #     fine for trying things out, but an import can still occupy every process.
+    #   single host: two workers, so imports and webhooks never share processes
+    #       celery -A app.celery_worker.celery_app worker -Q imports -c 1 -n imports@%h
+    #       celery -A app.celery_worker.celery_app worker -Q webhooks,control -P threads -c 16 -n webhooks@%h
+    #   scaled out: add imports workers (one process each, sized to DB_IMPORT_POOL_SIZE)
+    #     on import hosts; keep one or more threaded webhooks,control workers elsewhere.
+    CELERY_IMPORTS_QUEUE: str = "imports"
+    CELERY_WEBHOOKS_QUEUE: str = "webhooks"
+    CELERY_CONTROL_QUEUE: str = "control"
+    # Message priority within a queue, 0 (highest) to 9, as the Redis transport orders them
+    CELERY_CONTROL_PRIORITY: int = 0
+    CELERY_WEBHOOK_PRIORITY: int = 3
+    CELERY_IMPORT_PRIORITY: int = 6
+    # Concurrency limits enforced across all workers (0 = unlimited)
+    WEBHOOK_MAX_CONCURRENT_PER_HOST: int = 4  # deliveries in flight per receiving host
+    LIMIT_RETRY_SECONDS: int = 5  # how long a task waits before trying a full slot again
+    # Import admission (see app/admission.py); 0 = unlimited
+    IMPORT_MAX_CONCURRENT: int = 2  # running imports across all workers
+    IMPORT_MAX_CONCURRENT_PER_UPLOADER: int = 1  # running imports per uploader
+    IMPORT_UPLOADER_HEADER: str = "X-Uploader"  # identifies the uploader; falls back to the client address
+    IMPORT_STALE_SECONDS: int = 900  # a running job silent this long no longer blocks others
+
+    # Hash-partitioned products (see app/partitions.py)
+    IMPORT_MERGE_PARALLELISM: int = 4  # partitions an import batch is merged into at once
+
+    # mode=replace (see app/replace.py)
+    REPLACE_INDEX_PARALLELISM: int = 3  # indexes built at once on separate connections
+    REPLACE_MAINTENANCE_WORK_MEM: str = "256MB"  # per index build
+    REPLACE_SWAP_LOCK_TIMEOUT_MS: int = 2000  # max wait for the ACCESS EXCLUSIVE lock per attempt
+    REPLACE_SWAP_ATTEMPTS: int = 5
+    # Janitor (see app/janitor.py), run by Celery beat every JANITOR_INTERVAL_SECONDS
+    JANITOR_INTERVAL_SECONDS: int = 3600
+    UPLOAD_DIR: str = ""  # defaults to ./uploads under the working directory
+    UPLOAD_RETENTION_DAYS: float = 7  # failed/canceled uploads kept this long for retry
+    UPLOAD_QUOTA_BYTES: int = 20 * 1024 * 1024 * 1024  # evict oldest retry uploads/rejects above this (0 = no quota)
+    UPLOAD_ORPHAN_GRACE_SECONDS: int = 3600  # unreferenced files younger than this may be uploads in progress
+    # Opt-in profiling (see app/profiling.py)
+    PROFILE_TOKEN: str = ""  # requests carrying it in PROFILE_HEADER or ?_profile= are profiled; empty = off
+    PROFILE_HEADER: str = "X-Profile"
+    PROFILE_INTERVAL_MS: float = 5  # stack sampling interval
+    PROFILE_RETENTION_DAYS: float = 7  # the janitor removes older profiles
+    # gzip/brotli for API responses (see app/content_encoding.py); br needs the optional brotli package
+    RESPONSE_COMPRESSION: bool = True
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024  # smaller bodies are sent as-is
+    RESPONSE_GZIP_LEVEL: int = 5
+    RESPONSE_BROTLI_QUALITY: int = 4  # 0-11; higher costs far more CPU for little gain on JSON
+
     SECRET_KEY: str = "dev-secret"
     MAX_UPLOAD_BYTES: int = 5 * 1024 * 1024 * 1024  # 5GB, configurable
-    CSV_BATCH_SIZE: int = 5000  # tuneable
+    CSV_BATCH_SIZE: int = 5000  # initial rows per COPY batch; adapts at runtime within the bounds below
+    CSV_ADAPTIVE_BATCHING: bool = True
+    CSV_BATCH_MIN_ROWS: int = 500
+    CSV_BATCH_MAX_ROWS: int = 100000
+    CSV_BATCH_MAX_BYTES: int = 32 * 1024 * 1024  # flush early once the COPY buffer reaches this size
+    CSV_BATCH_TARGET_SECONDS: float = 2.0  # desired COPY + upsert time per batch
+    PRICE_DECIMAL_SEPARATOR: str = "."  # "," for feeds like "1.234,50"
+    CSV_PARSER_ENGINE: str = "auto"  # python | pyarrow | auto (pyarrow when installed)
+    # Byte-identical re-uploads of an already imported file: off | reuse | verify (see app/dedupe.py)
+    IMPORT_DEDUPE_MODE: str = "verify"
+    PROGRESS_WRITE_INTERVAL_SECONDS: float = 1.0  # min seconds between import_jobs progress UPDATEs
     WEBHOOK_TIMEOUT_SECONDS: int = 5
     WEBHOOK_MAX_RETRIES: int = 6
     WEBHOOK_SECRET: str = ""  # if set, we sign payloads with HMAC-SHA256
+    # Per-URL circuit breaker (see app/webhooks.py); 0 failures = no breaker
+    WEBHOOK_BREAKER_FAILURES: int = 5  # consecutive failures that open an endpoint's circuit
+    WEBHOOK_BREAKER_COOLDOWN_SECONDS: int = 60  # how long it stays open; doubles each time it re-opens
+    WEBHOOK_BREAKER_MAX_COOLDOWN_SECONDS: int = 3600
+    WEBHOOK_PARK_MAX_SECONDS: int = 86400  # deliveries parked behind an open circuit longer than this are dropped
+    WEBHOOK_DELIVERY_RETENTION_DAYS: float = 14  # the janitor prunes older webhook_deliveries rows
 
     class Config:
         # Load env from backend/.env regardless of current working directory
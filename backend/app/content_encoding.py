@@ -0,0 +1,125 @@
+# app/content_encoding.py
+"""
+Response compression (ASGI middleware): brotli when the client accepts it
+and the optional `brotli` package is installed, else gzip.
+
+Only text-like bodies of RESPONSE_COMPRESSION_MIN_BYTES or more are
+compressed. Responses that are already encoded, partial (206), or empty
+(204/304) pass through untouched. Streaming responses are compressed chunk
+by chunk, each flushed, so the client sees progress as it arrives.
+(Uploads are decompressed by app/compression.py; this is the other direction.)
+"""
+import zlib
+
+from starlette.datastructures import MutableHeaders
+
+from .config import settings
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def _accepted(header: str) -> set:
+    """Codings the client accepts (q > 0)."""
+    codings = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        codings.add(coding.strip().lower())
+    return codings
+
+
+class _Gzip:
+    name = "gzip"
+
+    def __init__(self):
+        self._z = zlib.compressobj(settings.RESPONSE_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        out = self._z.compress(data)
+        return out + self._z.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class _Brotli:
+    name = "br"
+
+    def __init__(self):
+        self._c = brotli.Compressor(quality=settings.RESPONSE_BROTLI_QUALITY)
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        out = self._c.process(data)
+        return out + (self._c.finish() if last else self._c.flush())
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    def _encoder(self, scope):
+        for name, value in scope.get("headers") or ():
+            if name == b"accept-encoding":
+                accepted = _accepted(value.decode("latin-1"))
+                if brotli is not None and "br" in accepted:
+                    return _Brotli
+                if "gzip" in accepted:
+                    return _Gzip
+                return None
+        return None
+
+    async def __call__(self, scope, receive, send):
+        encoder = self._encoder(scope) if scope["type"] == "http" else None
+        if encoder is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        state = {"coder": None, "passthrough": False}
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                headers = {k.lower(): v for k, v in message.get("headers", ())}
+                content_type = headers.get(b"content-type", b"").decode("latin-1").lower()
+                state["passthrough"] = (
+                    message["status"] in (204, 206, 304)
+                    or b"content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                )
+                if state["passthrough"]:
+                    await send(start)
+                return
+            if message["type"] != "http.response.body" or state["passthrough"]:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if state["coder"] is None:
+                if not more and len(body) < self.minimum_size:
+                    state["passthrough"] = True
+                    await send(start)
+                    return await send(message)
+                state["coder"] = encoder()
+                data = state["coder"].chunk(body, last=not more)
+                headers = MutableHeaders(scope=start)
+                headers["Content-Encoding"] = encoder.name
+                headers.add_vary_header("Accept-Encoding")
+                if more:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(data))
+                await send(start)
+                return await send({"type": "http.response.body", "body": data, "more_body": more})
+            await send({"type": "http.response.body", "body": state["coder"].chunk(body, last=not more), "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
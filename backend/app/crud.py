@@ -1,27 +1,278 @@
+from sqlalchemy import select, func, or_, update, type_coerce, exists
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from . import models
+from . import models, generations
+from .config import settings
+from .dedupe import dedupe_key
+from .progress import progress_percent
+from .admission import queue_estimates, throughput
 from datetime import datetime
 
-def create_import_job(db: Session, original_filename: str | None = None, file_path: str | None = None):
-    job = models.ImportJob(status="queued", original_filename=original_filename, file_path=file_path)
+# Column projections for read endpoints: rows come back as plain mappings,
+# skipping ORM identity-map hydration entirely.
+PRODUCT_COLUMNS = (
+    models.Product.id,
+    models.Product.sku,
+    models.Product.sku_lower,
+    models.Product.name,
+    models.Product.description,
+    models.Product.price_cents,
+    models.Product.attributes,
+    models.Product.active,
+    models.Product.created_at,
+    models.Product.updated_at,
+)
+
+IMPORT_JOB_COLUMNS = (
+    models.ImportJob.id,
+    models.ImportJob.status,
+    models.ImportJob.processed_rows,
+    models.ImportJob.total_rows,
+    models.ImportJob.processed_bytes,
+    models.ImportJob.total_bytes,
+    models.ImportJob.rejected_rows,
+    models.ImportJob.duplicate_of,
+    models.ImportJob.error,
+    models.ImportJob.original_filename,
+    models.ImportJob.mode,
+    models.ImportJob.uploader,
+    models.ImportJob.wait_reason,
+    models.ImportJob.started_at,
+    models.ImportJob.metrics,
+    models.ImportJob.created_at,
+    models.ImportJob.updated_at,
+)
+
+WEBHOOK_COLUMNS = (
+    models.Webhook.id,
+    models.Webhook.url,
+    models.Webhook.event,
+    models.Webhook.enabled,
+    models.Webhook.created_at,
+)
+
+WEBHOOK_DELIVERY_COLUMNS = (
+    models.WebhookDelivery.id,
+    models.WebhookDelivery.delivery_id,
+    models.WebhookDelivery.event,
+    models.WebhookDelivery.attempt,
+    models.WebhookDelivery.status,
+    models.WebhookDelivery.http_status,
+    models.WebhookDelivery.duration_ms,
+    models.WebhookDelivery.error,
+    models.WebhookDelivery.created_at,
+)
+
+def create_import_job(
+    db: Session,
+    original_filename: str | None = None,
+    file_path: str | None = None,
+    mode: str = "upsert",
+    options: dict | None = None,
+    uploader: str | None = None,
+):
+    job = models.ImportJob(
+        status="queued", original_filename=original_filename, file_path=file_path, mode=mode, options=options,
+        uploader=uploader,
+    )
     db.add(job)
+    db.flush()
+    generations.stage(db, generations.JOBS)
     db.commit()
     db.refresh(job)
     return job
 
+def update_import_job(db: Session, job_id: int, **fields) -> int:
+    """Single UPDATE for the given columns; no load/refresh round trips. Returns rows matched."""
+    fields["updated_at"] = datetime.utcnow()
+    result = db.execute(update(models.ImportJob).where(models.ImportJob.id == job_id).values(**fields))
+    generations.stage(db, generations.JOBS)
+    db.commit()
+    return result.rowcount
+
 def update_job_progress(db: Session, job_id: int, processed: int, total: int = None, status: str = None, error: str = None, file_path: str | None = None):
-    job = db.get(models.ImportJob, job_id)
-    if not job:
-        return None
+    fields = {"processed_rows": processed}
     if total is not None:
-        job.total_rows = total
-    job.processed_rows = processed
+        fields["total_rows"] = total
     if status:
-        job.status = status
+        fields["status"] = status
     if error:
-        job.error = error
+        fields["error"] = error
     if file_path is not None:
-        job.file_path = file_path
-    job.updated_at = datetime.utcnow()
-    db.add(job); db.commit(); db.refresh(job)
+        fields["file_path"] = file_path
+    return update_import_job(db, job_id, **fields)
+
+def get_import_job_fields(db: Session, job_id: int, *columns):
+    """Fetch just the named ImportJob columns as a mapping (None if missing)."""
+    cols = [getattr(models.ImportJob, c) for c in columns]
+    return db.execute(select(*cols).where(models.ImportJob.id == job_id)).mappings().first()
+
+def product_filters(q: str | None = None, sku: str | None = None, active: bool | None = None, attributes: dict | None = None) -> list:
+    conditions = []
+    if sku:
+        conditions.append(models.Product.sku_lower == sku.lower())
+    if q:
+        qlike = f"%{q}%"
+        conditions.append(or_(models.Product.name.ilike(qlike), models.Product.description.ilike(qlike)))
+    if active is not None:
+        conditions.append(models.Product.active == active)
+    if attributes and make_url(settings.DATABASE_URL).get_backend_name() == "postgresql":
+        # One `attributes @> {...}` for all keys, answered by the GIN index ix_products_attributes
+        conditions.append(type_coerce(models.Product.attributes, JSONB).contains(attributes))
+    elif attributes:
+        # SQLite has no @>: match each key among the object's json_each() entries (string values, like @>)
+        for key, value in attributes.items():
+            entries = func.json_each(models.Product.attributes).table_valued("key", "value")
+            conditions.append(exists(select(1).select_from(entries).where(entries.c.key == key, entries.c.value == value)))
+    return conditions
+
+def _products_page_statements(q: str | None, sku: str | None, active: bool | None, page: int, per_page: int, attributes: dict | None = None):
+    conditions = product_filters(q=q, sku=sku, active=active, attributes=attributes)
+    count_stmt = select(func.count()).select_from(models.Product).where(*conditions)
+    page_stmt = (
+        select(*PRODUCT_COLUMNS)
+        .where(*conditions)
+        .order_by(models.Product.id.desc())
+        .offset((page - 1) * per_page)
+        .limit(per_page)
+    )
+    return count_stmt, page_stmt
+
+def _import_jobs_statement(limit: int):
+    return select(*IMPORT_JOB_COLUMNS).order_by(models.ImportJob.created_at.desc()).limit(limit)
+
+def _import_job_dict(r, estimates: dict | None = None) -> dict:
+    job = dict(r)
+    job["percent"] = progress_percent(
+        job["processed_rows"], job["total_rows"], job["processed_bytes"], job["total_bytes"]
+    )
+    job.update((estimates or {}).get(job["id"], {"queue_position": None, "eta_seconds": None}))
     return job
+
+def _queue_statements():
+    """Queued/running jobs and recent completed imports: the inputs of admission.queue_estimates()."""
+    active = select(
+        models.ImportJob.id,
+        models.ImportJob.status,
+        models.ImportJob.total_bytes,
+        models.ImportJob.processed_bytes,
+        models.ImportJob.started_at,
+    ).where(models.ImportJob.status.in_(("queued", "running")))
+    recent = (
+        select(models.ImportJob.total_bytes, models.ImportJob.started_at, models.ImportJob.updated_at)
+        .where(models.ImportJob.status == "complete", models.ImportJob.started_at.is_not(None))
+        .order_by(models.ImportJob.id.desc())
+        .limit(20)
+    )
+    return active, recent
+
+def _stats_statement():
+    return select(
+        select(func.count()).select_from(models.Product).scalar_subquery().label("total_products"),
+        select(func.count()).select_from(models.ImportJob)
+            .where(models.ImportJob.status == "complete").scalar_subquery().label("recent_uploads"),
+        select(func.count()).select_from(models.Webhook)
+            .where(models.Webhook.enabled == True).scalar_subquery().label("active_webhooks"),
+    )
+
+def list_products(db: Session, q: str | None = None, sku: str | None = None, active: bool | None = None, page: int = 1, per_page: int = 50, attributes: dict | None = None):
+    """Return (total, rows) for a product page using a column-projected Core query."""
+    count_stmt, page_stmt = _products_page_statements(q, sku, active, page, per_page, attributes)
+    total = db.execute(count_stmt).scalar_one()
+    return total, [dict(r) for r in db.execute(page_stmt).mappings()]
+
+def list_import_jobs(db: Session, limit: int = 10):
+    active_stmt, recent_stmt = _queue_statements()
+    estimates = queue_estimates(
+        db.execute(active_stmt).mappings().all(), throughput(db.execute(recent_stmt).mappings().all())
+    )
+    return [_import_job_dict(r, estimates) for r in db.execute(_import_jobs_statement(limit)).mappings()]
+
+def list_webhooks(db: Session):
+    return [dict(r) for r in db.execute(select(*WEBHOOK_COLUMNS)).mappings()]
+
+# Async variants used by the API's hot read paths (same statements, AsyncSession)
+
+async def list_products_async(db: AsyncSession, q: str | None = None, sku: str | None = None, active: bool | None = None, page: int = 1, per_page: int = 50, attributes: dict | None = None):
+    count_stmt, page_stmt = _products_page_statements(q, sku, active, page, per_page, attributes)
+    total = (await db.execute(count_stmt)).scalar_one()
+    return total, [dict(r) for r in (await db.execute(page_stmt)).mappings()]
+
+async def list_import_jobs_async(db: AsyncSession, limit: int = 10):
+    active_stmt, recent_stmt = _queue_statements()
+    estimates = queue_estimates(
+        (await db.execute(active_stmt)).mappings().all(), throughput((await db.execute(recent_stmt)).mappings().all())
+    )
+    return [_import_job_dict(r, estimates) for r in (await db.execute(_import_jobs_statement(limit))).mappings()]
+
+async def list_webhooks_async(db: AsyncSession):
+    return [dict(r) for r in (await db.execute(select(*WEBHOOK_COLUMNS))).mappings()]
+
+async def list_webhook_deliveries_async(db: AsyncSession, webhook_id: int, limit: int = 50):
+    stmt = (
+        select(*WEBHOOK_DELIVERY_COLUMNS)
+        .where(models.WebhookDelivery.webhook_id == webhook_id)
+        .order_by(models.WebhookDelivery.id.desc())
+        .limit(limit)
+    )
+    return [dict(r) for r in (await db.execute(stmt)).mappings()]
+
+async def get_stats_async(db: AsyncSession) -> dict:
+    """All three dashboard counters in a single round trip."""
+    return dict((await db.execute(_stats_statement())).mappings().one())
+
+async def create_import_job_async(
+    db: AsyncSession,
+    original_filename: str | None = None,
+    file_path: str | None = None,
+    mode: str = "upsert",
+    options: dict | None = None,
+    uploader: str | None = None,
+):
+    job = models.ImportJob(
+        status="queued", original_filename=original_filename, file_path=file_path, mode=mode, options=options,
+        uploader=uploader,
+    )
+    db.add(job)
+    await db.flush()
+    await generations.stage_async(db, generations.JOBS)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+async def find_completed_import_async(
+    db: AsyncSession, content_sha256: str, mode: str, options: dict | None, exclude_id: int | None = None
+):
+    """Latest successfully completed job for the same upload bytes, mode and options, as a mapping (None if none)."""
+    stmt = (
+        select(
+            models.ImportJob.id,
+            models.ImportJob.total_rows,
+            models.ImportJob.rejected_rows,
+            models.ImportJob.rejects_path,
+            models.ImportJob.metrics,
+            models.ImportJob.options,
+        )
+        .where(
+            models.ImportJob.content_sha256 == content_sha256,
+            models.ImportJob.status == "complete",
+            func.coalesce(models.ImportJob.mode, "upsert") == (mode or "upsert"),
+        )
+        .order_by(models.ImportJob.id.desc())
+    )
+    if exclude_id is not None:
+        stmt = stmt.where(models.ImportJob.id != exclude_id)
+    key = dedupe_key(mode, options)
+    for row in (await db.execute(stmt)).mappings():
+        if dedupe_key(mode, row["options"]) == key:
+            return row
+    return None
+
+async def update_import_job_async(db: AsyncSession, job_id: int, **fields):
+    """Single UPDATE for the given columns; no load/refresh round trips."""
+    fields["updated_at"] = datetime.utcnow()
+    await db.execute(update(models.ImportJob).where(models.ImportJob.id == job_id).values(**fields))
+    await generations.stage_async(db, generations.JOBS)
+    await db.commit()
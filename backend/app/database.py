@@ -1,6 +1,96 @@
+import uuid
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from .config import settings
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True, future=True)
+
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its asyncio driver (asyncpg / aiosqlite)."""
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend == "postgresql":
+        query = dict(u.query)
+        # asyncpg takes `ssl` instead of libpq's `sslmode` and rejects libpq-only options
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        query.pop("channel_binding", None)
+        u = u.set(drivername="postgresql+asyncpg", query=query)
+    elif backend == "sqlite":
+        u = u.set(drivername="sqlite+aiosqlite")
+    return u.render_as_string(hide_password=False)
+
+
+def engine_options(pool_size: int, max_overflow: int, statement_timeout_ms: int = 0, use_async: bool = False) -> dict:
+    """Keyword arguments for create_engine/create_async_engine for one connection role."""
+    options = {"pool_pre_ping": True}
+    if make_url(settings.DATABASE_URL).get_backend_name() != "postgresql":
+        # SQLite and friends keep their dialect's default pool
+        return options
+
+    connect_args = {}
+    if settings.DB_PGBOUNCER_MODE:
+        # PgBouncer owns pooling; transaction mode can't keep per-session prepared statements
+        options["poolclass"] = NullPool
+        if use_async:
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+    else:
+        options.update(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        )
+        if use_async:
+            connect_args["prepared_statement_cache_size"] = settings.DB_PREPARED_STATEMENT_CACHE_SIZE
+            if not settings.DB_PREPARED_STATEMENT_CACHE_SIZE:
+                connect_args["statement_cache_size"] = 0
+            if statement_timeout_ms:
+                connect_args["server_settings"] = {"statement_timeout": str(statement_timeout_ms)}
+        elif statement_timeout_ms:
+            connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+# API writes (CRUD, job bookkeeping) and general-purpose sync access
+engine = create_engine(
+    settings.DATABASE_URL,
+    future=True,
+    **engine_options(settings.DB_WRITE_POOL_SIZE, settings.DB_WRITE_MAX_OVERFLOW, settings.DB_WRITE_STATEMENT_TIMEOUT_MS),
+)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
+
+# Bulk import (COPY + upsert) and schema maintenance; separate pool so imports can't starve the API
+import_engine = create_engine(
+    settings.DATABASE_URL,
+    future=True,
+    **engine_options(settings.DB_IMPORT_POOL_SIZE, settings.DB_IMPORT_MAX_OVERFLOW, settings.DB_IMPORT_STATEMENT_TIMEOUT_MS),
+)
+ImportSessionLocal = sessionmaker(bind=import_engine, autocommit=False, autoflush=False, future=True)
+
+# An import's side connections: PartitionMerger's per-partition merges, mode=replace's parallel index builds
+import_side_engine = create_engine(
+    settings.DATABASE_URL,
+    future=True,
+    **engine_options(max(settings.IMPORT_MERGE_PARALLELISM, settings.REPLACE_INDEX_PARALLELISM), 0),
+)
+
+# API reads
+async_engine = create_async_engine(
+    to_async_url(settings.DATABASE_URL),
+    **engine_options(settings.DB_READ_POOL_SIZE, settings.DB_READ_MAX_OVERFLOW, settings.DB_READ_STATEMENT_TIMEOUT_MS, use_async=True),
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# API writes issued from async endpoints (upload bookkeeping)
+async_write_engine = create_async_engine(
+    to_async_url(settings.DATABASE_URL),
+    **engine_options(settings.DB_WRITE_POOL_SIZE, settings.DB_WRITE_MAX_OVERFLOW, settings.DB_WRITE_STATEMENT_TIMEOUT_MS, use_async=True),
+)
+AsyncWriteSessionLocal = async_sessionmaker(bind=async_write_engine, autoflush=False, expire_on_commit=False)
@@ -0,0 +1,74 @@
+# app/dedupe.py
+"""
+Re-upload deduplication by content hash.
+
+upload_csv hashes the stored bytes (SHA-256) as they are written. When a
+byte-identical file has already been imported successfully with the same mode
+and options (the same upload as replace can remove rows an upsert kept, and
+deactivate_missing changes what a delta does), IMPORT_DEDUPE_MODE decides what
+happens:
+
+  off     always import
+  reuse   complete the new job immediately with the prior job's result,
+          without queueing any work
+  verify  queue the job, but the worker first compares a cheap snapshot of
+          `products` (row count, latest updated_at) with the one taken when
+          the prior import finished; if nothing changed since, re-importing
+          would be a no-op and the prior result is reused, otherwise the
+          file is imported normally
+"""
+import os
+import shutil
+
+DEDUPE_MODES = ("off", "reuse", "verify")
+
+# Job options that don't change what an import writes
+_NEUTRAL_OPTIONS = ("profile",)
+
+SNAPSHOT_SQL = "SELECT count(*), max(updated_at) FROM products"
+
+
+def dedupe_key(mode: str | None, options: dict | None) -> tuple:
+    """Besides the bytes, what a prior import must share to count as the same upload."""
+    options = {k: v for k, v in (options or {}).items() if k not in _NEUTRAL_OPTIONS}
+    return mode or "upsert", sorted(options.items())
+
+
+def products_snapshot(cur) -> dict:
+    """Row count and latest updated_at of products (one scan, no per-row work)."""
+    cur.execute(SNAPSHOT_SQL)
+    count, max_updated_at = cur.fetchone()
+    return {"products": count, "max_updated_at": max_updated_at.isoformat() if max_updated_at else None}
+
+
+def snapshot_matches(cur, prior_metrics: dict | None) -> bool:
+    """True if products look exactly as they did when the prior import completed."""
+    snapshot = (prior_metrics or {}).get("snapshot")
+    return bool(snapshot) and products_snapshot(cur) == snapshot
+
+
+def duplicate_result(prior: dict, mode: str, rejects_path: str | None) -> dict:
+    """
+    ImportJob fields that complete a job with a prior job's result. The prior
+    rejects file is copied to rejects_path so deleting either job keeps the other's.
+    """
+    copied = None
+    if prior.get("rejects_path") and rejects_path:
+        try:
+            os.makedirs(os.path.dirname(rejects_path), exist_ok=True)
+            shutil.copyfile(prior["rejects_path"], rejects_path)
+            copied = rejects_path
+        except OSError:
+            pass
+    metrics = dict(prior.get("metrics") or {})
+    metrics["dedupe"] = {"duplicate_of": prior["id"], "mode": mode}
+    return {
+        "status": "complete",
+        "error": None,
+        "duplicate_of": prior["id"],
+        "total_rows": prior["total_rows"],
+        "processed_rows": prior["total_rows"],
+        "rejected_rows": prior["rejected_rows"],
+        "rejects_path": copied,
+        "metrics": metrics,
+    }
@@ -0,0 +1,154 @@
+# app/fingerprints.py
+"""
+Per-SKU fingerprint index for delta imports.
+
+A delta import (mode=delta) keeps a compact local index of the last successful
+delta import: a SQLite table sku_lower -> 64-bit digest of the row as it was
+loaded. The next feed is streamed against it and only new or changed rows are
+sent to COPY; unchanged rows never reach Postgres.
+
+The index is only trusted while `products` looks exactly as it did when the
+index was written (same snapshot as dedupe.py uses); any other write since
+(API edits, a regular import) makes the next delta import load every row and
+rebuild the index. Imports hold a Postgres advisory lock on PRODUCTS_LOCK_KEY
+(shared for regular imports, exclusive for delta imports) so no regular import
+can interleave with a delta import and leave the index stale.
+"""
+import hashlib
+import os
+import sqlite3
+
+from .parsers import clean_text, copy_field
+
+# pg_advisory_lock key serializing delta imports against other imports
+PRODUCTS_LOCK_KEY = 0x70726F64
+
+_SCHEMA = """
+CREATE TABLE fingerprints (sku_lower TEXT PRIMARY KEY, digest INTEGER) WITHOUT ROWID;
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def index_path_for(file_path: str) -> str:
+    """The index lives beside the uploads, like the rejects files."""
+    return os.path.join(os.path.dirname(os.path.abspath(file_path)), "fingerprints", "products.sqlite3")
+
+
+def sku_key(copy_sku: str) -> str:
+    """The index key of a SKU as written in a COPY block: products.sku_lower of the row once loaded."""
+    return copy_field(copy_sku).lower()
+
+
+def row_digest(line: str) -> int:
+    """Signed 64-bit digest of a COPY line (sku casing, name, description, price, attributes)."""
+    return int.from_bytes(hashlib.blake2b(line.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+class FingerprintIndex:
+    """
+    Builds the next index while filtering a feed against the previous one.
+
+    Usage: begin(snapshot) -> filter_block() per COPY block -> commit(snapshot),
+    or discard() on failure. The previous index is only replaced on commit.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tmp_path = f"{path}.{os.getpid()}.tmp"
+        self._db = None
+        self.baseline = False  # whether a trusted previous index is being diffed against
+        self.unchanged = 0
+        self.changed = 0
+
+    def begin(self, snapshot: dict):
+        """Start a new index; diff against the previous one only if it was written at this products snapshot."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+        self._db = sqlite3.connect(self._tmp_path, isolation_level=None, uri=True)
+        self._db.execute("PRAGMA journal_mode = OFF")
+        self._db.execute("PRAGMA synchronous = OFF")
+        self._db.executescript(_SCHEMA)
+        self._db.execute("CREATE TEMP TABLE block (pos INTEGER PRIMARY KEY, sku_lower TEXT, digest INTEGER)")
+        if os.path.exists(self.path):
+            try:
+                self._db.execute("ATTACH DATABASE ? AS prev", (f"file:{self.path}?mode=ro",))
+                row = self._db.execute("SELECT value FROM prev.meta WHERE key = 'snapshot'").fetchone()
+                self.baseline = row is not None and row[0] == _snapshot_key(snapshot)
+            except sqlite3.Error:
+                self.baseline = False
+        self._db.execute("BEGIN")
+
+    def filter_block(self, block_text: str) -> tuple[str, int]:
+        """Record every row of a COPY block; return (text, rows) of just the new or changed ones."""
+        lines = block_text.split("\n")[:-1]
+        total = len(lines)
+        if not total:
+            return "", 0
+        self._db.executemany(
+            "INSERT INTO temp.block VALUES (?, ?, ?)",
+            ((pos, sku_key(line.split("\t", 1)[0]), row_digest(line)) for pos, line in enumerate(lines)),
+        )
+        if self.baseline:
+            # Changed = digest differs from the previous index, or the SKU repeats within this
+            # feed (the last occurrence has to win in Postgres, so repeats always load)
+            positions = [pos for (pos,) in self._db.execute(
+                """
+                SELECT b.pos FROM temp.block b
+                LEFT JOIN prev.fingerprints p ON p.sku_lower = b.sku_lower
+                WHERE p.digest IS NOT b.digest
+                   OR b.sku_lower IN (SELECT sku_lower FROM main.fingerprints)
+                   OR b.sku_lower IN (SELECT sku_lower FROM temp.block GROUP BY sku_lower HAVING count(*) > 1)
+                ORDER BY b.pos
+                """
+            )]
+            lines = [lines[pos] for pos in positions]
+        self._db.execute(
+            "INSERT OR REPLACE INTO main.fingerprints SELECT sku_lower, digest FROM temp.block ORDER BY pos"
+        )
+        self._db.execute("DELETE FROM temp.block")
+        self.unchanged += total - len(lines)
+        self.changed += len(lines)
+        return "".join(line + "\n" for line in lines), len(lines)
+
+    def forget(self, sku):
+        """
+        Keep a SKU present (so it isn't treated as missing) but force it to load next time.
+        `sku` is a rejected row's: the CSV value, or the COPY field for rows the database refused.
+        """
+        key = sku_key(clean_text(sku).strip())
+        if key and self._db is not None:
+            self._db.execute("INSERT OR REPLACE INTO main.fingerprints VALUES (?, NULL)", (key,))
+
+    def missing(self, rows) -> list:
+        """ids from (id, sku_lower) products rows whose SKU is not in the feed being indexed."""
+        self._db.executemany("INSERT INTO temp.block (pos, sku_lower) VALUES (?, ?)", rows)
+        ids = [i for (i,) in self._db.execute(
+            "SELECT pos FROM temp.block WHERE sku_lower NOT IN (SELECT sku_lower FROM main.fingerprints)"
+        )]
+        self._db.execute("DELETE FROM temp.block")
+        return ids
+
+    def commit(self, snapshot: dict):
+        """Stamp the new index with the products snapshot after the import and make it current."""
+        self._db.execute("INSERT INTO main.meta VALUES ('snapshot', ?)", (_snapshot_key(snapshot),))
+        self._db.execute("COMMIT")
+        self._db.close()
+        self._db = None
+        os.replace(self._tmp_path, self.path)
+
+    def discard(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+    def metrics(self) -> dict:
+        return {"baseline": self.baseline, "changed": self.changed, "unchanged": self.unchanged}
+
+
+def _snapshot_key(snapshot: dict) -> str:
+    return f"{snapshot.get('products')}|{snapshot.get('max_updated_at')}"
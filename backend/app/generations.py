@@ -0,0 +1,108 @@
+# app/generations.py
+"""
+Change counters behind the ETags of the dashboard's polled endpoints
+(GET /products, /import-jobs, /stats).
+
+cache_generations holds one counter per resource: catalog (products), jobs
+(import_jobs) and webhooks. Whoever changes a resource bumps its counter
+in the same transaction (stage) or *after* committing (bump), and readers
+read the counters *before* the rows. So a
+response can be newer than its ETag, which is harmless: it is refetched
+after the bump. It is never older, so a 304 can't hide a committed change.
+Between a commit and its bump, a client may briefly get 304 for the old
+data.
+
+Imports write products and job progress continuously from the worker.
+Instead of bumping on every batch, no ETag is issued while any import is
+queued or running (one lookup on the ix_import_jobs_active partial index),
+and the worker bumps catalog and jobs once when the import ends. A job
+silent for IMPORT_STALE_SECONDS no longer counts (live imports write
+progress or a heartbeat well within that), so one orphaned row can't turn
+conditional GETs off for good.
+
+ETags are weak (W/"..."), since compression changes the bytes. Bump
+ETAG_VERSION when a response's shape changes, so clients don't keep the old
+shape on a 304.
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import exists, select, update
+
+from . import models
+from .config import settings
+
+ETAG_VERSION = "1"
+CATALOG = "catalog"
+JOBS = "jobs"
+WEBHOOKS = "webhooks"
+ACTIVE_IMPORT_STATUSES = ("queued", "running")
+
+
+def _bump_statement(names):
+    return (
+        update(models.CacheGeneration)
+        .where(models.CacheGeneration.name.in_(names))
+        .values(value=models.CacheGeneration.value + 1)
+    )
+
+
+def stage(db, *names):
+    """Advance the counters inside the caller's transaction, so they commit with the change itself."""
+    db.execute(_bump_statement(names))
+
+
+async def stage_async(db, *names):
+    await db.execute(_bump_statement(names))
+
+
+def bump(db, *names):
+    """Advance the counters in their own transaction; call after the change has been committed."""
+    try:
+        db.execute(_bump_statement(names))
+        db.commit()
+    except Exception:
+        db.rollback()  # a missed bump only delays revalidation until the next one
+
+
+async def bump_async(db, *names):
+    try:
+        await db.execute(_bump_statement(names))
+        await db.commit()
+    except Exception:
+        await db.rollback()
+
+
+def bump_raw(conn, *names):
+    """bump() on a DB-API connection (the import worker's); commits."""
+    cur = conn.cursor()
+    try:
+        cur.execute("UPDATE cache_generations SET value = value + 1 WHERE name = ANY(%s)", (list(names),))
+        conn.commit()
+    finally:
+        cur.close()
+
+
+async def etag_async(db, *names) -> str | None:
+    """Weak ETag over the named counters, or None while an import is active (or the counters are missing)."""
+    silent_since = datetime.now(timezone.utc) - timedelta(seconds=settings.IMPORT_STALE_SECONDS)
+    busy = exists().where(
+        models.ImportJob.status.in_(ACTIVE_IMPORT_STATUSES), models.ImportJob.updated_at > silent_since
+    )
+    rows = (await db.execute(
+        select(models.CacheGeneration.name, models.CacheGeneration.value, busy.label("busy"))
+        .where(models.CacheGeneration.name.in_(names))
+    )).all()
+    values = {name: value for name, value, _ in rows}
+    if len(values) != len(names) or any(row.busy for row in rows):
+        return None
+    return 'W/"' + "-".join([ETAG_VERSION, *(str(values[name]) for name in names)]) + '"'
+
+
+def not_modified(if_none_match: str | None, etag: str | None) -> bool:
+    """If-None-Match matches the current ETag (weak comparison)."""
+    if not etag or not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == current for tag in if_none_match.split(","))
@@ -0,0 +1,227 @@
+# app/janitor.py
+"""
+Periodic cleanup of what imports leave behind (run by Celery beat; see
+janitor_task in tasks.py).
+
+Staging tables: every import COPYs into its own UNLOGGED
+`staging_products_{job}_{hex}` table (and replace imports build a
+`products_shadow_{job}_{hex}`, partitioned like products). A worker that is
+killed (or loses its connection) never drops them. A staging table is orphaned when its job is gone,
+no longer running, or running but silent for IMPORT_STALE_SECONDS, and no worker holds the job's
+slot lease (limits.py; a live import renews it through phases that write no progress).
+
+Upload directory:
+  - upload files of queued/running/paused jobs are never touched
+  - failed/canceled jobs keep their upload for retry for UPLOAD_RETENTION_DAYS
+  - files no job refers to (deleted jobs, interrupted uploads, temp indexes
+    of crashed delta imports) go once older than UPLOAD_ORPHAN_GRACE_SECONDS
+  - above UPLOAD_QUOTA_BYTES, the oldest retry uploads and rejects files of
+    finished jobs are removed until the directory fits
+
+Removed files are also cleared from their job row, so retry and the rejects
+download report them as gone rather than failing on a missing path.
+
+Profiles (see profiling.py) go after PROFILE_RETENTION_DAYS; they aren't
+counted against the quota.
+
+Webhook delivery log: rows older than WEBHOOK_DELIVERY_RETENTION_DAYS.
+"""
+import os
+import re
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from .config import settings
+from .limits import lease_held
+
+STAGING_TABLE = re.compile(r"^(?:staging_products|products_shadow)_(\d+)_[0-9a-f]{8}$")
+ACTIVE_STATUSES = ("queued", "running", "paused")
+FINISHED_STATUSES = ("failed", "canceled")
+PROFILES_SUBDIR = "profiles"
+
+
+def upload_dir() -> str:
+    return os.path.abspath(settings.UPLOAD_DIR or os.path.join(os.getcwd(), "uploads"))
+
+
+def _age_seconds(ts, now: datetime) -> float:
+    if ts is None:
+        return float("inf")
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return (now - ts).total_seconds()
+
+
+def sweep_staging(db, dry_run: bool = False) -> dict:
+    """Drop staging tables whose import is no longer running. Returns names and bytes reclaimed."""
+    tables = db.execute(text(
+        r"""
+        SELECT c.relname, (SELECT sum(pg_total_relation_size(t.relid)) FROM pg_partition_tree(c.oid) t)
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p') AND NOT c.relispartition AND n.nspname = current_schema()
+          AND (c.relname LIKE 'staging\_products\_%' OR c.relname LIKE 'products\_shadow\_%')
+        """
+    )).all()
+    job_ids = {int(m.group(1)) for name, _ in tables if (m := STAGING_TABLE.match(name))}
+    live = set()
+    if job_ids:
+        live = set(db.execute(
+            text(
+                "SELECT id FROM import_jobs WHERE id = ANY(:ids) AND status = 'running' "
+                "AND updated_at > CURRENT_TIMESTAMP - make_interval(secs => :stale)"
+            ),
+            {"ids": list(job_ids), "stale": settings.IMPORT_STALE_SECONDS},
+        ).scalars())
+    # Silent in the database isn't dead: the replace build and deactivation write no progress for a while
+    live |= {job_id for job_id in job_ids - live if lease_held(f"import-job:{job_id}")}
+    dropped, reclaimed = [], 0
+    for name, size in tables:
+        m = STAGING_TABLE.match(name)
+        if m is None or int(m.group(1)) in live:
+            continue
+        if not dry_run:
+            # Don't queue behind a lock held by an import that's still alive after all
+            db.execute(text("SET LOCAL lock_timeout = '2s'"))
+            try:
+                db.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+                db.commit()
+            except Exception:
+                db.rollback()
+                continue
+        dropped.append(name)
+        reclaimed += size or 0
+    return {"dropped": dropped, "bytes": reclaimed}
+
+
+def _upload_files(root: str) -> list:
+    """(path, size, mtime) of uploads, rejects files and temp fingerprint indexes."""
+    files = []
+    for sub in ("", "rejects", "fingerprints"):
+        folder = os.path.join(root, sub)
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            continue
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            if sub == "fingerprints" and not entry.name.endswith(".tmp"):
+                continue  # the live index is rebuilt by the next delta import if lost, but costs a full load
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            files.append((os.path.abspath(entry.path), st.st_size, st.st_mtime))
+    return files
+
+
+def sweep_uploads(db, dry_run: bool = False) -> dict:
+    """Apply upload retention and quota. Returns counts and bytes reclaimed."""
+    now = datetime.now(timezone.utc)
+    rows = db.execute(text(
+        "SELECT id, status, file_path, rejects_path, updated_at FROM import_jobs "
+        "WHERE file_path IS NOT NULL OR rejects_path IS NOT NULL"
+    )).mappings().all()
+    owners = {}
+    for r in rows:
+        for column in ("file_path", "rejects_path"):
+            if r[column]:
+                owners[os.path.abspath(r[column])] = (column, r)
+
+    keep, remove, evictable = [], [], []
+    for path, size, mtime in _upload_files(upload_dir()):
+        owner = owners.get(path)
+        if owner is None:
+            if now.timestamp() - mtime > settings.UPLOAD_ORPHAN_GRACE_SECONDS:
+                remove.append((path, size, None))
+            else:
+                keep.append(size)
+            continue
+        column, job = owner
+        if job["status"] in ACTIVE_STATUSES:
+            keep.append(size)
+        elif column == "file_path" and (
+            job["status"] not in FINISHED_STATUSES
+            or _age_seconds(job["updated_at"], now) > settings.UPLOAD_RETENTION_DAYS * 86400
+        ):
+            # Completed jobs' uploads are normally removed by the import itself
+            remove.append((path, size, owner))
+        else:
+            evictable.append((mtime, path, size, owner))
+
+    retained = sum(keep) + sum(size for _, _, size, _ in evictable)
+    if settings.UPLOAD_QUOTA_BYTES and retained > settings.UPLOAD_QUOTA_BYTES:
+        for _, path, size, owner in sorted(evictable):
+            if retained <= settings.UPLOAD_QUOTA_BYTES:
+                break
+            remove.append((path, size, owner))
+            retained -= size
+
+    deleted, reclaimed = 0, 0
+    for path, size, owner in remove:
+        if not dry_run:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            if owner is not None:
+                column, job = owner
+                db.execute(text(f"UPDATE import_jobs SET {column} = NULL WHERE id = :id"), {"id": job["id"]})
+        deleted += 1
+        reclaimed += size
+    if not dry_run:
+        db.commit()
+    return {"deleted": deleted, "bytes": reclaimed, "retained_bytes": retained}
+
+
+def sweep_profiles(dry_run: bool = False) -> int:
+    """Remove profile files older than PROFILE_RETENTION_DAYS; returns how many."""
+    cutoff = datetime.now(timezone.utc).timestamp() - settings.PROFILE_RETENTION_DAYS * 86400
+    deleted = 0
+    try:
+        entries = list(os.scandir(os.path.join(upload_dir(), PROFILES_SUBDIR)))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if not entry.is_file() or entry.stat().st_mtime > cutoff:
+                continue
+            if not dry_run:
+                os.remove(entry.path)
+        except OSError:
+            continue
+        deleted += 1
+    return deleted
+
+
+def sweep_deliveries(db, dry_run: bool = False) -> int:
+    """Remove webhook_deliveries rows past WEBHOOK_DELIVERY_RETENTION_DAYS; returns how many."""
+    cutoff = {"days": settings.WEBHOOK_DELIVERY_RETENTION_DAYS}
+    where = "created_at < CURRENT_TIMESTAMP - make_interval(secs => :days * 86400)"
+    if dry_run:
+        return db.execute(text(f"SELECT count(*) FROM webhook_deliveries WHERE {where}"), cutoff).scalar_one()
+    deleted = db.execute(text(f"DELETE FROM webhook_deliveries WHERE {where}"), cutoff).rowcount
+    db.commit()
+    return deleted
+
+
+def run(db, dry_run: bool = False) -> dict:
+    """One janitor pass: orphaned staging tables, the upload directory and profiles, then the webhook delivery log."""
+    staging = sweep_staging(db, dry_run)
+    uploads = sweep_uploads(db, dry_run)
+    profiles = sweep_profiles(dry_run)
+    deliveries = sweep_deliveries(db, dry_run)
+    return {
+        "dry_run": dry_run,
+        "staging_tables_dropped": staging["dropped"],
+        "staging_bytes_reclaimed": staging["bytes"],
+        "uploads_deleted": uploads["deleted"],
+        "upload_bytes_reclaimed": uploads["bytes"],
+        "upload_bytes_retained": uploads["retained_bytes"],
+        "bytes_reclaimed": staging["bytes"] + uploads["bytes"],
+        "profiles_deleted": profiles,
+        "webhook_deliveries_deleted": deliveries,
+    }
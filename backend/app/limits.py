@@ -0,0 +1,121 @@
+# app/limits.py
+"""
+Cross-worker concurrency limits, kept in the broker's Redis.
+
+A limit is a sorted set of holder tokens scored by lease expiry. Acquiring
+prunes expired leases and adds a token only while fewer than `limit` are held
+(one Lua script, so it's atomic across workers). Leases expire on their own, so
+a killed worker can't hold a slot forever; long holders renew() or keep_alive().
+When the broker isn't Redis (memory:// in dev), limits are not enforced.
+"""
+import ssl
+import threading
+import time
+import uuid
+
+from .config import settings
+
+_ACQUIRE = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+  redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+  redis.call('PEXPIRE', KEYS[1], ARGV[5])
+  return 1
+end
+return 0
+"""
+
+_client = None
+
+
+def redis_client():
+    global _client
+    if _client is None:
+        url = settings.CELERY_BROKER_URL or settings.REDIS_URL
+        if not url.startswith(("redis://", "rediss://")):
+            _client = False
+        else:
+            import redis
+
+            kwargs = {"ssl_cert_reqs": ssl.CERT_NONE} if url.startswith("rediss://") else {}
+            _client = redis.Redis.from_url(url, **kwargs)
+    return _client or None
+
+
+def lease_held(name: str) -> bool | None:
+    """Whether anyone holds an unexpired lease on a named limit; None without Redis (unknown)."""
+    client = redis_client()
+    if client is None:
+        return None
+    return bool(client.zcount(f"limit:{name}", time.time(), "+inf"))
+
+
+class Slot:
+    """One lease on a named limit: `with Slot(...) as acquired:` or acquire()/release()."""
+
+    def __init__(self, name: str, limit: int, lease_seconds: float):
+        self.key = f"limit:{name}"
+        self.limit = limit
+        self.lease_seconds = lease_seconds
+        self.token = uuid.uuid4().hex
+        self.acquired = False
+        self._renewed_at = 0.0
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def acquire(self) -> bool:
+        client = redis_client()
+        if client is None or self.limit <= 0:
+            self.acquired = True
+            return True
+        now = time.time()
+        self.acquired = bool(client.eval(
+            _ACQUIRE, 1, self.key,
+            now, self.limit, now + self.lease_seconds, self.token, int(self.lease_seconds * 1000) * 2,
+        ))
+        self._renewed_at = now
+        return self.acquired
+
+    def renew(self, min_interval: float = 30.0):
+        """Push the lease out again (throttled); call periodically while holding the slot."""
+        client = redis_client()
+        now = time.time()
+        if client is None or not self.acquired or now - self._renewed_at < min_interval:
+            return
+        client.zadd(self.key, {self.token: now + self.lease_seconds}, xx=True)
+        client.pexpire(self.key, int(self.lease_seconds * 1000) * 2)
+        self._renewed_at = now
+
+    def keep_alive(self):
+        """Renew the lease from a background thread until release(), however long the holder goes without renew()."""
+        if redis_client() is None or not self.acquired or self._heartbeat is not None:
+            return
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._beat, name=f"{self.key}-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def _beat(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                self.renew(min_interval=0)
+            except Exception:
+                pass  # Redis hiccup: the lease outlives the next two beats
+
+    def release(self):
+        if self._heartbeat is not None:
+            self._stop.set()
+            self._heartbeat.join(timeout=5)
+            self._heartbeat = None
+        client = redis_client()
+        if client is not None and self.acquired:
+            try:
+                client.zrem(self.key, self.token)
+            except Exception:
+                pass  # the lease expires on its own
+        self.acquired = False
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
@@ -3,11 +3,16 @@ from sqlalchemy import (
     Integer,
     String,
     Boolean,
+    BigInteger,
     DateTime,
     Text,
     UniqueConstraint,
     Index,
+    JSON,
+    LargeBinary,
+    text,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -21,13 +26,17 @@ class Product(Base):
     name = Column(String(512), nullable=False)
     description = Column(Text)
     price_cents = Column(Integer, nullable=True)
+    attributes = Column(JSON().with_variant(JSONB, "postgresql"), nullable=True)  # extra CSV columns, {column: value}
     active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # The unique constraint's index serves every sku_lower lookup. Once partitioned (app/partitions.py)
+    # the table is hash-partitioned on sku_lower and the database key becomes (id, sku_lower).
     __table_args__ = (
         UniqueConstraint('sku_lower', name='uq_products_sku_lower'),
-        Index('ix_products_sku_lower', 'sku_lower'),
+        # jsonb_path_ops: smaller and faster than the default opclass, and `@>` is the only operator we filter with
+        Index('ix_products_attributes', 'attributes', postgresql_using='gin', postgresql_ops={'attributes': 'jsonb_path_ops'}),
     )
 class Webhook(Base):
     __tablename__ = "webhooks"
@@ -37,15 +46,64 @@ class Webhook(Base):
     enabled = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
 
+class WebhookDelivery(Base):
+    """One delivery attempt (or park/drop decision) of a webhook; see app/webhooks.py."""
+    __tablename__ = "webhook_deliveries"
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    webhook_id = Column(Integer, nullable=True)  # no FK: the log outlives deleted webhooks
+    delivery_id = Column(String(64), nullable=False)  # shared by every attempt of one delivery (X-Delivery-Id)
+    url = Column(String(1024), nullable=False)
+    event = Column(String(64), nullable=False)
+    attempt = Column(Integer, nullable=False, default=1)  # 0 for test deliveries
+    status = Column(String(16), nullable=False)  # success | failed | parked | dropped | test
+    http_status = Column(Integer, nullable=True)  # receiver's response code; null when no response
+    duration_ms = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_webhook_deliveries_webhook_id', 'webhook_id', 'id'),
+        Index('ix_webhook_deliveries_delivery_id', 'delivery_id'),
+        Index('ix_webhook_deliveries_created_at', 'created_at'),
+    )
+
 class ImportJob(Base):
     __tablename__ = "import_jobs"
     id = Column(Integer, primary_key=True)
-    status = Column(String(32), nullable=False, default='queued')  # queued, running, failed, complete
+    status = Column(String(32), nullable=False, default='queued')  # queued, running, paused, canceled, failed, complete
     total_rows = Column(Integer, default=0)
     processed_rows = Column(Integer, default=0)
+    total_bytes = Column(BigInteger, nullable=True)  # stored (possibly compressed) upload size
+    processed_bytes = Column(BigInteger, default=0)  # upload bytes consumed; drives percent when total_rows is unknown
     error = Column(Text, nullable=True)
     task_id = Column(String(128), nullable=True)  # Celery task id for revoke/cancel
     file_path = Column(String(1024), nullable=True)  # stored until success or manual cleanup
     original_filename = Column(String(512), nullable=True)
+    mode = Column(String(16), nullable=False, default="upsert")  # upsert | delta | replace
+    options = Column(JSON().with_variant(JSONB, "postgresql"), nullable=True)  # per-job import options, e.g. deactivate_missing
+    content_sha256 = Column(String(64), nullable=True, index=True)  # hash of the stored upload, for re-upload dedupe
+    duplicate_of = Column(Integer, nullable=True)  # prior job whose result this one reused
+    metrics = Column(JSON().with_variant(JSONB, "postgresql"), nullable=True)  # batching/parse stats recorded by the worker
+    rejected_rows = Column(Integer, default=0)  # rows diverted to the rejects file
+    rejects_path = Column(String(1024), nullable=True)  # rejects CSV (kept after the upload is removed)
+    uploader = Column(String(128), nullable=True)  # who uploaded (header or client address), for per-uploader limits
+    wait_reason = Column(String(256), nullable=True)  # why a queued job hasn't been admitted yet
+    sku_min = Column(String(128), nullable=True)  # lowest sku_lower in the feed (admission overlap check)
+    sku_max = Column(String(128), nullable=True)  # highest sku_lower in the feed
+    sku_filter = Column(LargeBinary, nullable=True)  # hash bitmap of the feed's SKUs
+    started_at = Column(DateTime(timezone=True), nullable=True)  # when the job was admitted
+    control = Column(String(16), nullable=True)  # 'pause' | 'cancel' requested of the running worker
+    checkpoint = Column(JSON().with_variant(JSONB, "postgresql"), nullable=True)  # where a paused import resumes
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_import_jobs_active', 'id', postgresql_where=text("status IN ('queued', 'running')")),
+    )
+
+
+class CacheGeneration(Base):
+    """Change counter per resource for conditional GETs (see app/generations.py)."""
+    __tablename__ = "cache_generations"
+    name = Column(String(32), primary_key=True)  # catalog | jobs | webhooks
+    value = Column(BigInteger, nullable=False, default=0)
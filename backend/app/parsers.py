@@ -0,0 +1,469 @@
+# app/parsers.py
+"""
+CSV parsing engines for the import path.
+
+Each engine turns an uploaded CSV into COPY-ready text blocks
+(tab-separated sku, name, description, price_cents, attributes; empty = NULL)
+and applies the same normalization:
+
+  - tabs / CR / LF inside values become spaces (they would break COPY)
+  - sku and name are stripped; description is kept as-is
+  - price is parsed exactly to integer cents (see prices.py)
+  - any other header columns become the row's `attributes` JSON object
+    (stripped string values, empty ones left out); a feed without extra
+    columns leaves attributes empty, so imports keep what's stored
+  - rows that fail validation (missing/overlong sku or name, unparseable
+    price, NUL bytes; see validation.py) are diverted to `parser.rejects`
+    with their original values instead of being loaded
+
+Uploads may be compressed (see compression.py); both engines decompress as a
+stream and report `bytes_read` against the compressed file size.
+
+`python` walks rows with csv.DictReader. `pyarrow` (optional dependency)
+reads record batches with Arrow's C++ parser and normalizes whole columns
+at once; its output is byte-identical to the Python engine.
+"""
+import csv
+import json
+import os
+import re
+
+from .compression import UploadReader, compression_for, open_upload_text
+from .config import settings
+from .prices import PriceNormalizer, PY_WHITESPACE
+from .validation import RejectsWriter, row_errors, row_errors_arrow, REASON_SEPARATOR
+
+COPY_COLUMNS = ("sku", "name", "description", "price_cents", "attributes")
+CSV_COLUMNS = ("sku", "name", "description", "price")
+_COPY_UNSAFE_BYTES = bytes.maketrans(b"\t\r\n", b"   ")
+# COPY text escapes: \\, \t, \n, ..., octal \ooo and hex \xhh (Postgres decodes them on load)
+_COPY_ESCAPE = re.compile(r"\\(x[0-9a-fA-F]{1,2}|[0-7]{1,3}|.)")
+_COPY_ESCAPES = {"b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v"}
+# json.dumps() escapes for the control characters clean_text() leaves in place
+_JSON_CONTROL = {code: {8: "\\b", 12: "\\f"}.get(code, f"\\u{code:04x}") for code in range(1, 32)}
+
+
+def clean_text(val) -> str:
+    if val is None:
+        return ""
+    s = str(val)
+    # Replace tabs/newlines that would break COPY delimiters
+    return s.replace("\t", " ").replace("\r", " ").replace("\n", " ")
+
+
+def extra_columns(header) -> list:
+    """(csv_column, attribute_key) for each header column beyond CSV_COLUMNS."""
+    extras, seen = [], set()
+    for column in header or ():
+        key = clean_text(column).strip()
+        if column in CSV_COLUMNS or not key or key in seen:
+            continue
+        seen.add(key)
+        extras.append((column, key))
+    return extras
+
+
+def attributes_text(attributes: dict) -> str:
+    """products.attributes for a COPY line: JSON with its backslashes escaped for COPY's text format."""
+    return json.dumps(attributes, ensure_ascii=False).replace("\\", "\\\\")
+
+
+def copy_field(value: str) -> str:
+    """A COPY text field as Postgres loads it: backslash escapes decoded (empty stays empty)."""
+    return _COPY_ESCAPE.sub(_unescape, value) if "\\" in value else value
+
+
+def _unescape(match) -> str:
+    code = match.group(1)
+    if code[0] == "x" and len(code) > 1:
+        return chr(int(code[1:], 16))
+    if code[0] in "01234567":
+        return chr(int(code, 8) & 0xFF)
+    return _COPY_ESCAPES.get(code, code)
+
+
+def read_header(file_path: str) -> list:
+    with open_upload_text(file_path) as f:
+        return next(csv.reader(f), [])
+
+
+class PythonCSVParser:
+    """Row-at-a-time reference engine built on csv.DictReader."""
+
+    name = "python"
+
+    def __init__(
+        self,
+        file_path: str,
+        skip_records: int = 0,
+        prices: PriceNormalizer | None = None,
+        rejects: RejectsWriter | None = None,
+    ):
+        self.file_path = file_path
+        self.prices = prices or PriceNormalizer()
+        self.rejects = rejects if rejects is not None else RejectsWriter()
+        self._skip_records = skip_records
+        self._f = None
+        self._reader = None
+        self._extras = []
+        self.records_read = 0  # raw CSV records consumed (including skipped rows)
+        self.bytes_total = os.path.getsize(file_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    @property
+    def resume_position(self) -> int:
+        """Data records fully handed out so far: pass as skip_records to pick up after them."""
+        return self.records_read
+
+    @property
+    def bytes_read(self) -> int:
+        """Bytes of the (possibly compressed) upload consumed so far."""
+        return self._f.buffer.bytes_read if self._f is not None else 0
+
+    def count_rows(self, sku_profile=None) -> int:
+        """Number of data records (loaded + rejected); feeds each cleaned SKU to `sku_profile` if given."""
+        with open_upload_text(self.file_path) as f:
+            if sku_profile is None:
+                return sum(1 for _ in csv.DictReader(f))
+            total = 0
+            for row in csv.DictReader(f):
+                total += 1
+                sku_profile.add(clean_text(row.get("sku", "")).strip())
+            return total
+
+    def _rows(self):
+        if self._reader is None:
+            self._f = open_upload_text(self.file_path)
+            self._reader = csv.DictReader(self._f)
+            self._extras = extra_columns(self._reader.fieldnames)
+            for _ in range(self._skip_records):
+                if next(self._reader, None) is None:
+                    break
+                self.records_read += 1
+        return self._reader
+
+    def read_block(self, max_rows: int, max_bytes: int | None = None):
+        """Return (copy_text, rows) for up to max_rows valid rows, or None at EOF."""
+        parts = []
+        rows = 0
+        nbytes = 0
+        reader = self._rows()
+        for row in reader:
+            self.records_read += 1
+            sku = clean_text(row.get("sku", "")).strip()
+            name = clean_text(row.get("name", "")).strip()
+            description = clean_text(row.get("description", ""))
+            price = row.get("price") or ""
+            price_cents = self.prices.parse(price)
+            attributes = {}
+            for column, key in self._extras:
+                value = clean_text(row.get(column)).strip()
+                if value:
+                    attributes[key] = value
+            errors = row_errors(sku, name, description, price, price_cents, attributes.values())
+            if errors:
+                self.rejects.add(
+                    self.records_read, REASON_SEPARATOR.join(errors),
+                    row.get("sku"), row.get("name"), row.get("description"), row.get("price"),
+                )
+                continue
+            price_col = "" if price_cents is None else str(price_cents)
+            attributes_col = attributes_text(attributes) if self._extras else ""
+            line = f"{sku}\t{name}\t{description}\t{price_col}\t{attributes_col}\n"
+            parts.append(line)
+            rows += 1
+            nbytes += len(line)
+            if rows >= max_rows or (max_bytes and nbytes >= max_bytes):
+                break
+        else:
+            if not rows:
+                return None
+        return "".join(parts), rows
+
+
+class ArrowCSVParser:
+    """
+    Columnar engine: pyarrow's multithreaded C++ CSV reader in record batches,
+    normalization with pyarrow.compute kernels over whole columns.
+
+    Arrow is stricter than DictReader: ragged rows (field count differs from the
+    header) and invalid UTF-8 raise instead of being padded/dropped. On such an
+    error the engine hands the rest of the file to PythonCSVParser, resuming at
+    the first record it has not yet emitted, so output stays identical.
+    """
+
+    name = "pyarrow"
+    BLOCK_BYTES = 8 * 1024 * 1024
+
+    def __init__(self, file_path: str, rejects: RejectsWriter | None = None, skip_records: int = 0):
+        self.file_path = file_path
+        self.prices = PriceNormalizer()
+        self.rejects = rejects if rejects is not None else RejectsWriter()
+        self._skip_records = skip_records
+        self._reader = None
+        self._input = None
+        self._input_raw = None
+        self._batch = None
+        self._batch_pos = 0
+        self._fallback = None
+        self._extras = []
+        self._bytes_per_row = None
+        self.records_read = 0
+        self.bytes_total = os.path.getsize(file_path)
+        self.fell_back_at = None  # record index where the Python engine took over
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._close_reader()
+        if self._fallback is not None:
+            self._fallback.close()
+
+    def _close_reader(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        for f in (self._input, self._input_raw):
+            if f is not None:
+                f.close()
+
+    @property
+    def resume_position(self) -> int:
+        """Data records fully handed out so far: pass as skip_records to pick up after them."""
+        return self._fallback.resume_position if self._fallback is not None else self.records_read
+
+    @property
+    def bytes_read(self) -> int:
+        """Bytes of the (possibly compressed) upload consumed so far (includes Arrow's readahead)."""
+        if self._fallback is not None:
+            return self._fallback.bytes_read
+        raw = self._input_raw
+        if raw is None or raw.closed:
+            return 0
+        return raw.bytes_read if isinstance(raw, UploadReader) else raw.tell()
+
+    def _open_input(self):
+        """
+        Input file for Arrow: gzip/zstd are decompressed natively in C++; zip goes
+        through the Python UploadReader. Returns (stream, raw) where raw tracks
+        on-disk bytes consumed.
+        """
+        import pyarrow as pa
+
+        compression = compression_for(self.file_path)
+        if compression == "zip":
+            reader = UploadReader(self.file_path)
+            return reader, reader
+        raw = pa.OSFile(self.file_path)
+        if compression is None:
+            return raw, raw
+        return pa.CompressedInputStream(raw, compression), raw
+
+    def _open(self, columns, stream=None):
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+
+        if stream is None:
+            stream, self._input_raw = self._open_input()
+            self._input = stream
+        return pacsv.open_csv(
+            stream,
+            read_options=pacsv.ReadOptions(block_size=self.BLOCK_BYTES),
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types={c: pa.string() for c in columns},
+                include_columns=list(columns),
+                include_missing_columns=True,
+                strings_can_be_null=False,
+            ),
+        )
+
+    def count_rows(self, sku_profile=None) -> int:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        total = 0
+        stream, _ = self._open_input()
+        try:
+            with stream, self._open(["sku"], stream) as reader:
+                for batch in reader:
+                    total += batch.num_rows
+                    if sku_profile is not None:
+                        sku = pc.unique(self._strip(self._clean(self._column(batch, "sku"))))
+                        for value in sku.to_pylist():
+                            sku_profile.add(value)
+        except (pa.ArrowInvalid, UnicodeDecodeError):
+            return PythonCSVParser(self.file_path).count_rows(sku_profile)
+        return total
+
+    @staticmethod
+    def _column(batch, name):
+        import pyarrow.compute as pc
+        return pc.fill_null(batch.column(name), "")
+
+    @staticmethod
+    def _clean(col):
+        """clean_text() over a whole column by translating its UTF-8 value buffer in one pass."""
+        import numpy as np
+        import pyarrow as pa
+
+        # \t \r \n are single ASCII bytes that never occur inside a multi-byte UTF-8
+        # sequence, so byte-for-byte replacement keeps every offset valid
+        _, offsets, data = col.buffers()
+        if data is None:  # every value empty
+            return col
+        offs = np.frombuffer(offsets, dtype=np.int32)[col.offset: col.offset + len(col) + 1]
+        start, end = int(offs[0]), int(offs[-1])
+        cleaned = data.slice(start, end - start).to_pybytes().translate(_COPY_UNSAFE_BYTES)
+        return pa.Array.from_buffers(
+            pa.string(), len(col), [None, pa.py_buffer(offs - start), pa.py_buffer(cleaned)]
+        )
+
+    @staticmethod
+    def _strip(col):
+        import pyarrow.compute as pc
+        return pc.utf8_trim(col, PY_WHITESPACE)
+
+    @staticmethod
+    def _json_escape(col):
+        """What json.dumps() does to the inside of a string, over a whole column."""
+        import pyarrow.compute as pc
+
+        col = pc.replace_substring(col, "\\", "\\\\")
+        col = pc.replace_substring(col, '"', '\\"')
+        if pc.any(pc.match_substring_regex(col, r"[\x01-\x1f]")).as_py():
+            for code, escape in _JSON_CONTROL.items():
+                col = pc.replace_substring(col, chr(code), escape)
+        return col
+
+    def _attributes(self, values: list):
+        """attributes_text() per row from the cleaned extra columns (same key order, empty values left out)."""
+        import pyarrow.compute as pc
+
+        pieces = []
+        for (_, key), value in zip(self._extras, values):
+            prefix = f", {json.dumps(key, ensure_ascii=False)}: \""
+            piece = pc.binary_join_element_wise(prefix, self._json_escape(value), '"', "")
+            pieces.append(pc.if_else(pc.equal(value, ""), "", piece))
+        body = pc.utf8_slice_codeunits(pc.binary_join_element_wise(*pieces, ""), 2)  # drop the leading ", "
+        return pc.replace_substring(pc.binary_join_element_wise("{", body, "}", ""), "\\", "\\\\")
+
+    def _format(self, batch, first_record: int):
+        import numpy as np
+        import pyarrow.compute as pc
+
+        sku = self._strip(self._clean(self._column(batch, "sku")))
+        name = self._strip(self._clean(self._column(batch, "name")))
+        description = self._clean(self._column(batch, "description"))
+        raw_price = self._column(batch, "price")
+        price = self.prices.parse_arrow(raw_price)
+        extras = [self._strip(self._clean(self._column(batch, column))) for column, _ in self._extras]
+        errors = row_errors_arrow(sku, name, description, raw_price, price, extras)
+        attributes = self._attributes(extras) if extras else ""
+        keep = pc.equal(errors, "")
+        rows = pc.sum(keep).as_py() or 0
+        if rows < len(sku):
+            self._reject(batch, pc.invert(keep), errors, first_record)
+            if not rows:
+                return "", 0
+            sku, name, description, price = (pc.filter(c, keep) for c in (sku, name, description, price))
+            if extras:
+                attributes = pc.filter(attributes, keep)
+        lines = pc.binary_join_element_wise(sku, name, description, price, attributes, "\t")
+        lines = pc.binary_join_element_wise(lines, "", "\n")  # terminate every line
+        # Rows are contiguous in the value buffer: slice it instead of building Python strs
+        offsets = np.frombuffer(lines.buffers()[1], dtype=np.int32)
+        start, end = offsets[lines.offset], offsets[lines.offset + len(lines)]
+        return lines.buffers()[2].to_pybytes()[start:end].decode("utf-8"), rows
+
+    def _reject(self, batch, mask, errors, first_record: int):
+        import pyarrow.compute as pc
+
+        # Rejects are rare: materializing just those rows in Python is fine
+        positions = pc.indices_nonzero(mask).to_pylist()
+        reasons = pc.filter(errors, mask).to_pylist()
+        raw = [pc.filter(batch.column(c), mask).to_pylist() for c in CSV_COLUMNS]
+        for pos, reason, *values in zip(positions, reasons, *raw):
+            self.rejects.add(first_record + pos + 1, reason, *values)
+
+    def _fall_back(self):
+        self.fell_back_at = self.records_read
+        self._close_reader()
+        self._batch = None
+        self._fallback = PythonCSVParser(
+            self.file_path, skip_records=self.records_read + self._skip_records, prices=self.prices, rejects=self.rejects
+        )
+        self._skip_records = 0
+
+    def read_block(self, max_rows: int, max_bytes: int | None = None):
+        """Return (copy_text, rows) for up to max_rows input records (valid rows only), or None at EOF."""
+        import pyarrow as pa
+
+        if self._fallback is not None:
+            return self._fallback.read_block(max_rows, max_bytes)
+        if max_bytes and self._bytes_per_row:
+            max_rows = max(1, min(max_rows, int(max_bytes / self._bytes_per_row)))
+        while True:
+            if self._batch is None or self._batch_pos >= self._batch.num_rows:
+                try:
+                    if self._reader is None:
+                        self._extras = extra_columns(read_header(self.file_path))
+                        self._reader = self._open(CSV_COLUMNS + tuple(column for column, _ in self._extras))
+                    self._batch = self._reader.read_next_batch()
+                    self._batch_pos = 0
+                    if self._skip_records:
+                        # Resuming from a checkpoint: records before it were already handled
+                        self._batch_pos = min(self._skip_records, self._batch.num_rows)
+                        self._skip_records -= self._batch_pos
+                        self.records_read += self._batch_pos
+                except StopIteration:
+                    return None
+                except (pa.ArrowInvalid, UnicodeDecodeError):
+                    self._fall_back()
+                    return self._fallback.read_block(max_rows, max_bytes)
+            chunk = self._batch.slice(self._batch_pos, max_rows)
+            self._batch_pos += chunk.num_rows
+            text, rows = self._format(chunk, self.records_read)
+            self.records_read += chunk.num_rows
+            if rows:
+                self._bytes_per_row = len(text) / rows
+                return text, rows
+
+
+ENGINES = {
+    PythonCSVParser.name: PythonCSVParser,
+    ArrowCSVParser.name: ArrowCSVParser,
+}
+
+
+def resolve_engine_name(name: str | None = None) -> str:
+    """Resolve CSV_PARSER_ENGINE ('auto' picks pyarrow when it is installed)."""
+    name = (name or settings.CSV_PARSER_ENGINE or "auto").lower()
+    if name == "auto":
+        try:
+            import pyarrow.csv  # noqa: F401
+            return ArrowCSVParser.name
+        except ImportError:
+            return PythonCSVParser.name
+    if name not in ENGINES:
+        raise ValueError(f"Unknown CSV parser engine: {name}")
+    return name
+
+
+def open_parser(file_path: str, engine: str | None = None, rejects: RejectsWriter | None = None, skip_records: int = 0):
+    """Parser for `file_path`; skip_records resumes after that many data records."""
+    return ENGINES[resolve_engine_name(engine)](file_path, rejects=rejects, skip_records=skip_records)
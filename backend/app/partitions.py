@@ -0,0 +1,184 @@
+# app/partitions.py
+"""
+Hash-partitioned `products` for multi-million-SKU catalogs.
+
+`python -m app.partitions 16` rebuilds `products` as PARTITION BY HASH
+(sku_lower) with that many partitions `products_p{n}` (`0` turns it back into
+one table). It is an explicit step rather than a migration, so a revision
+always produces the same schema; everything at runtime reads the layout from
+the catalog (hash_partitions):
+
+  - the primary key becomes (id, sku_lower), because unique constraints on a
+    partitioned table must include the partition key. Ids still come from the
+    one sequence, so they stay unique, and lookups by id use the leading column
+  - SKU lookups (`sku_lower = ...`, ON CONFLICT (sku_lower)) are pruned to a
+    single partition. list_products without a SKU filter walks every
+    partition's (id, sku_lower) index in one Merge Append
+  - autovacuum, index bloat and REINDEX work per partition, so a big import
+    only churns the partitions its SKUs hash to
+
+Import batches are COPYed into staging once and then merged into every
+partition at the same time, one connection per partition (up to
+IMPORT_MERGE_PARALLELISM). Each merge writes to one partition's heap and
+indexes, so the merges don't contend with each other.
+"""
+import argparse
+import queue
+import re
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from .config import settings
+from .database import import_side_engine
+
+_PARTITIONS_SQL = """
+SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = %s::regclass
+"""
+_BOUND = re.compile(r"modulus (\d+), remainder (\d+)", re.IGNORECASE)
+
+
+def hash_partitions(cur, table: str = "products") -> list:
+    """[(partition, modulus, remainder)] of a hash-partitioned table in remainder order; [] for a plain table."""
+    cur.execute("SELECT partstrat FROM pg_partitioned_table WHERE partrelid = %s::regclass", (table,))
+    row = cur.fetchone()
+    if row is None or row[0] != "h":
+        return []
+    cur.execute(_PARTITIONS_SQL, (table,))
+    partitions = []
+    for name, bound in cur.fetchall():
+        m = _BOUND.search(bound or "")
+        if m:
+            partitions.append((name, int(m.group(1)), int(m.group(2))))
+    return sorted(partitions, key=lambda p: p[2])
+
+
+def partition_filter(modulus: int, remainder: int, expr: str = "lower(sku)") -> str:
+    """SQL predicate selecting the rows of one hash partition of products."""
+    return f"satisfies_hash_partition('products'::regclass, {modulus}, {remainder}, {expr})"
+
+
+class PartitionMerger:
+    """
+    Runs one statement per partition of products, in parallel, each on its own
+    connection. statement_for(partition, modulus, remainder) returns the SQL.
+    """
+
+    def __init__(self, partitions: list, statement_for):
+        self.partitions = partitions
+        self.statement_for = statement_for
+        self._idle = queue.SimpleQueue()
+        self._conns = []
+        self._pool = ThreadPoolExecutor(max_workers=max(1, min(settings.IMPORT_MERGE_PARALLELISM, len(partitions))))
+
+    def _connection(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            conn = import_side_engine.raw_connection()
+            self._conns.append(conn)
+            return conn
+
+    def _run(self, sql: str):
+        conn = self._connection()
+        try:
+            with conn.cursor() as cur:
+                # LOCAL: pooled connections go on to other work
+                cur.execute("SET LOCAL synchronous_commit = OFF")
+                cur.execute(sql)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def run(self):
+        """Execute the statement for every partition, each in its own transaction."""
+        futures = [self._pool.submit(self._run, self.statement_for(*p)) for p in self.partitions]
+        wait(futures)
+        for future in futures:
+            future.result()  # first failure, once every partition has finished
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        for conn in self._conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+def repartition(conn, partitions: int) -> bool:
+    """
+    Copy products into a new table with `partitions` hash partitions (0 = plain) and
+    swap it in, in one transaction. Returns False if products already has that layout.
+    """
+    cur = conn.cursor()
+    try:
+        if len(hash_partitions(cur)) == partitions:
+            return False
+        # Plain indexes (trigram search etc.) are recreated from their definitions once the data is in
+        cur.execute(
+            "SELECT pg_get_indexdef(x.indexrelid) FROM pg_index x "
+            "WHERE x.indrelid = 'products'::regclass "
+            "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)"
+        )
+        indexes = [row[0] for row in cur.fetchall()]
+        cur.execute("SELECT pg_get_serial_sequence('products', 'id')")
+        sequence = cur.fetchone()[0]
+        # Reads carry on while rows are copied; writes wait for the swap
+        cur.execute("LOCK TABLE products IN EXCLUSIVE MODE")
+        if partitions:
+            cur.execute("CREATE TABLE products_rebuild (LIKE products INCLUDING DEFAULTS) PARTITION BY HASH (sku_lower)")
+            for remainder in range(partitions):
+                cur.execute(
+                    f"CREATE TABLE products_p{remainder}_rebuild PARTITION OF products_rebuild "
+                    f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+                )
+        else:
+            cur.execute("CREATE TABLE products_rebuild (LIKE products INCLUDING DEFAULTS)")
+        cur.execute("INSERT INTO products_rebuild SELECT * FROM products")
+        if sequence:
+            cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY products_rebuild.id")
+        cur.execute("DROP TABLE products")
+        cur.execute("ALTER TABLE products_rebuild RENAME TO products")
+        for remainder in range(partitions):
+            cur.execute(f"ALTER TABLE products_p{remainder}_rebuild RENAME TO products_p{remainder}")
+        # Unique constraints on a partitioned table must include the partition key
+        cur.execute(f"ALTER TABLE products ADD CONSTRAINT products_pkey PRIMARY KEY ({'id, sku_lower' if partitions else 'id'})")
+        cur.execute("ALTER TABLE products ADD CONSTRAINT uq_products_sku_lower UNIQUE (sku_lower)")
+        for definition in indexes:
+            cur.execute(definition)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    cur = conn.cursor()
+    try:
+        cur.execute("ANALYZE products")
+        conn.commit()
+    finally:
+        cur.close()
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hash-partition products on sku_lower (0 = one plain table)")
+    parser.add_argument("partitions", type=int)
+    args = parser.parse_args()
+    if args.partitions < 0:
+        parser.error("partitions must be >= 0")
+    conn = import_side_engine.raw_connection()
+    try:
+        changed = repartition(conn, args.partitions)
+    finally:
+        conn.close()
+    layout = f"{args.partitions} hash partitions" if args.partitions else "one table"
+    print(f"products {'rebuilt as' if changed else 'already is'} {layout}")
+
+
+if __name__ == "__main__":
+    main()
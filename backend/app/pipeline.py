@@ -0,0 +1,77 @@
+# app/pipeline.py
+"""
+The import data path, as three stages:
+
+  parser      reads the upload, decompressing as it goes (parsers.py engines)
+  normalizer  the normalization every engine applies on the way out: text
+              cleanup, exact cents, attributes JSON, validation diverting
+              bad rows to the rejects file. Its output is the COPY-text
+              block, the format the stages hand each other
+  sink        writes blocks to products, one transaction each (sinks.py:
+              Postgres COPY + upsert, or SQLite executemany)
+
+Optional block filters sit between normalizer and sink (delta imports drop
+unchanged rows there, see fingerprints.py). run() drives the stages in
+adaptively sized batches (batching.py); import_csv_task wraps it in job
+bookkeeping for either sink. import_file() is the whole path without a job,
+as benchmarks/bench_import_sinks.py measures it.
+"""
+import io
+import time
+
+from .batching import AdaptiveBatchSizer
+from .parsers import open_parser
+from .validation import RejectsWriter
+
+
+def run(parser, sink, sizer, rejects, block_filter=None, on_batch=None) -> int:
+    """
+    Load every block the parser yields into the sink and return the rows loaded.
+    on_batch(loaded) runs after each batch but the last, for progress and
+    pause/cancel checks; an exception from it stops the import there.
+    """
+    loaded = 0
+    buffered = 0  # number of rows currently buffered for the sink
+    buffer = io.StringIO()
+    while True:
+        block = parser.read_block(max(1, sizer.rows - buffered), sizer.max_bytes - buffer.tell())
+        if block is None:
+            break
+        block_text, block_rows = block
+        if block_filter is not None:
+            block_text, block_rows = block_filter(block_text)
+        buffer.write(block_text)
+        buffered += block_rows
+        if sizer.should_flush(buffered, buffer.tell()):
+            loaded += _flush(sink, sizer, rejects, buffer, buffered)
+            buffer = io.StringIO()
+            buffered = 0
+            if on_batch is not None:
+                on_batch(loaded)
+    return loaded + _flush(sink, sizer, rejects, buffer, buffered)
+
+
+def _flush(sink, sizer, rejects, buffer, buffered: int) -> int:
+    batch_bytes = buffer.tell()
+    batch_started = time.perf_counter()
+    loaded = sink.load(buffer.getvalue(), rejects)
+    sizer.observe(buffered, batch_bytes, time.perf_counter() - batch_started)
+    return loaded
+
+
+def import_file(file_path: str, sink, rejects_path: str | None = None, engine: str | None = None, on_batch=None) -> dict:
+    """Parse, normalize and load one upload into a sink; returns the counts and per-stage metrics."""
+    started = time.perf_counter()
+    sizer = AdaptiveBatchSizer()
+    with RejectsWriter(rejects_path) as rejects, open_parser(file_path, engine=engine, rejects=rejects) as parser:
+        loaded = run(parser, sink, sizer, rejects, on_batch=on_batch)
+        return {
+            "sink": sink.name,
+            "loaded": loaded,
+            "rejected": rejects.rejected,
+            "seconds": round(time.perf_counter() - started, 3),
+            "parser": {"engine": parser.name, "fallback_at_record": getattr(parser, "fell_back_at", None)},
+            "batching": sizer.metrics(),
+            "prices": parser.prices.metrics(),
+            "validation": rejects.metrics(),
+        }
@@ -0,0 +1,152 @@
+# app/prices.py
+"""
+Exact price normalization for imports.
+
+Prices are parsed as decimal strings, never through float, so "19.99" is 1999
+cents. Accepted forms (surrounding whitespace ignored):
+
+    19.99   -5   .5   $1,234.50   1 234.50 EUR   US$ 7   -$3.10   1e3
+
+A currency symbol or 3-letter code may lead or trail, thousands separators must
+group digits in threes, and more than two decimals round half-up. Values that
+don't parse, or that overflow the INTEGER price_cents column, are rejected:
+they are counted in the job's metrics and the import sends the row to its
+rejects file (see validation.py). Empty prices are NULL and not rejects.
+"""
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from .config import settings
+
+# products.price_cents is a 32-bit INTEGER
+MAX_PRICE_CENTS = 2 ** 31 - 1
+MAX_REJECT_SAMPLES = 20
+# Characters str.strip() treats as whitespace (all below U+3001)
+PY_WHITESPACE = "".join(c for c in map(chr, range(0x3001)) if c.isspace())
+
+_SPACES = " \u00a0\u202f"  # space, NBSP, narrow NBSP
+_CURRENCY = "(?:[A-Z]{1,2}\\$|[A-Z]{3}|[$€£¥₹₩₽₺¢])"
+_SCIENTIFIC = re.compile(r"[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)[eE][+-]?[0-9]+")
+
+
+class InvalidPrice(ValueError):
+    pass
+
+
+def price_pattern(decimal_separator: str = ".") -> str:
+    """Regex (valid for both Python `re` and Arrow's RE2) with sign/sign2/int/frac groups."""
+    if decimal_separator not in (".", ","):
+        raise ValueError("PRICE_DECIMAL_SEPARATOR must be '.' or ','")
+    thousands = "," if decimal_separator == "." else "."
+    sep = f"[{re.escape(thousands)}'{_SPACES}]"
+    ws = f"[{_SPACES}]*"
+    return (
+        f"^(?P<sign>[-+]?){ws}(?:{_CURRENCY}{ws})?(?P<sign2>[-+]?)"
+        f"(?P<int>[0-9]{{1,3}}(?:{sep}[0-9]{{3}})+|[0-9]*)"
+        f"(?:{re.escape(decimal_separator)}(?P<frac>[0-9]*))?"
+        f"{ws}(?:{_CURRENCY})?$"
+    )
+
+
+class PriceNormalizer:
+    """Parses prices to integer cents and tallies rejects for job metrics."""
+
+    def __init__(self, decimal_separator: str | None = None):
+        self.decimal_separator = decimal_separator or settings.PRICE_DECIMAL_SEPARATOR
+        self.pattern = price_pattern(self.decimal_separator)
+        self._regex = re.compile(self.pattern)
+        self.parsed = 0
+        self.rejected = 0
+        self.samples: list[str] = []
+
+    def parse_strict(self, value) -> int | None:
+        """Cents for value, None for empty; raises InvalidPrice otherwise."""
+        if value is None:
+            return None
+        s = str(value).strip()
+        if not s:
+            return None
+        m = self._regex.match(s)
+        if m:
+            digits = re.sub("[^0-9]", "", m.group("int"))
+            frac = m.group("frac") or ""
+            if not digits and not frac:
+                raise InvalidPrice(value)
+            amount = Decimal(f"{digits or '0'}.{frac or '0'}")
+            negative = "-" in (m.group("sign") + m.group("sign2"))
+        elif _SCIENTIFIC.fullmatch(s):
+            amount = Decimal(s)
+            negative = amount < 0
+            amount = abs(amount)
+        else:
+            raise InvalidPrice(value)
+        try:
+            cents = int(amount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) * 100)
+        except InvalidOperation:
+            raise InvalidPrice(value)
+        if cents > MAX_PRICE_CENTS:
+            raise InvalidPrice(value)
+        return -cents if negative else cents
+
+    def parse(self, value) -> int | None:
+        """Cents for value; empty and rejected values give None (rejects are counted)."""
+        try:
+            cents = self.parse_strict(value)
+        except InvalidPrice:
+            self.reject(value)
+            return None
+        if cents is not None:
+            self.parsed += 1
+        return cents
+
+    def reject(self, value):
+        self.rejected += 1
+        if len(self.samples) < MAX_REJECT_SAMPLES:
+            self.samples.append(str(value)[:64])
+
+    def parse_arrow(self, prices):
+        """
+        Vectorized parse() over an Arrow string array; returns cents as strings ("" = NULL).
+
+        Plain decimals (the common case) are computed with Arrow kernels; anything
+        else (scientific notation, rejects) goes through parse() element by element.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        trimmed = pc.utf8_trim(prices, PY_WHITESPACE)
+        parts = pc.extract_regex(trimmed, self.pattern)
+        matched = pc.fill_null(pc.is_valid(parts), False)
+
+        def field(name):
+            return pc.fill_null(pc.struct_field(parts, name), "")
+
+        digits = pc.replace_substring_regex(field("int"), "[^0-9]", "")
+        frac = field("frac")
+        # Integer part small enough for int64 math; larger values are rejects anyway
+        sane = pc.and_(matched, pc.less_equal(pc.utf8_length(digits), 12))
+        sane = pc.and_(sane, pc.or_(pc.not_equal(digits, ""), pc.not_equal(frac, "")))
+        units = pc.cast(pc.if_else(pc.and_(sane, pc.not_equal(digits, "")), digits, "0"), pa.int64())
+        frac3 = pc.utf8_slice_codeunits(pc.utf8_rpad(pc.if_else(sane, frac, ""), 3, "0"), 0, 3)
+        hundredths = pc.cast(pc.utf8_slice_codeunits(frac3, 0, 2), pa.int64())
+        round_up = pc.cast(pc.greater_equal(pc.utf8_slice_codeunits(frac3, 2, 3), "5"), pa.int64())
+        cents = pc.add(pc.add(pc.multiply(units, 100), hundredths), round_up)
+        ok = pc.and_(sane, pc.less_equal(cents, MAX_PRICE_CENTS))
+        negative = pc.or_(pc.equal(field("sign"), "-"), pc.equal(field("sign2"), "-"))
+        cents = pc.if_else(negative, pc.negate(cents), cents)
+        out = pc.if_else(ok, pc.cast(cents, pa.string()), "")
+        self.parsed += pc.sum(ok).as_py() or 0
+
+        slow = pc.and_(pc.invert(ok), pc.not_equal(trimmed, ""))
+        if pc.any(slow).as_py():
+            fixed = [self.parse(v) for v in pc.filter(prices, slow).to_pylist()]
+            out = pc.replace_with_mask(out, slow, pa.array(["" if c is None else str(c) for c in fixed], pa.string()))
+        return out
+
+    def metrics(self) -> dict:
+        return {
+            "decimal_separator": self.decimal_separator,
+            "parsed": self.parsed,
+            "rejected": self.rejected,
+            "reject_samples": self.samples,
+        }
@@ -0,0 +1,215 @@
+# app/profiling.py
+"""
+Opt-in sampling profiles of single API requests and of import jobs.
+
+CPU: a daemon thread samples the stacks of every other thread in the process
+every PROFILE_INTERVAL_MS (sys._current_frames) and counts them as collapsed
+stacks, one "thread;outer;...;leaf count" line per distinct stack: the input
+of flamegraph.pl, inferno, and speedscope. Samples are wall-clock, so time
+spent waiting on Postgres or a lock shows up too, and concurrent work in the
+same process is included (the thread name is the root frame).
+
+Allocations (imports only): tracemalloc traces the job, and the sampler keeps
+a snapshot from the high-water mark of traced memory. It is written in the
+same format, weighted by bytes, with file:line frames. Tracing allocations
+slows the import down noticeably; that is the price of the flag.
+
+Requests: with PROFILE_TOKEN set, a request carrying it in PROFILE_HEADER or
+as ?_profile= is profiled. The response gets an X-Profile-Id header and the
+profile is served by GET /profiles/{id}. Without PROFILE_TOKEN the middleware
+isn't installed at all.
+
+Imports: upload/retry with profile=true sets options.profile on the job
+(kept across pause/resume). The worker then writes profiles/job_{id}_cpu.folded
+and job_{id}_alloc.folded beside the uploads, and a summary under
+metrics.profile. The janitor removes profiles after PROFILE_RETENTION_DAYS.
+"""
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from urllib.parse import parse_qs
+
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
+from .janitor import PROFILES_SUBDIR, upload_dir
+
+PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+JOB_PROFILE_KINDS = ("cpu", "alloc")
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_STDLIB = os.path.dirname(os.__file__) + os.sep
+_labels = {}  # code object -> frame label
+
+
+def profile_dir() -> str:
+    return os.path.join(upload_dir(), PROFILES_SUBDIR)
+
+
+def job_profile_path(job_id: int, kind: str) -> str:
+    return os.path.join(profile_dir(), f"job_{job_id}_{kind}.folded")
+
+
+def request_profile_path(profile_id: str) -> str:
+    return os.path.join(profile_dir(), f"request_{profile_id}.folded")
+
+
+def _short(filename: str) -> str:
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    for prefix in (_ROOT, _STDLIB):
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+def _label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        name = getattr(code, "co_qualname", code.co_name)
+        label = f"{name} ({_short(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+        _labels[code] = label
+    return label
+
+
+class Sampler:
+    """Wall-clock stack sampler for this process; start(), then stop() and write()."""
+
+    def __init__(self, interval_ms: float | None = None, allocations: bool = False):
+        self.interval = max(0.001, (interval_ms or settings.PROFILE_INTERVAL_MS) / 1000)
+        self.allocations = allocations
+        self.stacks = Counter()
+        self.samples = 0
+        self.snapshot = None
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = 0.0
+        self._seconds = 0.0
+        self._owns_tracemalloc = False
+
+    def start(self):
+        if self.allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(32)
+            self._owns_tracemalloc = True
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _names(self) -> dict:
+        return {t.ident: t.name for t in threading.enumerate()}
+
+    def _run(self):
+        own = threading.get_ident()
+        names = self._names()
+        next_snapshot_check = 0.0
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident not in names:
+                    names = self._names()
+                stack = []
+                while frame is not None:
+                    stack.append(_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            if self.allocations and time.monotonic() >= next_snapshot_check:
+                self._maybe_snapshot()
+                next_snapshot_check = time.monotonic() + 1.0
+
+    def _maybe_snapshot(self):
+        # Keep the heap as it was at its largest, not after the job freed everything
+        current, _ = tracemalloc.get_traced_memory()
+        if current > self.peak_bytes * 1.1:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.peak_bytes = current
+
+    def stop(self) -> dict:
+        """Stop sampling; returns a summary (samples, seconds, the busiest leaf frames)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._seconds = time.perf_counter() - self._started
+        summary = {
+            "samples": self.samples,
+            "seconds": round(self._seconds, 3),
+            "interval_ms": round(self.interval * 1000, 3),
+            "top": self.top(),
+        }
+        if self.allocations:
+            if tracemalloc.is_tracing():
+                self._maybe_snapshot()
+                summary["peak_traced_bytes"] = tracemalloc.get_traced_memory()[1]
+                if self._owns_tracemalloc:
+                    tracemalloc.stop()
+            summary["snapshot_traced_bytes"] = self.peak_bytes
+        return summary
+
+    def top(self, count: int = 5) -> list:
+        """Leaf frames with the largest share of samples, across threads."""
+        leaves = Counter()
+        for stack, n in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += n
+        total = sum(leaves.values()) or 1
+        return [{"frame": frame, "share": round(n / total, 3)} for frame, n in leaves.most_common(count)]
+
+    def write(self, cpu_path: str, alloc_path: str | None = None):
+        os.makedirs(os.path.dirname(cpu_path), exist_ok=True)
+        with open(cpu_path, "w", encoding="utf-8") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+        if alloc_path and self.snapshot is not None:
+            snapshot = self.snapshot.filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ))
+            with open(alloc_path, "w", encoding="utf-8") as f:
+                for stat in snapshot.statistics("traceback"):
+                    stack = ";".join(f"{_short(frame.filename)}:{frame.lineno}".replace(";", ":") for frame in stat.traceback)
+                    f.write(f"{stack} {stat.size}\n")
+
+
+class RequestProfiler:
+    """ASGI middleware: profile the requests that carry PROFILE_TOKEN (see the module docstring)."""
+
+    def __init__(self, app, token: str, header: str = "X-Profile"):
+        self.app = app
+        self.token = token.encode("utf-8")
+        self.header = header.lower().encode("latin-1")
+
+    def _wanted(self, scope) -> bool:
+        for name, value in scope.get("headers") or ():
+            if name == self.header:
+                return hmac.compare_digest(value, self.token)
+        query = scope.get("query_string") or b""
+        if b"_profile=" not in query:
+            return False
+        value = parse_qs(query.decode("latin-1")).get("_profile", [""])[0]
+        return hmac.compare_digest(value.encode("latin-1"), self.token)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            return await self.app(scope, receive, send)
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", ()), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        sampler = Sampler().start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            await run_in_threadpool(sampler.write, request_profile_path(profile_id))
@@ -0,0 +1,135 @@
+# app/progress.py
+"""
+Lightweight import progress persistence.
+
+Writes go out as one `UPDATE import_jobs SET ... WHERE id = ?` on the import's
+own DB-API connection (no ORM load/commit/refresh, no second pooled connection)
+and are throttled by time so per-batch calls cost nothing between writes.
+
+Phases that write no progress for a long time (the replace build, deactivating
+missing SKUs) run under a Heartbeat instead, which keeps updated_at fresh from
+a pooled connection: admission and the janitor take IMPORT_STALE_SECONDS
+without a write to mean the worker is gone.
+"""
+import json
+import threading
+import time
+
+from sqlalchemy import text
+
+from .config import settings
+
+# Columns the worker is allowed to touch
+PROGRESS_COLUMNS = (
+    "status", "processed_rows", "total_rows", "processed_bytes", "total_bytes",
+    "rejected_rows", "rejects_path", "duplicate_of", "error", "metrics", "control", "checkpoint",
+)
+# Columns serialized to JSON text before binding (the driver casts text -> json)
+JSON_COLUMNS = ("metrics", "checkpoint")
+
+
+def progress_percent(processed_rows, total_rows, processed_bytes=None, total_bytes=None) -> float:
+    """Percent done by rows when the row count is known, else by (compressed) bytes read."""
+    if total_rows:
+        return round(((processed_rows or 0) / total_rows) * 100, 2)
+    if total_bytes:
+        return round(min(processed_bytes or 0, total_bytes) / total_bytes * 100, 2)
+    return 0
+
+
+_PLACEHOLDERS = {
+    "pyformat": "%({})s",
+    "named": ":{}",
+    "format": "%s",
+    "qmark": "?",
+}
+
+
+class ProgressWriter:
+    """
+    Throttled progress writer bound to a raw DB-API connection.
+
+    update() executes on the connection but never commits: callers commit as part
+    of their own batch transaction, so progress rides along with the data it describes.
+    """
+
+    def __init__(self, conn, job_id: int, min_interval: float | None = None, paramstyle: str | None = None):
+        self.conn = conn
+        self.job_id = job_id
+        self.min_interval = settings.PROGRESS_WRITE_INTERVAL_SECONDS if min_interval is None else min_interval
+        if paramstyle is None:
+            # Imported here: crud uses progress_percent, and importing the module shouldn't build the engines
+            from .database import import_engine
+            paramstyle = import_engine.dialect.paramstyle
+        self.paramstyle = paramstyle
+        self._pending: dict = {}
+        self._last_write: float | None = None
+
+    def update(self, force: bool = False, **fields) -> bool:
+        """Queue fields and write them if forced or the interval has elapsed. Returns True if written."""
+        unknown = set(fields) - set(PROGRESS_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unsupported progress columns: {sorted(unknown)}")
+        self._pending.update(fields)
+        if not force and self._last_write is not None and time.monotonic() - self._last_write < self.min_interval:
+            return False
+        self.flush()
+        return True
+
+    def flush(self):
+        """Write any pending fields immediately (still uncommitted)."""
+        if not self._pending:
+            return
+        sql, params = self._statement(self._pending)
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql, params)
+        finally:
+            cur.close()
+        self._pending = {}
+        self._last_write = time.monotonic()
+
+    def _statement(self, fields: dict):
+        placeholder = _PLACEHOLDERS[self.paramstyle]
+        fields = {c: json.dumps(v) if c in JSON_COLUMNS and v is not None else v for c, v in fields.items()}
+        cols = list(fields)
+        assignments = ", ".join(f"{c} = {placeholder.format(c)}" for c in cols)
+        sql = f"UPDATE import_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = {placeholder.format('job_id')}"
+        if self.paramstyle in ("pyformat", "named"):
+            return sql, {**fields, "job_id": self.job_id}
+        return sql, tuple(fields[c] for c in cols) + (self.job_id,)
+
+
+class Heartbeat:
+    """`with Heartbeat(job_id):` touches the running job's updated_at every interval until the block exits."""
+
+    def __init__(self, job_id: int, interval: float | None = None):
+        self.job_id = job_id
+        self.interval = settings.IMPORT_STALE_SECONDS / 3 if interval is None else interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name=f"import-job-{self.job_id}-heartbeat", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        from .database import SessionLocal
+
+        while not self._stop.wait(self.interval):
+            db = SessionLocal()
+            try:
+                db.execute(
+                    text("UPDATE import_jobs SET updated_at = CURRENT_TIMESTAMP WHERE id = :id AND status = 'running'"),
+                    {"id": self.job_id},
+                )
+                db.commit()
+            except Exception as e:
+                print(f"Heartbeat of import {self.job_id} failed: {e}")
+            finally:
+                db.close()
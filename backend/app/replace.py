@@ -0,0 +1,224 @@
+# app/replace.py
+"""
+Full-catalog replace (mode=replace) through a shadow table.
+
+For feeds that are authoritative snapshots, upserting into the live
+`products` table pays for every index on every row. Instead the import COPYs
+the whole feed into its staging table and then:
+
+  1. builds `products_shadow_{job}_{hex}` (same columns and defaults, no
+     indexes) in one INSERT ... SELECT: the last row per sku_lower wins, and
+     SKUs already in the catalog keep their id, active flag and created_at
+     (and attributes, if the feed has no extra columns)
+  2. recreates every index and PK/unique constraint of `products` on the
+     shadow, several at a time on separate connections, then ANALYZEs it
+  3. swaps it in with a short ACCESS EXCLUSIVE lock: hand the id sequence
+     to the shadow, drop the old table, rename the shadow and its indexes
+     and constraints to the original names
+
+When `products` is hash-partitioned (see partitions.py) the shadow gets the
+same partitions. Each index is then built per partition, all of them in
+parallel, and attached to a parent index that is defined last. The swap
+also renames the partitions.
+
+Readers see either the old catalog or the new one, never a half-loaded
+one. SKUs missing from the feed are gone afterwards, and API writes made
+while the shadow was being built are not carried over.
+"""
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+from psycopg2 import errors
+
+from .config import settings
+from .database import import_side_engine
+from .partitions import hash_partitions
+
+_INDEXES_SQL = """
+SELECT i.relname, pg_get_indexdef(i.oid), c.conname, c.contype
+FROM pg_index x
+JOIN pg_class i ON i.oid = x.indexrelid
+LEFT JOIN pg_constraint c ON c.conindid = i.oid AND c.conrelid = x.indrelid AND c.contype IN ('p', 'u')
+WHERE x.indrelid = 'products'::regclass
+ORDER BY i.relname
+"""
+# Per-partition indexes attached to one index of the partitioned products
+_CHILD_INDEXES_SQL = """
+SELECT i.relname, t.relname
+FROM pg_inherits h
+JOIN pg_class i ON i.oid = h.inhrelid
+JOIN pg_index x ON x.indexrelid = i.oid
+JOIN pg_class t ON t.oid = x.indrelid
+WHERE h.inhparent = %s::regclass
+"""
+_INDEX_DEF = re.compile(r"^CREATE (UNIQUE )?INDEX \S+ ON (?:ONLY )?\S+ ")
+_INDEX_COLUMNS = re.compile(r" USING \w+ (\(.*\))$")
+
+
+def shadow_table_for(job_id: int) -> str:
+    return f"products_shadow_{job_id}_{uuid.uuid4().hex[:8]}"
+
+
+def _temp_name(name: str, suffix: str) -> str:
+    return f"{name[:63 - len(suffix) - 1]}_{suffix}"
+
+
+def _shadow_partition(shadow_table: str, remainder: int) -> str:
+    return f"{shadow_table}_p{remainder}"
+
+
+def build_shadow(conn, cur, staging_table: str, shadow_table: str) -> dict:
+    """Create and fill the shadow table from staging. Returns row counts."""
+    partitions = hash_partitions(cur)
+    if partitions:
+        cur.execute(f"CREATE TABLE {shadow_table} (LIKE products INCLUDING DEFAULTS) PARTITION BY HASH (sku_lower)")
+        for _, modulus, remainder in partitions:
+            cur.execute(
+                f"CREATE TABLE {_shadow_partition(shadow_table, remainder)} PARTITION OF {shadow_table} "
+                f"FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})"
+            )
+    else:
+        cur.execute(f"CREATE TABLE {shadow_table} (LIKE products INCLUDING DEFAULTS)")
+    cur.execute(
+        f"""
+        INSERT INTO {shadow_table} (id, sku, sku_lower, name, description, price_cents, attributes, active, created_at, updated_at)
+        SELECT coalesce(p.id, nextval(pg_get_serial_sequence('products', 'id'))),
+               s.sku, s.sku_lower, s.name, s.description, s.price_cents, coalesce(s.attributes, p.attributes),
+               coalesce(p.active, true), coalesce(p.created_at, now()), now()
+        FROM (
+            SELECT DISTINCT ON (lower(sku)) lower(sku) AS sku_lower, sku, name, description, price_cents, attributes
+            FROM {staging_table}
+            ORDER BY lower(sku), seq DESC
+        ) s
+        LEFT JOIN products p ON p.sku_lower = s.sku_lower
+        """
+    )
+    loaded = cur.rowcount
+    cur.execute(f"SELECT count(*) FROM {shadow_table} s JOIN products p ON p.id = s.id")
+    carried_over = cur.fetchone()[0]
+    cur.execute("SELECT count(*) FROM products")
+    previous = cur.fetchone()[0]
+    conn.commit()
+    return {"loaded": loaded, "carried_over": carried_over, "removed": previous - carried_over}
+
+
+def _index_plan(cur, shadow_table: str, suffix: str) -> list:
+    """
+    (create_sql, temp_name, original_name, constraint_type, children) for every
+    index on products. children lists (create_sql, temp_name, original_name,
+    shadow_partition) per partition; for a partitioned products, create_sql
+    then defines the parent index, which attaches the children instead of
+    building anything.
+    """
+    remainders = {name: remainder for name, _, remainder in hash_partitions(cur)}
+    cur.execute(_INDEXES_SQL)
+    plan = []
+    for name, definition, conname, contype in cur.fetchall():
+        temp = _temp_name(conname or name, suffix)
+        unique = "UNIQUE " if definition.startswith("CREATE UNIQUE") else ""
+        children = []
+        if remainders:
+            cur.execute(_CHILD_INDEXES_SQL, (name,))
+            for child, partition in cur.fetchall():
+                target = _shadow_partition(shadow_table, remainders[partition])
+                child_temp = _temp_name(child, f"{suffix}_p{remainders[partition]}")
+                child_sql = _INDEX_DEF.sub(f"CREATE {unique}INDEX {child_temp} ON {target} ", definition)
+                children.append((child_sql, child_temp, child, target))
+        if children and contype:
+            # ADD CONSTRAINT ... USING INDEX isn't supported on partitioned tables
+            kind = "PRIMARY KEY" if contype == "p" else "UNIQUE"
+            columns = _INDEX_COLUMNS.search(definition).group(1)
+            sql = f"ALTER TABLE {shadow_table} ADD CONSTRAINT {temp} {kind} {columns}"
+        else:
+            sql = _INDEX_DEF.sub(f"CREATE {unique}INDEX {temp} ON {shadow_table} ", definition)
+        plan.append((sql, temp, conname or name, contype, children))
+    return plan
+
+
+def _build_index(sql: str):
+    conn = import_side_engine.raw_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SET LOCAL maintenance_work_mem = %s", (settings.REPLACE_MAINTENANCE_WORK_MEM,))
+        cur.execute("SET LOCAL statement_timeout = 0")
+        cur.execute(sql)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def build_indexes(conn, cur, shadow_table: str, suffix: str) -> list:
+    """Recreate products' indexes on the shadow, in parallel; returns the plan for swap()."""
+    plan = _index_plan(cur, shadow_table, suffix)
+    conn.commit()
+    # CREATE INDEX only takes a SHARE lock, so builds on the same table run side by side
+    builds = [child[0] for step in plan for child in step[4]] or [step[0] for step in plan]
+    workers = max(1, min(settings.REPLACE_INDEX_PARALLELISM, len(builds)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_build_index, builds))
+    for sql, temp, _, contype, children in plan:
+        kind = "PRIMARY KEY" if contype == "p" else "UNIQUE"
+        if not children:
+            if contype:
+                cur.execute(f"ALTER TABLE {shadow_table} ADD CONSTRAINT {temp} {kind} USING INDEX {temp}")
+            continue
+        for _, child_temp, _, partition in children:
+            if contype:
+                cur.execute(f"ALTER TABLE {partition} ADD CONSTRAINT {child_temp} {kind} USING INDEX {child_temp}")
+        # Finds the matching per-partition indexes and attaches them
+        cur.execute(sql)
+    cur.execute(f"ANALYZE {shadow_table}")
+    conn.commit()
+    return plan
+
+
+def swap(conn, cur, shadow_table: str, plan: list) -> float:
+    """Atomically replace products with the shadow table. Returns seconds the lock was held."""
+    for attempt in range(settings.REPLACE_SWAP_ATTEMPTS):
+        # Short lock_timeout: waiting behind a long reader would stall every query queued behind us
+        cur.execute("SET LOCAL lock_timeout = %s", (f"{settings.REPLACE_SWAP_LOCK_TIMEOUT_MS}ms",))
+        try:
+            cur.execute("LOCK TABLE products IN ACCESS EXCLUSIVE MODE")
+            break
+        except errors.LockNotAvailable:
+            conn.rollback()
+            if attempt + 1 == settings.REPLACE_SWAP_ATTEMPTS:
+                raise
+            time.sleep(1)
+    started = time.perf_counter()
+    cur.execute("SELECT pg_get_serial_sequence('products', 'id')")
+    sequence = cur.fetchone()[0]
+    if sequence:
+        # The sequence is owned by products.id and would be dropped with it
+        cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY {shadow_table}.id")
+    partitions = hash_partitions(cur)
+    cur.execute("DROP TABLE products")
+    cur.execute(f"ALTER TABLE {shadow_table} RENAME TO products")
+    for name, _, remainder in partitions:
+        cur.execute(f"ALTER TABLE {_shadow_partition(shadow_table, remainder)} RENAME TO {name}")
+    for _, temp, original, contype, children in plan:
+        if contype:
+            cur.execute(f"ALTER TABLE products RENAME CONSTRAINT {temp} TO {original}")
+        else:
+            cur.execute(f"ALTER INDEX {temp} RENAME TO {original}")
+        for _, child_temp, child_original, _ in children:
+            # A constraint's index is renamed along with it
+            cur.execute(f"ALTER INDEX {child_temp} RENAME TO {child_original}")
+    conn.commit()
+    return time.perf_counter() - started
+
+
+def replace_products(conn, cur, staging_table: str, shadow_table: str) -> dict:
+    """Shadow build, index build and swap; returns metrics for the job."""
+    started = time.perf_counter()
+    metrics = build_shadow(conn, cur, staging_table, shadow_table)
+    metrics["shadow_seconds"] = round(time.perf_counter() - started, 3)
+    started = time.perf_counter()
+    plan = build_indexes(conn, cur, shadow_table, shadow_table.rsplit("_", 1)[1])
+    metrics["indexes"] = len(plan)
+    metrics["index_seconds"] = round(time.perf_counter() - started, 3)
+    metrics["swap_ms"] = round(swap(conn, cur, shadow_table, plan) * 1000, 1)
+    return metrics
@@ -0,0 +1,114 @@
+# app/replicas.py
+"""
+Read routing across Postgres streaming replicas.
+
+With DATABASE_REPLICA_URLS set, the API's read-only endpoints (the ones on
+get_async_db) are served by replicas, so product browsing stops competing with
+imports' COPY and upserts on the primary. A read still goes to the primary when:
+
+  - every replica is more than REPLICA_MAX_LAG_SECONDS behind (or unreachable).
+    Lag is measured at most every REPLICA_LAG_CHECK_SECONDS per replica; a
+    replica whose WAL receiver isn't streaming is as far behind as its last
+    replayed commit is old.
+  - the client made a successful write in the last READ_YOUR_WRITES_SECONDS,
+    so it sees its own change immediately. Clients are identified like import
+    uploaders (IMPORT_UPLOADER_HEADER, else the client address). This state
+    lives in each API process.
+
+Healthy replicas take reads in turn.
+"""
+import asyncio
+import itertools
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from .config import settings
+from .database import AsyncSessionLocal, engine_options, to_async_url
+
+# Replay lag in seconds. 0 while the WAL receiver is streaming and has replayed everything it
+# received (an idle primary sends nothing, and the last replayed commit only gets older). With
+# the receiver disconnected equal LSNs prove nothing, so the age of the last replayed commit
+# counts, and NULL (nothing replayed yet) means unusable. Without pg_read_all_stats the view
+# hides status; a visible receiver row then counts as streaming.
+_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+             AND EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE coalesce(status, 'streaming') = 'streaming') THEN 0
+        ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+_LAG_CHECK_TIMEOUT_SECONDS = 1.0
+_MAX_TRACKED_CLIENTS = 10000
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = create_async_engine(
+            to_async_url(url),
+            **engine_options(
+                settings.DB_READ_POOL_SIZE, settings.DB_READ_MAX_OVERFLOW, settings.DB_READ_STATEMENT_TIMEOUT_MS,
+                use_async=True,
+            ),
+        )
+        self.sessionmaker = async_sessionmaker(bind=self.engine, autoflush=False, expire_on_commit=False)
+        self.lag = None  # seconds; None = never measured, inf = unreachable
+        self.checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _measure(self) -> float:
+        async with self.engine.connect() as conn:
+            lag = (await conn.execute(_LAG_SQL)).scalar_one()
+        return float("inf") if lag is None else float(lag)
+
+    async def current_lag(self) -> float:
+        if time.monotonic() - self.checked_at < settings.REPLICA_LAG_CHECK_SECONDS:
+            return self.lag
+        async with self._lock:
+            # Another request may have refreshed it while we waited
+            if time.monotonic() - self.checked_at >= settings.REPLICA_LAG_CHECK_SECONDS:
+                try:
+                    # Bounds the connect too: an unreachable replica must not stall the read
+                    self.lag = await asyncio.wait_for(self._measure(), _LAG_CHECK_TIMEOUT_SECONDS)
+                except Exception:
+                    self.lag = float("inf")
+                self.checked_at = time.monotonic()
+        return self.lag
+
+
+class ReadRouter:
+    def __init__(self, urls: list):
+        self.replicas = [Replica(url) for url in urls]
+        self._turn = itertools.count()
+        self._writes = {}  # client -> monotonic deadline of its read-your-writes window
+
+    def mark_write(self, client: str | None):
+        if not self.replicas or not client or settings.READ_YOUR_WRITES_SECONDS <= 0:
+            return
+        now = time.monotonic()
+        if len(self._writes) >= _MAX_TRACKED_CLIENTS:
+            self._writes = {c: until for c, until in self._writes.items() if until > now}
+        self._writes[client] = now + settings.READ_YOUR_WRITES_SECONDS
+
+    def _sticky(self, client: str | None) -> bool:
+        until = self._writes.get(client) if client else None
+        return until is not None and until > time.monotonic()
+
+    async def route(self, client: str | None = None):
+        """(sessionmaker, target) for a read by `client`; target is 'primary' or 'replica:<n>'."""
+        if not self.replicas or self._sticky(client):
+            return AsyncSessionLocal, "primary"
+        start = next(self._turn)
+        for i in range(len(self.replicas)):
+            n = (start + i) % len(self.replicas)
+            if await self.replicas[n].current_lag() <= settings.REPLICA_MAX_LAG_SECONDS:
+                return self.replicas[n].sessionmaker, f"replica:{n}"
+        return AsyncSessionLocal, "primary"
+
+
+router = ReadRouter([u.strip() for u in settings.DATABASE_REPLICA_URLS.split(",") if u.strip()])
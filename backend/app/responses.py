@@ -0,0 +1,18 @@
+# app/responses.py
+"""
+Fast JSON response class for read endpoints.
+
+Endpoints return an instance directly (instead of a dict) so FastAPI skips
+jsonable_encoder; orjson serializes datetimes and plain row mappings natively.
+"""
+from typing import Any
+
+import orjson
+from starlette.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
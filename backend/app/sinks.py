@@ -0,0 +1,222 @@
+# app/sinks.py
+"""
+Import sinks: the last stage of the import pipeline (see pipeline.py).
+
+A sink takes the normalized blocks the parsers emit (COPY text: tab-separated
+sku, name, description, price_cents, attributes; empty = NULL) and writes
+them to products. Each load() is one transaction. When the database refuses
+a block, load() bisects it so the good rows still land and each offending
+row goes to the rejects file with the database's error.
+
+  postgres  COPY into a per-job UNLOGGED staging table, then upsert it into
+            products (last row per SKU wins), directly or through a
+            PartitionMerger; mode=replace keeps the rows in staging for the
+            shadow build instead
+  sqlite    executemany upserts into products with the same semantics, WAL
+            journal, synchronous=NORMAL; for local development, CI and
+            benchmarks without a Postgres server (upsert mode only)
+"""
+import io
+import re
+import sqlite3
+import uuid
+from decimal import Decimal
+
+import psycopg2
+
+from .parsers import COPY_COLUMNS, copy_field
+
+# upsert staging -> products (or one of its partitions) with in-batch deduplication on sku_lower
+UPSERT_SQL = """
+    INSERT INTO {target} (sku, sku_lower, name, description, price_cents, attributes, active, created_at, updated_at)
+    SELECT sku, sku_lower, name, description, price_cents, attributes, true, now(), now()
+    FROM (
+        SELECT DISTINCT ON (sku_lower)
+               sku, sku_lower, name, description, price_cents, attributes
+        FROM (
+            SELECT lower(sku) AS sku_lower, sku, name, description, price_cents, attributes, ctid
+            FROM {staging_table}{where}
+        ) t
+        ORDER BY sku_lower, ctid DESC
+    ) d
+    ON CONFLICT (sku_lower) DO UPDATE
+    SET sku = EXCLUDED.sku,
+        name = EXCLUDED.name,
+        description = EXCLUDED.description,
+        price_cents = EXCLUDED.price_cents,
+        attributes = coalesce(EXCLUDED.attributes, {target}.attributes),{reactivate}
+        updated_at = now();
+"""
+
+SQLITE_UPSERT_SQL = """
+    INSERT INTO products (sku, sku_lower, name, description, price_cents, attributes, active, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, 1, strftime('%Y-%m-%d %H:%M:%f', 'now'), strftime('%Y-%m-%d %H:%M:%f', 'now'))
+    ON CONFLICT (sku_lower) DO UPDATE
+    SET sku = excluded.sku,
+        name = excluded.name,
+        description = excluded.description,
+        price_cents = excluded.price_cents,
+        attributes = coalesce(excluded.attributes, products.attributes),{reactivate}
+        updated_at = excluded.updated_at
+"""
+
+# An odd run of backslashes before a tab or the line end escapes the delimiter itself
+_ESCAPED_DELIMITER = re.compile(r"(?<!\\)(?:\\\\)*\\(?:\t|$)")
+
+
+class CopyFormatError(ValueError):
+    """A block line Postgres' COPY would refuse; the SQLite sink rejects the row the same way."""
+
+
+def _field(value: str) -> str | None:
+    if not value:
+        return None
+    return copy_field(value)
+
+
+def copy_rows(block: str) -> list:
+    """
+    A COPY text block as (sku, sku_lower, name, description, price_cents, attributes)
+    tuples, decoded the way Postgres would load it, keeping only the last row per SKU.
+    """
+    rows = {}
+    for line in block.split("\n"):
+        if not line:
+            continue
+        if "\\" in line:
+            if _ESCAPED_DELIMITER.search(line):
+                raise CopyFormatError('missing data for column "attributes"')
+            sku, name, description, price_cents, attributes = (_field(v) for v in line.split("\t"))
+        else:
+            sku, name, description, price_cents, attributes = line.split("\t")
+        sku_lower = sku.lower() if sku else None  # empty is NULL, as for COPY: NOT NULL refuses the row
+        rows.pop(sku_lower, None)  # a later duplicate takes the earlier one's place in file order
+        rows[sku_lower] = (
+            sku or None, sku_lower, name or None, description or None, int(price_cents) if price_cents else None, attributes or None,
+        )
+    return list(rows.values())
+
+
+def create_staging_table(conn, cur, job_id: int, keep_order: bool = False) -> str:
+    """Create this job's UNLOGGED staging table; keep_order adds seq (file order, for mode=replace)."""
+    staging_table = f"staging_products_{job_id}_{uuid.uuid4().hex[:8]}"
+    seq = ",\n            seq bigserial" if keep_order else ""
+    cur.execute(
+        f"""
+        CREATE UNLOGGED TABLE {staging_table} (
+            sku text,
+            name text,
+            description text,
+            price_cents integer,
+            attributes jsonb{seq}
+        );
+        """
+    )
+    conn.commit()
+    return staging_table
+
+
+class Sink:
+    """Base for sinks: load() with bisection on row-level errors; subclasses implement _write()."""
+
+    name = "sink"
+    row_errors: tuple = ()
+
+    def __init__(self, conn, cur):
+        self.conn = conn
+        self.cur = cur
+        self.changed = False  # set before the first write to products, so callers know the catalog may differ
+
+    def _write(self, block: str):
+        raise NotImplementedError
+
+    def load(self, block: str, rejects) -> int:
+        """
+        Write a block in one transaction and return the number of rows loaded. If the
+        database refuses it, bisect so the good rows still load and each offending row
+        goes to the rejects file with the error (about 2*log2(n) extra round trips per bad row).
+        """
+        if not block:
+            return 0
+        try:
+            self._write(block)
+            return block.count("\n")
+        except self.row_errors as e:
+            self.conn.rollback()
+            lines = block.split("\n")[:-1]
+            if len(lines) == 1:
+                sku, name, description, price_cents = lines[0].split("\t")[:4]
+                price = str(Decimal(int(price_cents)).scaleb(-2)) if price_cents else ""
+                message = (str(e).strip().splitlines() or ["unknown error"])[0]
+                rejects.add(None, f"database error: {message}", sku, name, description, price)
+                return 0
+            mid = len(lines) // 2
+            return (
+                self.load("\n".join(lines[:mid]) + "\n", rejects)
+                + self.load("\n".join(lines[mid:]) + "\n", rejects)
+            )
+
+
+class PostgresCopySink(Sink):
+    """
+    COPY a block into staging, upsert it and clear staging, all in one transaction.
+    Without upsert_sql (mode=replace) rows accumulate in staging for the shadow build.
+    With a PartitionMerger the block is committed to staging and merged into every
+    partition of products at once; a failed merge leaves the others applied, which
+    the retry (an idempotent upsert) repeats harmlessly.
+    """
+
+    name = "postgres"
+    row_errors = (psycopg2.DataError, psycopg2.IntegrityError)
+
+    def __init__(self, conn, cur, staging_table: str, upsert_sql: str | None, merger=None):
+        super().__init__(conn, cur)
+        self.staging_table = staging_table
+        self.upsert_sql = upsert_sql
+        self.merger = merger
+
+    def _write(self, block: str):
+        self.cur.copy_from(
+            io.StringIO(block),
+            self.staging_table,
+            sep="\t",
+            columns=COPY_COLUMNS,
+            null=''  # treat empty string as NULL
+        )
+        if self.merger is not None:
+            # The merge connections only see committed staging rows
+            self.conn.commit()
+            self.changed = True
+            try:
+                self.merger.run()
+            finally:
+                self.cur.execute(f"TRUNCATE {self.staging_table};")
+                self.conn.commit()
+            return
+        if self.upsert_sql:
+            self.changed = True
+            self.cur.execute(self.upsert_sql)
+            self.cur.execute(f"TRUNCATE {self.staging_table};")
+        self.conn.commit()
+
+
+class SQLiteSink(Sink):
+    """executemany upsert of each block in its own transaction, on a sqlite3 connection to the catalog."""
+
+    name = "sqlite"
+    row_errors = (sqlite3.IntegrityError, sqlite3.DataError, CopyFormatError)
+
+    def __init__(self, conn, cur=None, reactivate: bool = False):
+        super().__init__(conn, cur or conn.cursor())
+        self.sql = SQLITE_UPSERT_SQL.format(reactivate="\n        active = 1," if reactivate else "")
+        # WAL: readers (the API) keep reading while a batch commits; NORMAL skips the fsync per
+        # commit, losing at most the last batches on power loss, like synchronous_commit=off
+        self.cur.execute("PRAGMA journal_mode=WAL")
+        self.cur.execute("PRAGMA synchronous=NORMAL")
+        self.conn.commit()
+
+    def _write(self, block: str):
+        self.changed = True
+        self.cur.executemany(self.sql, copy_rows(block))
+        self.conn.commit()
+
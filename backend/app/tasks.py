@@ -3,16 +3,31 @@ from .celery_worker import celery_app
 
 # app/tasks.py
 from celery import shared_task, current_task
+from celery.utils.time import get_exponential_backoff_interval
 from .config import settings
-from .database import engine, SessionLocal
+from .database import SessionLocal, ImportSessionLocal, import_engine
 from . import crud, models
-import csv, io, os, time, json, uuid, requests, hmac, hashlib
+from .progress import Heartbeat, ProgressWriter, progress_percent
+from .batching import AdaptiveBatchSizer
+from .parsers import open_parser
+from .dedupe import dedupe_key, duplicate_result, products_snapshot, snapshot_matches
+from .fingerprints import FingerprintIndex, PRODUCTS_LOCK_KEY, index_path_for
+from .limits import Slot
+from . import webhooks
+from .admission import SkuProfile, admit
+from . import janitor
+from .replace import replace_products, shadow_table_for
+from .partitions import PartitionMerger, hash_partitions, partition_filter
+from .sinks import UPSERT_SQL, PostgresCopySink, SQLiteSink, create_staging_table
+from . import pipeline
+from .validation import RejectsWriter, rejects_path_for
+from . import profiling
+from . import generations
+import csv, os, time, json, uuid
+from urllib.parse import urlparse
 from sqlalchemy import text
 from .upstash_redis import get_upstash_client
 
-# Initialize Upstash Redis client
-upstash_client = get_upstash_client()
-
 # Message ID counter for tracking message order
 _message_counters = {}
 
@@ -29,41 +44,66 @@ def publish_progress(job_id: int, message: dict):
     _message_counters[job_id] += 1
     message["_msg_id"] = _message_counters[job_id]
 
+    try:
+        client = get_upstash_client()
+    except ValueError:
+        return  # Upstash not configured: imports run without live progress
+
     # Store as the latest message (with expiration to auto-cleanup)
-    upstash_client.set(
+    client.set(
         f"{channel}:latest",
         json.dumps(message),
         ex=3600  # Expire after 1 hour
     )
 
 
-def _sign_payload(payload: dict) -> str | None:
-    """Return hex HMAC-SHA256 signature of JSON payload if WEBHOOK_SECRET is set."""
-    secret = (settings.WEBHOOK_SECRET or "").encode("utf-8")
-    if not secret:
-        return None
-    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
-    return hmac.new(secret, body, hashlib.sha256).hexdigest()
-
-
-@celery_app.task(bind=True, name="deliver_webhook", autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 6})
-def deliver_webhook(self, webhook_id: int, url: str, event: str, payload: dict):
-    """Deliver a single webhook with retries and timeout."""
-    headers = {
-        "Content-Type": "application/json",
-        "X-Event": event,
-    }
-    sig = _sign_payload(payload)
-    if sig:
-        headers["X-Signature"] = sig
-        headers["X-Signature-Alg"] = "HMAC-SHA256"
-    timeout = max(1, int(settings.WEBHOOK_TIMEOUT_SECONDS or 5))
-    start = time.perf_counter()
-    resp = requests.post(url, json={"event": event, "data": payload}, headers=headers, timeout=timeout)
-    # Consider 2xx as success; otherwise raise to trigger retry
-    if not (200 <= resp.status_code < 300):
-        raise RuntimeError(f"webhook {webhook_id} returned {resp.status_code}")
-    return {"status": resp.status_code, "duration_ms": int((time.perf_counter() - start) * 1000)}
+@celery_app.task(bind=True, name="deliver_webhook")
+def deliver_webhook(self, webhook_id: int, url: str, event: str, payload: dict,
+                    delivery_id: str | None = None, attempt: int = 1, parked_since: float | None = None):
+    """
+    Deliver one webhook (see app/webhooks.py). Failures are retried with backoff up to
+    WEBHOOK_MAX_RETRIES times; while the endpoint's circuit is open the delivery is parked.
+    """
+    delivery_id = delivery_id or self.request.id or uuid.uuid4().hex
+    log = dict(webhook_id=webhook_id, url=url, event=event, delivery_id=delivery_id, attempt=attempt)
+    timeout = webhooks.timeout_seconds()
+
+    def requeue(countdown: float, **changes):
+        kwargs = {"delivery_id": delivery_id, "attempt": attempt, "parked_since": parked_since, **changes}
+        deliver_webhook.apply_async((webhook_id, url, event, payload), kwargs, countdown=countdown)
+
+    breaker = webhooks.CircuitBreaker(url)
+    wait = breaker.wait_seconds(probe_lease=2 * timeout + 5)
+    if wait:
+        since = parked_since or time.time()
+        if time.time() - since > settings.WEBHOOK_PARK_MAX_SECONDS:
+            webhooks.log_attempt(SessionLocal, **log, status="dropped", result={"error": "circuit open"})
+            return {"status": "dropped", "delivery_id": delivery_id}
+        if parked_since is None:
+            webhooks.log_attempt(SessionLocal, **log, status="parked", result={"error": "circuit open"})
+        # A fresh message: parking uses neither a worker nor the delivery's retries
+        requeue(wait, parked_since=since)
+        return {"status": "parked", "delivery_id": delivery_id, "retry_in": round(wait, 1)}
+
+    # One slow receiver may only tie up its share of webhook workers
+    slot = Slot(f"webhook-host:{urlparse(url).netloc.lower()}", settings.WEBHOOK_MAX_CONCURRENT_PER_HOST, 2 * timeout + 5)
+    if not slot.acquire():
+        # Requeue as a fresh message so waiting doesn't use up the failure retries
+        requeue(settings.LIMIT_RETRY_SECONDS)
+        return {"status": "deferred"}
+    try:
+        result = webhooks.send(url, event, webhooks.encode(event, payload), delivery_id)
+    finally:
+        slot.release()
+    breaker.record(result["success"])
+    webhooks.log_attempt(SessionLocal, **log, status="success" if result["success"] else "failed", result=result)
+    if not result["success"]:
+        if attempt > settings.WEBHOOK_MAX_RETRIES:
+            return {"status": "failed", "delivery_id": delivery_id, "http_status": result["status"], "attempts": attempt}
+        # Exponential backoff with jitter, as Celery's retry_backoff did
+        requeue(get_exponential_backoff_interval(1, attempt - 1, 600, full_jitter=True), attempt=attempt + 1, parked_since=None)
+        return {"status": "retrying", "delivery_id": delivery_id, "http_status": result["status"], "attempt": attempt}
+    return {"status": result["status"], "delivery_id": delivery_id, "duration_ms": result["duration_ms"]}
 
 
 @celery_app.task(name="fire_event")
@@ -83,46 +123,341 @@ def fire_event(event: str, payload: dict):
 def ping_task():
     return "pong"
 
-@celery_app.task(bind=True, name="import_csv_task", acks_late=True)
-def import_csv_task(self, file_path: str, job_id: int):
+
+@celery_app.task(name="janitor_task")
+def janitor_task(dry_run: bool = False):
+    """Drop orphaned staging tables and apply upload retention/quota; returns what was reclaimed."""
     db = SessionLocal()
     try:
-        crud.update_job_progress(db, job_id, processed=0, status="running")
-        publish_progress(job_id, {"status":"running","processed":0,"message":"Starting import"})
-
-        # Count records accurately using csv (handles quoted newlines) and skip blank SKU rows
-        with open(file_path, "r", newline='', encoding='utf-8', errors='ignore') as f:
-            reader_for_count = csv.DictReader(f)
-            total = 0
-            for r in reader_for_count:
-                sku_val = str(r.get("sku", "")).strip()
-                if not sku_val:
-                    continue
-                total += 1
-        crud.update_job_progress(db, job_id, processed=0, total=total)
-        publish_progress(job_id, {"status":"running","processed":0,"total":total,"message":"Parsing CSV"})
-
-        batch = []
-        batch_size = settings.CSV_BATCH_SIZE
-        inserted = 0
+        return janitor.run(db, dry_run=dry_run)
+    finally:
+        db.close()
+
+
+def _save_profile(conn, cur, job_id: int, profiler):
+    """Write the job's profile files and add their summary to import_jobs.metrics (best-effort)."""
+    try:
+        summary = profiler.stop()
+        profiler.write(profiling.job_profile_path(job_id, "cpu"), profiling.job_profile_path(job_id, "alloc"))
+        cur.execute(
+            "UPDATE import_jobs SET metrics = COALESCE(metrics, '{}'::jsonb) || %s::jsonb WHERE id = %s",
+            (json.dumps({"profile": summary}), job_id),
+        )
+        conn.commit()
+    except Exception as e:
+        print(f"Could not save the profile of import {job_id}: {e}")
 
-        # fast path: use COPY to load into a per-job staging table, then upsert
-        conn = engine.raw_connection()
-        cur = conn.cursor()
 
-        # Create a unique UNLOGGED staging table per job to avoid temp-table scope issues
-        staging_table = f"staging_products_{job_id}_{uuid.uuid4().hex[:8]}"
+def _changed_generations(catalog: bool, jobs: bool) -> list:
+    """The cache generations an import run bumps when it ends (see app/generations.py)."""
+    return [name for name, changed in ((generations.CATALOG, catalog), (generations.JOBS, jobs)) if changed]
+
+
+class ImportInterrupted(Exception):
+    """Raised between batches when the job was asked to pause or cancel (import_jobs.control)."""
+
+    def __init__(self, action: str, fields: dict, checkpoint: dict | None):
+        super().__init__(action)
+        self.action = action
+        self.fields = fields
+        self.checkpoint = checkpoint
+
+
+def _record_failure(conn, progress, job_id: int, error: str):
+    """Mark the job failed, preferring the import's own connection."""
+    try:
+        conn.rollback()
+        progress.update(force=True, status="failed", processed_rows=0, error=error)
+        conn.commit()
+    except Exception:
+        # Import connection unusable (or never opened): fall back to a short-lived session
+        db = ImportSessionLocal()
+        try:
+            crud.update_job_progress(db, job_id, processed=0, status="failed", error=error)
+        finally:
+            db.close()
+
+
+# mode=upsert loads every row; mode=delta only rows that changed since the last delta import;
+# mode=replace swaps in a freshly built catalog (see replace.py)
+IMPORT_MODES = ("upsert", "delta", "replace")
+
+
+def _deactivate_missing(conn, cur, index) -> int:
+    """Set active=false on active products whose SKU wasn't in this feed. Returns rows deactivated."""
+    ids = []
+    # Server-side cursor: the catalog streams through in chunks instead of loading at once
+    with conn.cursor(name="active_products") as scan:
+        scan.execute("SELECT id, sku_lower FROM products WHERE active IS NOT false")
+        while rows := scan.fetchmany(10000):
+            ids.extend(index.missing(rows))
+    deactivated = 0
+    for i in range(0, len(ids), 10000):
+        cur.execute("UPDATE products SET active = false, updated_at = now() WHERE id = ANY(%s)", (ids[i:i + 10000],))
+        deactivated += cur.rowcount
+    conn.commit()
+    return deactivated
+
+
+def _verified_duplicate(cur, job_id: int) -> dict | None:
+    """The prior import this upload duplicates (same mode and options), if products haven't changed since it completed."""
+    cur.execute(
+        """
+        SELECT p.id, p.total_rows, p.rejected_rows, p.rejects_path, p.metrics, j.mode, j.options, p.mode, p.options
+        FROM import_jobs j JOIN import_jobs p ON p.id = j.duplicate_of
+        WHERE j.id = %s AND p.status = 'complete'
+        """,
+        (job_id,),
+    )
+    row = cur.fetchone()
+    if row is None or dedupe_key(*row[5:7]) != dedupe_key(*row[7:9]):
+        return None
+    prior = dict(zip(("id", "total_rows", "rejected_rows", "rejects_path", "metrics"), row))
+    return prior if snapshot_matches(cur, prior["metrics"]) else None
+
+
+def _import_sqlite(file_path: str, job_id: int) -> dict:
+    """
+    import_csv_task for a SQLite DATABASE_URL (local development, CI): the same parsers,
+    validation and rejects as on Postgres, loaded through a SQLiteSink. upsert mode only;
+    admission, duplicate verification and pause checkpoints need Postgres, so a paused
+    import starts over when resumed.
+    """
+    conn = import_engine.raw_connection()
+    cur = conn.cursor()
+    progress = ProgressWriter(conn, job_id)
+    sink = None
+    completed = False
+    job_changed = False  # the job left the queue in this run (listings issue no ETag while it's queued)
+    try:
+        cur.execute("SELECT status, mode FROM import_jobs WHERE id = ?", (job_id,))
+        status, mode = cur.fetchone() or (None, None)
+        if status in ("complete", "paused", "canceled"):
+            return {"job_id": job_id, "skipped": status}
+        if (mode or "upsert") != "upsert":
+            raise ValueError(f"mode={mode} imports need Postgres")
+        rejects = RejectsWriter(rejects_path_for(file_path, job_id))
+        parser = open_parser(file_path, rejects=rejects)
+        total, total_bytes = parser.count_rows(), parser.bytes_total
+        cur.execute("UPDATE import_jobs SET started_at = CURRENT_TIMESTAMP WHERE id = ?", (job_id,))
+        progress.update(
+            force=True, status="running", processed_rows=0, total_rows=total, processed_bytes=0, total_bytes=total_bytes,
+            rejected_rows=0, rejects_path=None, control=None, checkpoint=None,
+        )
+        conn.commit()
+        job_changed = True
+        publish_progress(job_id, {"status":"running","processed":0,"total":total,"percent":0,"message":"Starting import"})
+        sink = SQLiteSink(conn, cur)
+        sizer = AdaptiveBatchSizer()
+        metrics = {}
+
+        def on_batch(loaded: int):
+            processed = loaded + rejects.rejected
+            cur.execute("SELECT control FROM import_jobs WHERE id = ?", (job_id,))
+            row = cur.fetchone()
+            control = row[0] if row else "cancel"  # job deleted underneath us
+            if control in ("pause", "cancel"):
+                raise ImportInterrupted(control, {"processed_rows": processed, "rejected_rows": rejects.rejected}, None)
+            metrics["batching"] = sizer.metrics()
+            progress.update(processed_rows=processed, rejected_rows=rejects.rejected, processed_bytes=parser.bytes_read, metrics=metrics)
+            conn.commit()
+            publish_progress(job_id, {
+                "status": "running",
+                "processed": processed,
+                "total": total,
+                "percent": progress_percent(processed, total, parser.bytes_read, total_bytes),
+                "message": f"Processed {processed}/{total}",
+            })
+
+        with parser, rejects:
+            inserted = pipeline.run(parser, sink, sizer, rejects, on_batch=on_batch)
+            metrics.update(
+                sink=sink.name, parser={"engine": parser.name, "fallback_at_record": getattr(parser, "fell_back_at", None)},
+                batching=sizer.metrics(), prices=parser.prices.metrics(), validation=rejects.metrics(),
+            )
+        total = total or inserted + rejects.rejected
+        progress.update(
+            force=True, status="complete", processed_rows=total, total_rows=total, processed_bytes=total_bytes,
+            rejected_rows=rejects.rejected, rejects_path=rejects.path if rejects.rejected else None,
+            duplicate_of=None, metrics=metrics,
+        )
+        conn.commit()
+        completed = True
+        publish_progress(job_id, {"status":"complete","processed":total,"total":total,"percent":100,"rejected":rejects.rejected,"message":"Import complete"})
+        try:
+            fire_event.delay("import.completed", {"job_id": job_id, "total_rows": total, "rejected_rows": rejects.rejected})
+        except Exception:
+            pass
+        return {"job_id": job_id, "inserted": inserted, "rejected": rejects.rejected}
+    except ImportInterrupted as e:
+        conn.rollback()
+        status = "paused" if e.action == "pause" else "canceled"
+        progress.update(force=True, status=status, control=None, **e.fields)
+        conn.commit()
+        publish_progress(job_id, {"status":status,"processed":e.fields["processed_rows"],"message":f"Import {status}"})
+        return {"job_id": job_id, status: True}
+    except Exception as e:
+        _record_failure(conn, progress, job_id, str(e))
+        job_changed = True
+        publish_progress(job_id, {"status":"failed","message":str(e)})
+        try:
+            fire_event.delay("import.failed", {"job_id": job_id, "error": str(e)})
+        except Exception:
+            pass
+        raise
+    finally:
+        try:
+            if completed and os.path.exists(file_path):
+                os.remove(file_path)
+        except Exception:
+            pass
+        changed = _changed_generations(sink is not None and sink.changed, job_changed)
+        if changed:
+            db = ImportSessionLocal()
+            try:
+                generations.bump(db, *changed)
+            finally:
+                db.close()
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
+            pass
+
+
+@celery_app.task(bind=True, name="import_csv_task", acks_late=True)
+def import_csv_task(self, file_path: str, job_id: int):
+    if import_engine.dialect.name == "sqlite":
+        return _import_sqlite(file_path, job_id)
+    conn = None
+    cur = None
+    progress = None
+    profiler = None
+    index = None
+    staging_table = None
+    shadow_table = None
+    merger = None
+    sink = None
+    completed = False
+    job_changed = False  # the job left the queue in this run (listings issue no ETag while it's queued)
+    catalog_changed = False  # products may differ: replace swapped, or deactivation ran (sink.changed covers loads)
+    # At most one run per job: a message redelivered after the broker's visibility timeout
+    # (or a retry racing a live run) must not import the same file twice in parallel
+    slot = Slot(f"import-job:{job_id}", 1, lease_seconds=600)
+    if not slot.acquire():
+        return {"job_id": job_id, "skipped": "already running"}
+    # Renewed in the background: counting, admission, the replace build and deactivation run between batches
+    slot.keep_alive()
+    try:
+        # One connection per import: COPY, upserts and progress writes all share it
+        conn = import_engine.raw_connection()
+        cur = conn.cursor()
         cur.execute(
-            f"""
-            CREATE UNLOGGED TABLE {staging_table} (
-                sku text,
-                name text,
-                description text,
-                price_cents integer
-            );
-            """
+            "SELECT status, mode, options, uploader, total_rows, sku_min, sku_max, sku_filter, checkpoint "
+            "FROM import_jobs WHERE id = %s",
+            (job_id,),
         )
+        status, mode, options, uploader, total, sku_min, sku_max, sku_filter, checkpoint = cur.fetchone() or (None,) * 9
+        conn.commit()
+        if status in ("complete", "paused", "canceled"):
+            # Redelivered after finishing, or stopped while queued; retry/resume re-queue the job first
+            return {"job_id": job_id, "skipped": status}
+        mode, options = mode or "upsert", options or {}
+        if options.get("profile"):
+            profiler = profiling.Sampler(allocations=True).start()
+        progress = ProgressWriter(conn, job_id)
+
+        # A paused import picks up after its last committed batch (delta and replace imports start over)
+        resume = checkpoint if checkpoint and mode == "upsert" else None
+        rejects = RejectsWriter(rejects_path_for(file_path, job_id), resume=resume["validation"] if resume else None)
+        parser = open_parser(file_path, rejects=rejects, skip_records=resume["records"] if resume else 0)
+        total_bytes = parser.bytes_total
+        if sku_filter is None:
+            # One pass up front counts data records (handles quoted newlines; each is either
+            # loaded or rejected) and profiles the SKUs for admission; kept across re-queues
+            profile = SkuProfile()
+            total = parser.count_rows(profile)
+            cur.execute(
+                "UPDATE import_jobs SET total_rows = %s, sku_min = %s, sku_max = %s, sku_filter = %s WHERE id = %s",
+                (total, profile.sku_min, profile.sku_max, bytes(profile.bits), job_id),
+            )
+            conn.commit()
+        else:
+            profile = SkuProfile(sku_min, sku_max, sku_filter)
+
+        # Wait for a free slot and for overlapping imports to finish (see admission.py)
+        wait = admit(conn, cur, {"id": job_id, "uploader": uploader, "mode": mode, **profile.fields()})
+        if wait is not None:
+            parser.close()
+            publish_progress(job_id, {"status":"queued","message":f"Waiting: {wait}"})
+            # Same task_id, so cancelling the job still revokes the re-queued message
+            self.apply_async((file_path, job_id), countdown=settings.LIMIT_RETRY_SECONDS, task_id=self.request.id)
+            return {"job_id": job_id, "deferred": wait}
+        job_changed = True  # admitted: status is running now
+        inserted = resume["inserted"] if resume else 0
+        progress.update(
+            force=True,
+            processed_rows=inserted + rejects.rejected,
+            rejected_rows=rejects.rejected,
+            rejects_path=rejects.path if rejects.rejected else None,
+            status="running",
+            control=None,
+            checkpoint=None,
+        )
+        conn.commit()
+        publish_progress(job_id, {"status":"running","processed":inserted + rejects.rejected,"message":"Resuming import" if resume else "Starting import"})
+
+        # Delta and replace imports must not interleave with other imports (see fingerprints.py); session-level lock
+        exclusive = mode in ("delta", "replace")
+        lock_sql = "SELECT pg_advisory_lock(%s)" if exclusive else "SELECT pg_advisory_lock_shared(%s)"
+        cur.execute(lock_sql, (PRODUCTS_LOCK_KEY,))
+        conn.commit()
+
+        # Identical file already imported and nothing touched products since: reuse that result
+        prior = _verified_duplicate(cur, job_id) if settings.IMPORT_DEDUPE_MODE == "verify" and not resume else None
+        if prior is not None:
+            fields = duplicate_result(prior, "verify", rejects.path)
+            progress.update(force=True, processed_bytes=os.path.getsize(file_path), **fields)
+            conn.commit()
+            completed = True
+            publish_progress(job_id, {"status":"complete","processed":fields["total_rows"],"total":fields["total_rows"],"percent":100,"message":f"Identical to import #{prior['id']}; nothing to do"})
+            try:
+                fire_event.delay("import.completed", {"job_id": job_id, "total_rows": fields["total_rows"], "rejected_rows": fields["rejected_rows"], "duplicate_of": prior["id"]})
+            except Exception:
+                pass
+            return {"job_id": job_id, "duplicate_of": prior["id"]}
+
+        progress.update(force=True, total_rows=total, processed_bytes=resume["processed_bytes"] if resume else 0, total_bytes=total_bytes)
         conn.commit()
+        publish_progress(job_id, {"status":"running","processed":inserted + rejects.rejected,"total":total,"percent":0,"message":"Parsing CSV"})
+
+        sizer = AdaptiveBatchSizer()
+        metrics = {}
+        deactivate_missing = mode == "delta" and bool(options.get("deactivate_missing"))
+        if mode == "delta":
+            index = FingerprintIndex(index_path_for(file_path))
+            index.begin(products_snapshot(cur))
+            # rejected SKUs stay "present" (never deactivated) and reload next time
+            rejects.on_add = index.forget
+
+        # fast path: use COPY to load into a per-job staging table, then upsert
+        # replace keeps the whole feed in staging, in file order (last row per SKU wins)
+        staging_table = create_staging_table(conn, cur, job_id, keep_order=mode == "replace")
+        if mode == "replace":
+            # Nothing is upserted per batch: the shadow table is built from staging at the end
+            upsert_sql = None
+            shadow_table = shadow_table_for(job_id)
+        else:
+            # A feed that deactivates missing SKUs also reactivates the ones it lists
+            reactivate = "\n        active = true," if deactivate_missing else ""
+            upsert_sql = UPSERT_SQL.format(staging_table=staging_table, reactivate=reactivate, target="products", where="")
+            partitions = hash_partitions(cur)
+            conn.commit()
+            if len(partitions) > 1:
+                merger = PartitionMerger(partitions, lambda partition, modulus, remainder: UPSERT_SQL.format(
+                    staging_table=staging_table, reactivate=reactivate, target=partition,
+                    where=f"\n            WHERE {partition_filter(modulus, remainder)}",
+                ))
 
         # Speed up bulk upserts within this session
         try:
@@ -130,138 +465,107 @@ def import_csv_task(self, file_path: str, job_id: int):
         except Exception:
             pass
 
-        # open file and copy rows in chunks
-        def _clean_text(val: str) -> str:
-            if val is None:
-                return ""
-            s = str(val)
-            # Replace tabs/newlines that would break COPY delimiters
-            return s.replace("\t", " ").replace("\r", " ").replace("\n", " ")
-
-        with open(file_path, "r", newline='', encoding='utf-8', errors='ignore') as f:
-            reader = csv.DictReader(f)
-            rows = []
-            buffered = 0  # number of rows currently buffered for COPY
-            copy_buffer = io.StringIO()
-            for row in reader:
-                sku = _clean_text(row.get("sku", "")).strip()
-                name = _clean_text(row.get("name", "")).strip()
-                description = _clean_text(row.get("description", ""))
-                price = row.get("price","")
-                price_cents = None
-                if price:
-                    try:
-                        price_cents = int(float(price) * 100)
-                    except:
-                        price_cents = None
-                # skip rows with no SKU
-                if not sku:
-                    continue
-                # normalize and write tab-separated for COPY
-                price_col = "" if price_cents is None else str(price_cents)
-                copy_buffer.write(f"{sku}\t{name}\t{description}\t{price_col}\n")
-                buffered += 1
-                if buffered >= batch_size:
-                    copy_buffer.seek(0)
-                    if copy_buffer.getvalue():
-                        cur.copy_from(
-                            copy_buffer,
-                            staging_table,
-                            sep="\t",
-                            columns=('sku','name','description','price_cents'),
-                            null=''  # treat empty string as NULL
-                        )
-                    conn.commit()
-                    copy_buffer = io.StringIO()
-                    # upsert tmp_products -> products with in-batch deduplication on sku_lower
-                    cur.execute(
-                        f"""
-                        INSERT INTO products (sku, sku_lower, name, description, price_cents, active, created_at, updated_at)
-                        SELECT sku, sku_lower, name, description, price_cents, true, now(), now()
-                        FROM (
-                            SELECT DISTINCT ON (sku_lower)
-                                   sku, sku_lower, name, description, price_cents
-                            FROM (
-                                SELECT lower(sku) AS sku_lower, sku, name, description, price_cents, ctid
-                                FROM {staging_table}
-                            ) t
-                            ORDER BY sku_lower, ctid DESC
-                        ) d
-                        ON CONFLICT (sku_lower) DO UPDATE
-                        SET sku = EXCLUDED.sku,
-                            name = EXCLUDED.name,
-                            description = EXCLUDED.description,
-                            price_cents = EXCLUDED.price_cents,
-                            updated_at = now();
-                        """
-                    )
-                    conn.commit()
-                    # clear temp table
-                    cur.execute(f"TRUNCATE {staging_table};")
-                    conn.commit()
-                    inserted += buffered
-                    buffered = 0
-                    # Persist progress to DB so /import-jobs reflects live progress
-                    try:
-                        crud.update_job_progress(db, job_id, processed=inserted)
-                    except Exception:
-                        pass
-                    publish_progress(job_id, {"status":"running","processed":inserted,"total":total, "message": f"Processed {inserted}/{total}"})
-            # final flush
-            copy_buffer.seek(0)
-            if copy_buffer.getvalue():
-                cur.copy_from(
-                    copy_buffer,
-                    staging_table,
-                    sep="\t",
-                    columns=('sku','name','description','price_cents'),
-                    null=''  # treat empty string as NULL
+        sink = PostgresCopySink(conn, cur, staging_table, upsert_sql, merger)
+
+        def on_batch(loaded: int):
+            # Persist progress (throttled) in its own small transaction so /import-jobs reflects live progress
+            metrics["batching"] = sizer.metrics()
+            metrics["prices"] = parser.prices.metrics()
+            metrics["validation"] = rejects.metrics()
+            processed = inserted + loaded + rejects.rejected + (index.unchanged if index is not None else 0)
+            bytes_read = parser.bytes_read
+            # Pause/cancel requests are honoured here, with every batch so far committed
+            cur.execute("SELECT control FROM import_jobs WHERE id = %s", (job_id,))
+            row = cur.fetchone()
+            control = row[0] if row else "cancel"  # job deleted underneath us
+            if control in ("pause", "cancel"):
+                raise ImportInterrupted(
+                    control,
+                    {"processed_rows": processed, "rejected_rows": rejects.rejected,
+                     "rejects_path": rejects.path if rejects.rejected else None,
+                     "processed_bytes": bytes_read, "metrics": metrics},
+                    None if mode != "upsert" else {
+                        "records": parser.resume_position, "inserted": inserted + loaded,
+                        "processed_bytes": bytes_read, "validation": rejects.metrics(),
+                    },
                 )
-            conn.commit()
-            cur.execute(
-                f"""
-                INSERT INTO products (sku, sku_lower, name, description, price_cents, active, created_at, updated_at)
-                SELECT sku, sku_lower, name, description, price_cents, true, now(), now()
-                FROM (
-                    SELECT DISTINCT ON (sku_lower)
-                           sku, sku_lower, name, description, price_cents
-                    FROM (
-                        SELECT lower(sku) AS sku_lower, sku, name, description, price_cents, ctid
-                        FROM {staging_table}
-                    ) t
-                    ORDER BY sku_lower, ctid DESC
-                ) d
-                ON CONFLICT (sku_lower) DO UPDATE
-                SET sku = EXCLUDED.sku,
-                    name = EXCLUDED.name,
-                    description = EXCLUDED.description,
-                    price_cents = EXCLUDED.price_cents,
-                    updated_at = now();
-                """
+            progress.update(
+                processed_rows=processed,
+                rejected_rows=rejects.rejected,
+                processed_bytes=bytes_read,
+                metrics=metrics,
             )
             conn.commit()
+            publish_progress(job_id, {
+                "status": "running",
+                "processed": processed,
+                "total": total,
+                "percent": progress_percent(processed, total, bytes_read, total_bytes),
+                "message": f"Processed {processed}/{total}" if total else f"Processed {processed} rows",
+            })
+
+        # parser -> normalized COPY-ready blocks -> (delta filter) -> sink, in adaptive batches
+        with parser, rejects:
+            block_filter = index.filter_block if index is not None else None
+            inserted += pipeline.run(parser, sink, sizer, rejects, block_filter=block_filter, on_batch=on_batch)
+            metrics["parser"] = {"engine": parser.name, "fallback_at_record": getattr(parser, "fell_back_at", None)}
+            if shadow_table:
+                publish_progress(job_id, {"status":"running","processed":inserted + rejects.rejected,"total":total,"percent":99,"message":"Building indexes and swapping in the new catalog"})
+                catalog_changed = True
+                with Heartbeat(job_id):
+                    metrics["replace"] = replace_products(conn, cur, staging_table, shadow_table)
             # Drop staging table to clean up
             try:
                 cur.execute(f"DROP TABLE IF EXISTS {staging_table};")
                 conn.commit()
+                staging_table = None
             except Exception:
                 pass
-            # count final processed rows (best-effort)
-            inserted += buffered
-            try:
-                crud.update_job_progress(db, job_id, processed=inserted)
-            except Exception:
-                pass
-            publish_progress(job_id, {"status":"complete","processed":total,"total":total,"message":"Import complete"})
+            if index is not None:
+                metrics["delta"] = index.metrics()
+                if deactivate_missing:
+                    catalog_changed = True
+                    with Heartbeat(job_id):
+                        metrics["delta"]["deactivated"] = _deactivate_missing(conn, cur, index)
             # Ensure DB reflects total processed at completion for accurate UI
-            crud.update_job_progress(db, job_id, processed=total, status="complete")
+            total = total or inserted + rejects.rejected + (index.unchanged if index is not None else 0)
+            metrics["batching"] = sizer.metrics()
+            metrics["prices"] = parser.prices.metrics()
+            metrics["validation"] = rejects.metrics()
+            # Lets a later identical upload (IMPORT_DEDUPE_MODE=verify) prove nothing changed since
+            metrics["snapshot"] = products_snapshot(cur)
+            if index is not None:
+                index.commit(metrics["snapshot"])
+            progress.update(
+                force=True,
+                processed_rows=total,
+                total_rows=total,
+                processed_bytes=total_bytes,
+                rejected_rows=rejects.rejected,
+                rejects_path=rejects.path if rejects.rejected else None,
+                duplicate_of=None,
+                status="complete",
+                metrics=metrics,
+            )
+            conn.commit()
+            completed = True
+            publish_progress(job_id, {"status":"complete","processed":total,"total":total,"percent":100,"rejected":rejects.rejected,"message":"Import complete"})
             # Fire import.completed webhooks asynchronously
             try:
-                fire_event.delay("import.completed", {"job_id": job_id, "total_rows": total})
+                fire_event.delay("import.completed", {"job_id": job_id, "total_rows": total, "rejected_rows": rejects.rejected})
             except Exception:
                 pass
+    except ImportInterrupted as e:
+        # Batches already committed stay applied; a paused job keeps a checkpoint to resume from
+        conn.rollback()
+        status = "paused" if e.action == "pause" else "canceled"
+        progress.update(force=True, status=status, control=None, checkpoint=e.checkpoint if status == "paused" else None, **e.fields)
+        conn.commit()
+        publish_progress(job_id, {"status":status,"processed":e.fields["processed_rows"],"message":f"Import {status}"})
+        return {"job_id": job_id, status: True}
     except Exception as e:
-        crud.update_job_progress(db, job_id, processed=0, status="failed", error=str(e))
+        _record_failure(conn, progress, job_id, str(e))
+        job_changed = True
         publish_progress(job_id, {"status":"failed","message":str(e)})
         # keep file for retry
         try:
@@ -270,14 +574,39 @@ def import_csv_task(self, file_path: str, job_id: int):
             pass
         raise
     finally:
+        slot.release()
+        if merger is not None:
+            merger.close()
+        if index is not None and not completed:
+            index.discard()
         # remove file only on success (status complete and no error)
         try:
-            job_state = db.get(models.ImportJob, job_id)
-            if job_state and job_state.status == "complete" and os.path.exists(file_path):
+            if completed and os.path.exists(file_path):
                 os.remove(file_path)
         except Exception:
             pass
-        db.close()
+        try:
+            # advisory locks are session-level and the connection goes back to the pool
+            conn.rollback()
+            cur.execute("SELECT pg_advisory_unlock_all()")
+            for table in (staging_table, shadow_table):
+                if table:
+                    cur.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.commit()
+        except Exception:
+            pass
+        try:
+            # One bump for the whole import, and only for what it changed: a deferred or skipped
+            # run touched neither; listings issue no ETag while an import runs (see app/generations.py)
+            changed = _changed_generations(catalog_changed or (sink is not None and sink.changed), job_changed)
+            if conn is not None and changed:
+                generations.bump_raw(conn, *changed)
+        except Exception:
+            pass
+        if profiler is not None and job_changed:
+            _save_profile(conn, cur, job_id, profiler)
+        elif profiler is not None:
+            profiler.stop()  # deferred: the re-queued run profiles the import itself
         try:
             cur.close()
             conn.close()
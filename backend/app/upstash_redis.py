@@ -4,7 +4,6 @@ Upstash Redis REST API client wrapper
 Provides a simple interface for publish operations using Upstash REST API
 """
 import json
-import requests
 from typing import Dict, Any
 from .config import settings
 
@@ -45,6 +44,8 @@ class UpstashRedisClient:
         Returns:
             Response from Redis
         """
+        import requests  # on first use: it's a sizeable share of the API's cold start
+
         try:
             response = requests.post(
                 self.url,
@@ -0,0 +1,119 @@
+# app/validation.py
+"""
+Row-level validation for imports.
+
+Every parsed row is checked against the `products` columns before it reaches
+COPY, so a single bad row can't fail a whole batch. Rows that fail go to a
+rejects CSV (original values plus the reasons) and the rest keep flowing.
+Rows the database still refuses are isolated by bisecting the batch in
+Sink.load (sinks.py) and land in the same file with the server's error as
+the reason.
+"""
+import csv
+import os
+
+from .models import Product
+
+SKU_MAX_LENGTH = Product.__table__.c.sku.type.length
+NAME_MAX_LENGTH = Product.__table__.c.name.type.length
+REJECT_COLUMNS = ("record", "reason", "sku", "name", "description", "price")
+REASON_SEPARATOR = "; "
+
+
+def row_errors(sku: str, name: str, description: str, price: str, price_cents: int | None, extras=()) -> list[str]:
+    """Reasons a cleaned row can't be loaded (empty list = valid). `extras` are its attribute values."""
+    errors = []
+    if not sku:
+        errors.append("missing sku")
+    elif len(sku) > SKU_MAX_LENGTH:
+        errors.append(f"sku longer than {SKU_MAX_LENGTH} characters")
+    if not name:
+        errors.append("missing name")
+    elif len(name) > NAME_MAX_LENGTH:
+        errors.append(f"name longer than {NAME_MAX_LENGTH} characters")
+    if price_cents is None and price.strip():
+        errors.append("invalid price")
+    if "\x00" in sku or "\x00" in name or "\x00" in description or any("\x00" in v for v in extras):
+        errors.append("NUL character")
+    return errors
+
+
+def row_errors_arrow(sku, name, description, price, price_cents, extras=()):
+    """
+    row_errors() over whole Arrow columns: returns the joined reasons per row
+    ("" = valid). `price_cents` is the string column from PriceNormalizer.parse_arrow.
+    """
+    import pyarrow.compute as pc
+
+    from .prices import PY_WHITESPACE
+
+    nul = pc.or_(pc.or_(pc.match_substring(sku, "\x00"), pc.match_substring(name, "\x00")),
+                 pc.match_substring(description, "\x00"))
+    for column in extras:
+        nul = pc.or_(nul, pc.match_substring(column, "\x00"))
+    sku_len = pc.utf8_length(sku)
+    name_len = pc.utf8_length(name)
+    checks = [
+        (pc.equal(sku_len, 0), "missing sku"),
+        (pc.greater(sku_len, SKU_MAX_LENGTH), f"sku longer than {SKU_MAX_LENGTH} characters"),
+        (pc.equal(name_len, 0), "missing name"),
+        (pc.greater(name_len, NAME_MAX_LENGTH), f"name longer than {NAME_MAX_LENGTH} characters"),
+        (pc.and_(pc.equal(price_cents, ""), pc.not_equal(pc.utf8_trim(price, PY_WHITESPACE), "")), "invalid price"),
+        (nul, "NUL character"),
+    ]
+    # Reasons end in a letter, so trimming the separator off the right is exact
+    parts = [pc.if_else(mask, reason + REASON_SEPARATOR, "") for mask, reason in checks]
+    return pc.utf8_rtrim(pc.binary_join_element_wise(*parts, ""), REASON_SEPARATOR)
+
+
+class RejectsWriter:
+    """
+    Collects rejected rows for one import. With a path, rows are streamed to a CSV
+    (created on the first reject); without one they are only counted. `resume`
+    (a prior metrics() result) continues an interrupted import's counts and file.
+    """
+
+    def __init__(self, path: str | None = None, resume: dict | None = None):
+        self.path = path
+        self.rejected = (resume or {}).get("rejected", 0)
+        self.reasons: dict[str, int] = dict((resume or {}).get("reasons") or {})
+        self._append = bool(resume) and bool(path) and os.path.exists(path)
+        self.on_add = None  # optional callback(sku) per rejected row
+        self._f = None
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def add(self, record: int | None, reason: str, sku, name, description, price):
+        self.rejected += 1
+        for part in reason.split(REASON_SEPARATOR):
+            key = part.split(":", 1)[0]
+            self.reasons[key] = self.reasons.get(key, 0) + 1
+        if self.on_add is not None:
+            self.on_add(sku)
+        if not self.path:
+            return
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._f = open(self.path, "a" if self._append else "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._f)
+            if not self._append:
+                self._writer.writerow(REJECT_COLUMNS)
+        self._writer.writerow(["" if record is None else record, reason, sku or "", name or "", description or "", price or ""])
+
+    def metrics(self) -> dict:
+        return {"rejected": self.rejected, "reasons": self.reasons}
+
+
+def rejects_path_for(file_path: str, job_id: int) -> str:
+    """Rejects live beside the uploads (which are removed on success) so they outlast the source file."""
+    return os.path.join(os.path.dirname(os.path.abspath(file_path)), "rejects", f"job_{job_id}_rejects.csv")
@@ -0,0 +1,207 @@
+# app/webhooks.py
+"""
+Webhook delivery, shared by the deliver_webhook task and POST /webhooks/{id}/test.
+
+Body and signature: the envelope {"event": ..., "data": ...} is serialized
+once and those exact bytes are sent and signed (X-Signature: hex HMAC-SHA256
+of the raw request body with WEBHOOK_SECRET). X-Delivery-Id stays the same
+across retries of one delivery, so receivers can drop duplicates.
+
+Every attempt is logged in webhook_deliveries with its status (success,
+failed, parked, dropped, test), HTTP status and latency.
+
+Circuit breaker, per URL: after WEBHOOK_BREAKER_FAILURES consecutive failures
+the circuit opens for WEBHOOK_BREAKER_COOLDOWN_SECONDS (doubling each time it
+re-opens, up to WEBHOOK_BREAKER_MAX_COOLDOWN_SECONDS). Deliveries to an open
+circuit are parked: re-queued for when it closes, without holding a worker
+or using up their retries. After the cooldown one delivery probes the
+endpoint. Success closes the circuit; failure opens it again. Deliveries
+parked for longer than WEBHOOK_PARK_MAX_SECONDS are dropped. A successful
+test delivery also closes the circuit. Breaker state lives in the broker's
+Redis, like limits.py (per process when the broker isn't Redis).
+"""
+import hashlib
+import hmac
+import json
+import time
+
+import httpx
+from sqlalchemy import insert
+
+from . import models
+from .config import settings
+from .limits import redis_client
+
+_client = None
+_local_circuits = {}  # circuit key -> state, when there's no Redis
+
+
+def timeout_seconds() -> int:
+    return max(1, int(settings.WEBHOOK_TIMEOUT_SECONDS or 5))
+
+
+def encode(event: str, data: dict) -> bytes:
+    """The request body, serialized once: these bytes are both signed and sent."""
+    return json.dumps({"event": event, "data": data}, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def sign(body: bytes) -> str | None:
+    """Hex HMAC-SHA256 of the body if WEBHOOK_SECRET is set."""
+    secret = (settings.WEBHOOK_SECRET or "").encode("utf-8")
+    if not secret:
+        return None
+    return hmac.new(secret, body, hashlib.sha256).hexdigest()
+
+
+def headers_for(event: str, body: bytes, delivery_id: str) -> dict:
+    headers = {"Content-Type": "application/json", "X-Event": event, "X-Delivery-Id": delivery_id}
+    signature = sign(body)
+    if signature:
+        headers["X-Signature"] = signature
+        headers["X-Signature-Alg"] = "HMAC-SHA256"
+    return headers
+
+
+def _http() -> httpx.Client:
+    # One pooled client per worker process: keep-alive connections are reused across deliveries
+    global _client
+    if _client is None:
+        _client = httpx.Client(timeout=timeout_seconds())
+    return _client
+
+
+def _result(response, started: float, error: str | None = None) -> dict:
+    result = {
+        "status": response.status_code if response is not None else 0,
+        "success": response is not None and 200 <= response.status_code < 300,
+        "duration_ms": int((time.perf_counter() - started) * 1000),
+    }
+    if response is not None:
+        result["body"] = response.text[:500]
+    if error:
+        result["error"] = error
+    return result
+
+
+def send(url: str, event: str, body: bytes, delivery_id: str) -> dict:
+    """POST the body; never raises. Returns status, success, duration_ms and body or error."""
+    started = time.perf_counter()
+    try:
+        response = _http().post(url, content=body, headers=headers_for(event, body, delivery_id))
+    except httpx.HTTPError as e:
+        return _result(None, started, f"{type(e).__name__}: {e}")
+    return _result(response, started)
+
+
+async def send_async(url: str, event: str, body: bytes, delivery_id: str) -> dict:
+    """send() for the API's event loop; no request thread waits on the receiver."""
+    started = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(timeout=timeout_seconds()) as client:
+            response = await client.post(url, content=body, headers=headers_for(event, body, delivery_id))
+    except httpx.HTTPError as e:
+        return _result(None, started, f"{type(e).__name__}: {e}")
+    return _result(response, started)
+
+
+def attempt_row(webhook_id, url: str, event: str, delivery_id: str, attempt: int, status: str, result: dict | None = None) -> dict:
+    result = result or {}
+    return {
+        "webhook_id": webhook_id,
+        "delivery_id": delivery_id,
+        "url": url,
+        "event": event,
+        "attempt": attempt,
+        "status": status,
+        "http_status": result.get("status") or None,
+        "duration_ms": result.get("duration_ms"),
+        "error": result.get("error"),
+    }
+
+
+def log_attempt(session_factory, **row):
+    """Best-effort insert into webhook_deliveries; the log must never fail a delivery."""
+    db = session_factory()
+    try:
+        db.execute(insert(models.WebhookDelivery).values(**attempt_row(**row)))
+        db.commit()
+    except Exception:
+        db.rollback()
+    finally:
+        db.close()
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one webhook URL."""
+
+    def __init__(self, url: str):
+        self.key = "webhook-circuit:" + hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+    def _load(self) -> dict:
+        client = redis_client()
+        if client is None:
+            return dict(_local_circuits.get(self.key, {}))
+        return {k.decode(): float(v) for k, v in client.hgetall(self.key).items()}
+
+    def _save(self, state: dict):
+        client = redis_client()
+        if client is None:
+            _local_circuits[self.key] = state
+            return
+        pipe = client.pipeline()
+        pipe.delete(self.key)
+        if state:
+            pipe.hset(self.key, mapping=state)
+            pipe.expire(self.key, 2 * settings.WEBHOOK_BREAKER_MAX_COOLDOWN_SECONDS + 3600)
+        pipe.execute()
+
+    def wait_seconds(self, probe_lease: float) -> float:
+        """0 when a delivery may go out now, else how long to park it."""
+        if settings.WEBHOOK_BREAKER_FAILURES <= 0:
+            return 0.0
+        try:
+            state = self._load()
+        except Exception:
+            return 0.0  # breaker state unavailable: deliver rather than park
+        now = time.time()
+        open_until = state.get("open_until", 0)
+        if not open_until:
+            return 0.0
+        if now < open_until:
+            return open_until - now
+        # Half-open: one delivery probes the endpoint while the rest stay parked
+        if state.get("probe_until", 0) > now:
+            return float(settings.LIMIT_RETRY_SECONDS)
+        state["probe_until"] = now + probe_lease
+        try:
+            self._save(state)
+        except Exception:
+            pass
+        return 0.0
+
+    def record(self, success: bool):
+        if settings.WEBHOOK_BREAKER_FAILURES <= 0:
+            return
+        try:
+            state = self._load()
+            if success:
+                if state:
+                    self._save({})
+                return
+            now = time.time()
+            open_until = state.get("open_until", 0)
+            if open_until and now < open_until:
+                return  # in flight when the circuit opened; already counted
+            failures = state.get("failures", 0) + 1
+            if open_until or failures >= settings.WEBHOOK_BREAKER_FAILURES:
+                trips = state.get("trips", 0) + 1
+                cooldown = min(
+                    settings.WEBHOOK_BREAKER_COOLDOWN_SECONDS * 2 ** (trips - 1),
+                    settings.WEBHOOK_BREAKER_MAX_COOLDOWN_SECONDS,
+                )
+                state = {"trips": trips, "open_until": now + cooldown}
+            else:
+                state["failures"] = failures
+            self._save(state)
+        except Exception:
+            pass  # a breaker outage must not fail the delivery
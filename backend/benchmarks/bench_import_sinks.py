@@ -0,0 +1,123 @@
+"""
+Benchmark: the full import path (parser -> normalizer -> sink) into SQLite,
+and optionally into Postgres, on the synthetic feed of bench_csv_parsers.
+
+Each sink loads the feed twice: into an empty catalog (inserts), then again
+over it (every row an update). SQLite needs no server: a temporary database
+file in WAL mode. With --postgres-url the same feed goes through COPY and the
+upsert into a scratch table (dropped afterwards; products isn't touched), and
+the two catalogs are compared row for row.
+
+Usage (from backend/):
+    python -m benchmarks.bench_import_sinks [--rows 200000] [--engine python|pyarrow]
+        [--postgres-url postgresql://postgres@127.0.0.1:5432/scratch]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+
+from sqlalchemy import create_engine
+
+from app import models, pipeline
+from app.sinks import UPSERT_SQL, PostgresCopySink, SQLiteSink, create_staging_table
+from benchmarks.bench_csv_parsers import write_feed
+
+CATALOG_SQL = "SELECT sku, sku_lower, name, description, price_cents, attributes FROM {table} ORDER BY sku_lower"
+PG_TABLE = "bench_sink_products"
+
+
+def catalog_digest(rows) -> str:
+    digest = hashlib.sha256()
+    for sku, sku_lower, name, description, price_cents, attributes in rows:
+        if isinstance(attributes, str):
+            attributes = json.loads(attributes)
+        attributes = json.dumps(attributes, sort_keys=True) if attributes is not None else None
+        digest.update(json.dumps([sku, sku_lower, name, description, price_cents, attributes]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def bench_sqlite(path: str, engine: str | None, workdir: str) -> tuple:
+    db_path = os.path.join(workdir, "catalog.sqlite3")
+    models.Base.metadata.create_all(bind=create_engine(f"sqlite:///{db_path}"))
+    conn = sqlite3.connect(db_path)
+    try:
+        sink = SQLiteSink(conn)
+        runs = [pipeline.import_file(path, sink, engine=engine) for _ in range(2)]
+        return runs, catalog_digest(conn.execute(CATALOG_SQL.format(table="products")))
+    finally:
+        conn.close()
+
+
+def bench_postgres(path: str, engine: str | None, url: str) -> tuple:
+    import psycopg2
+
+    conn = psycopg2.connect(url.replace("postgresql+psycopg2://", "postgresql://"))
+    cur = conn.cursor()
+    staging_table = None
+    try:
+        cur.execute(f"DROP TABLE IF EXISTS {PG_TABLE}")
+        cur.execute(
+            f"""
+            CREATE UNLOGGED TABLE {PG_TABLE} (
+                id bigserial PRIMARY KEY,
+                sku text NOT NULL,
+                sku_lower text NOT NULL UNIQUE,
+                name text NOT NULL,
+                description text,
+                price_cents integer,
+                attributes jsonb,
+                active boolean,
+                created_at timestamptz,
+                updated_at timestamptz
+            )
+            """
+        )
+        conn.commit()
+        staging_table = create_staging_table(conn, cur, 0)
+        upsert_sql = UPSERT_SQL.format(staging_table=staging_table, reactivate="", target=PG_TABLE, where="")
+        sink = PostgresCopySink(conn, cur, staging_table, upsert_sql)
+        runs = [pipeline.import_file(path, sink, engine=engine) for _ in range(2)]
+        cur.execute(CATALOG_SQL.format(table=PG_TABLE))
+        return runs, catalog_digest(cur.fetchall())
+    finally:
+        conn.rollback()
+        for table in (staging_table, PG_TABLE):
+            if table:
+                cur.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.commit()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--engine", default=None, help="CSV engine (default: CSV_PARSER_ENGINE)")
+    parser.add_argument("--postgres-url", default="", help="also load into a scratch table in this database")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "feed.csv")
+        write_feed(path, args.rows)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        results = {"sqlite": bench_sqlite(path, args.engine, workdir)}
+        if args.postgres_url:
+            results["postgres"] = bench_postgres(path, args.engine, args.postgres_url)
+
+    print(f"rows={args.rows} file={size_mb:.1f}MB")
+    for name, (runs, digest) in results.items():
+        for label, run in zip(("insert", "update"), runs):
+            print(f"  {name:<8} {label:<6} {run['seconds']:7.2f}s  {(run['loaded'] + run['rejected']) / run['seconds']:>10,.0f} rows/s  "
+                  f"loaded={run['loaded']} rejected={run['rejected']} parser={run['parser']['engine']} "
+                  f"batches={run['batching']['batches']}")
+        print(f"  {name:<8} catalog sha256={digest[:12]}")
+    if len({digest for _, digest in results.values()}) > 1:
+        raise SystemExit("MISMATCH: sinks produced different catalogs")
+    if len(results) > 1:
+        print("  identical catalogs")
+
+
+if __name__ == "__main__":
+    main()
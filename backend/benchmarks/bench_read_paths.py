@@ -0,0 +1,104 @@
+"""
+Micro-benchmark: ORM-hydrated vs Core-projected read path for GET /products.
+
+Runs against an in-memory SQLite database so it needs no Postgres server.
+Measures CPU time (process_time) per simulated request at per_page=200,
+including serialization, which is where the legacy path spent most of its time.
+
+Usage (from backend/):
+    python -m benchmarks.bench_read_paths [--rows 5000] [--iterations 300]
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.responses import FastJSONResponse
+
+PER_PAGE = 200
+
+
+def _seed(session, rows: int):
+    now = datetime.utcnow()
+    session.bulk_insert_mappings(models.Product, [
+        {
+            "sku": f"SKU-{i}",
+            "sku_lower": f"sku-{i}",
+            "name": f"Product {i}",
+            "description": "lorem ipsum dolor sit amet " * 4,
+            "price_cents": i * 7,
+            "active": True,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(rows)
+    ])
+    session.commit()
+
+
+def legacy_request(db) -> bytes:
+    """Mirror of the pre-projection endpoint: ORM entities -> to_dict -> jsonable_encoder -> json."""
+    query = db.query(models.Product)
+    total = query.count()
+    items = query.order_by(models.Product.id.desc()).offset(0).limit(PER_PAGE).all()
+
+    def to_dict(p):
+        return {
+            "id": p.id,
+            "sku": p.sku,
+            "sku_lower": p.sku_lower,
+            "name": p.name,
+            "description": p.description,
+            "price_cents": p.price_cents,
+            "active": p.active,
+            "created_at": p.created_at,
+            "updated_at": p.updated_at,
+        }
+    content = {"total": total, "page": 1, "per_page": PER_PAGE, "items": [to_dict(p) for p in items]}
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def core_request(db) -> bytes:
+    total, items = crud.list_products(db, page=1, per_page=PER_PAGE)
+    return FastJSONResponse({"total": total, "page": 1, "per_page": PER_PAGE, "items": items}).body
+
+
+def _measure(fn, Session, iterations: int) -> float:
+    # warm-up (statement compilation cache, imports)
+    for _ in range(5):
+        with Session() as db:
+            fn(db)
+    start = time.process_time()
+    for _ in range(iterations):
+        with Session() as db:
+            fn(db)
+    return (time.process_time() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", future=True)
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
+    with Session() as db:
+        _seed(db, args.rows)
+
+    legacy = _measure(legacy_request, Session, args.iterations)
+    core = _measure(core_request, Session, args.iterations)
+    print(f"per_page={PER_PAGE} rows={args.rows} iterations={args.iterations}")
+    print(f"  ORM + to_dict + jsonable_encoder : {legacy * 1000:8.3f} ms CPU/request")
+    print(f"  Core projection + FastJSONResp.  : {core * 1000:8.3f} ms CPU/request")
+    print(f"  reduction                        : {(1 - core / legacy) * 100:7.1f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Cold-start benchmark for the API: how long a fresh process takes from exec to
+having run the app's lifespan startup (i.e. ready to accept requests).
+
+Each run is a new interpreter, so nothing is warm except the OS page cache
+(the first run also pays for that; it's reported but excluded from the median).
+By default the child points DATABASE_URL at a closed port and has no Upstash
+credentials: importing and starting the app must not need either.
+
+Exits 1 when the median exceeds STARTUP_BUDGET_SECONDS, so it can gate CI.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup [--runs 7] [--budget 1.0] [--use-env]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from app.config import settings
+
+CHILD = """
+import asyncio, json, time
+t0 = time.perf_counter()
+import app.app as m
+imported = time.perf_counter() - t0
+
+async def start():
+    async with m.app.router.lifespan_context(m.app):
+        pass
+
+asyncio.run(start())
+print(json.dumps({"ready_at": time.time(), "import": imported, "startup": m.app.state.startup_seconds}))
+"""
+
+
+def _run_once(env: dict) -> dict:
+    started = time.time()
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, timeout=60,
+    )
+    if out.returncode != 0:
+        raise SystemExit(f"app failed to start:\n{out.stderr}")
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    # Up to the ready line, not process exit: interpreter teardown isn't part of a cold start
+    result["wall"] = result["ready_at"] - started
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget", type=float, default=settings.STARTUP_BUDGET_SECONDS)
+    parser.add_argument("--use-env", action="store_true", help="keep DATABASE_URL/Upstash settings from the environment")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if not args.use_env:
+        env["DATABASE_URL"] = "postgresql+psycopg2://nobody@127.0.0.1:1/unreachable"
+        env["DATABASE_REPLICA_URLS"] = ""
+        env["UPSTASH_REDIS_REST_URL"] = ""
+        env["UPSTASH_REDIS_REST_TOKEN"] = ""
+    env["STARTUP_BUDGET_SECONDS"] = "0"  # the parent does the judging
+
+    runs = [_run_once(env) for _ in range(max(2, args.runs))]
+    first, warm = runs[0], runs[1:]
+    print(f"first run (cold page cache): wall {first['wall']:.3f}s")
+    for key, label in (("wall", "exec -> ready"), ("import", "import app.app"), ("startup", "import -> lifespan")):
+        values = [r[key] for r in warm]
+        print(f"{label:20s} median {statistics.median(values):.3f}s  min {min(values):.3f}s  max {max(values):.3f}s")
+
+    median = statistics.median(r["wall"] for r in warm)
+    if not args.budget:
+        return
+    if median > args.budget:
+        print(f"OVER BUDGET: median {median:.3f}s > {args.budget}s")
+        sys.exit(1)
+    print(f"within budget ({args.budget}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from app.database import engine
+from app.database import import_engine as engine
 from app.models import Base
 
 print("Creating database tables...")
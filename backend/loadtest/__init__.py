@@ -0,0 +1 @@
+"""End-to-end load-test harness; run `python -m loadtest.run --help` from backend/."""
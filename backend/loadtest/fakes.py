@@ -0,0 +1,169 @@
+# loadtest/fakes.py
+"""
+In-process stand-ins for the external services, each an HTTP server on a free
+127.0.0.1 port served from daemon threads.
+
+FakeUpstash speaks the Upstash REST protocol for the commands
+UpstashRedisClient sends (POST / with a JSON command array, bearer token):
+SET [EX], GET, DEL, INCR, EXPIRE and PUBLISH.
+
+FakeWebhookReceiver answers webhook deliveries after a configurable latency
+(plus uniform jitter) and fails a configurable share of them with a 500. It
+checks X-Signature against the raw body and remembers when each product
+event arrived, so the harness can report end-to-end event latency.
+"""
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real services
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _reply(self, status: int, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        self.server.owner.handle(self)
+
+
+class _Server:
+    def __init__(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.owner = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeUpstash(_Server):
+    def __init__(self, token: str = "loadtest"):
+        super().__init__()
+        self.token = token
+        self.commands = Counter()
+        self._data = {}  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+
+    def _live(self, key: str):
+        item = self._data.get(key)
+        if item and item[1] is not None and item[1] <= time.time():
+            del self._data[key]
+            return None
+        return item
+
+    def execute(self, command: list):
+        name = str(command[0]).upper()
+        args = [str(a) for a in command[1:]]
+        self.commands[name] += 1
+        with self._lock:
+            if name == "SET":
+                expires = None
+                if len(args) >= 4 and args[2].upper() == "EX":
+                    expires = time.time() + int(args[3])
+                self._data[args[0]] = (args[1], expires)
+                return "OK"
+            if name == "GET":
+                item = self._live(args[0])
+                return item[0] if item else None
+            if name == "DEL":
+                return sum(1 for key in args if self._live(key) and self._data.pop(key, None))
+            if name == "INCR":
+                item = self._live(args[0])
+                value = int(item[0]) + 1 if item else 1
+                self._data[args[0]] = (str(value), item[1] if item else None)
+                return value
+            if name == "EXPIRE":
+                item = self._live(args[0])
+                if not item:
+                    return 0
+                self._data[args[0]] = (item[0], time.time() + int(args[1]))
+                return 1
+            if name == "PUBLISH":
+                return 0  # nobody subscribes over REST
+        raise ValueError(f"ERR unknown command '{name}'")
+
+    def handle(self, request: _Handler):
+        body = request._body()
+        if request.headers.get("Authorization") != f"Bearer {self.token}":
+            return request._reply(401, {"error": "Unauthorized"})
+        try:
+            return request._reply(200, {"result": self.execute(json.loads(body))})
+        except Exception as e:
+            return request._reply(400, {"error": str(e)})
+
+
+class FakeWebhookReceiver(_Server):
+    def __init__(self, latency_ms: float = 50, jitter_ms: float = 0, error_rate: float = 0.0, secret: str = "", seed: int | None = None):
+        super().__init__()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.secret = secret.encode("utf-8")
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.responses = Counter()  # "event status" -> count
+        self.bad_signatures = 0
+        self.arrivals = {}  # (event, sku) -> first successful arrival time
+        self._deliveries = Counter()  # X-Delivery-Id -> successful deliveries
+
+    def handle(self, request: _Handler):
+        body = request._body()
+        with self._lock:
+            delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+            fail = self._random.random() < self.error_rate
+        time.sleep(delay / 1000)
+        signed_ok = not self.secret or hmac.compare_digest(
+            hmac.new(self.secret, body, hashlib.sha256).hexdigest(), request.headers.get("X-Signature", "")
+        )
+        try:
+            envelope = json.loads(body)
+        except ValueError:
+            envelope = {}
+        event = envelope.get("event", "?")
+        status = 500 if fail else 200
+        with self._lock:
+            self.responses[f"{event} {status}"] += 1
+            if not signed_ok:
+                self.bad_signatures += 1
+            if status == 200:
+                self._deliveries[request.headers.get("X-Delivery-Id")] += 1
+                sku = (envelope.get("data") or {}).get("sku")
+                if sku:
+                    self.arrivals.setdefault((event, sku), time.time())
+        request._reply(status, {"ok": not fail})
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "responses": dict(self.responses),
+                "bad_signatures": self.bad_signatures,
+                "duplicate_deliveries": sum(n - 1 for n in self._deliveries.values() if n > 1),
+            }
@@ -0,0 +1,110 @@
+# loadtest/report.py
+"""Latency recording, the per-scenario summary table and the run history."""
+import json
+import math
+import os
+import subprocess
+import time
+from collections import defaultdict
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """Collects (operation -> latency seconds) samples and error counts."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, operation: str, seconds: float):
+        self.samples[operation].append(seconds)
+
+    def error(self, operation: str):
+        self.errors[operation] += 1
+
+    def summary(self, duration: float) -> dict:
+        results = {}
+        for operation in sorted(set(self.samples) | set(self.errors)):
+            values = sorted(self.samples.get(operation, []))
+            results[operation] = {
+                "count": len(values),
+                "errors": self.errors.get(operation, 0),
+                "throughput": round(len(values) / duration, 2) if duration else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1000, 1) if values else None,
+                "p95_ms": round(percentile(values, 95) * 1000, 1) if values else None,
+                "p99_ms": round(percentile(values, 99) * 1000, 1) if values else None,
+                "max_ms": round(values[-1] * 1000, 1) if values else None,
+            }
+        return results
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def previous_run(history_path: str, profile: dict) -> dict | None:
+    """The most recent recorded run with the same profile (scenario settings)."""
+    if not os.path.exists(history_path):
+        return None
+    last = None
+    with open(history_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                run = json.loads(line)
+            except ValueError:
+                continue
+            if run.get("profile") == profile:
+                last = run
+    return last
+
+
+def append_run(history_path: str, profile: dict, results: dict, extra: dict) -> dict:
+    os.makedirs(os.path.dirname(os.path.abspath(history_path)), exist_ok=True)
+    run = {
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": _git_revision(),
+        "profile": profile,
+        "results": results,
+        **extra,
+    }
+    with open(history_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run, sort_keys=True) + "\n")
+    return run
+
+
+def _delta(now, before) -> str:
+    if now is None or not before:
+        return ""
+    return f"{(now - before) / before * 100:+.0f}%"
+
+
+def print_table(results: dict, previous: dict | None = None):
+    before = (previous or {}).get("results", {})
+    header = f"{'operation':24s} {'count':>7s} {'err':>5s} {'req/s':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'max ms':>9s}"
+    if previous:
+        header += f"  {'p95 vs prev':>11s} {'req/s vs prev':>13s}"
+    print(header)
+    print("-" * len(header))
+    fmt = lambda v: f"{v:9.1f}" if v is not None else f"{'-':>9s}"
+    for operation, r in results.items():
+        line = (
+            f"{operation:24s} {r['count']:7d} {r['errors']:5d} {r['throughput']:8.2f} "
+            f"{fmt(r['p50_ms'])} {fmt(r['p95_ms'])} {fmt(r['p99_ms'])} {fmt(r['max_ms'])}"
+        )
+        if previous:
+            prior = before.get(operation, {})
+            line += f"  {_delta(r['p95_ms'], prior.get('p95_ms')):>11s} {_delta(r['throughput'], prior.get('throughput')):>13s}"
+        print(line)
+    if previous:
+        print(f"(previous run with the same profile: {previous['at']}, revision {previous.get('revision') or '?'})")
@@ -0,0 +1,229 @@
+# loadtest/run.py
+"""
+End-to-end load test: real API (uvicorn) and Celery workers against the local
+Postgres in DATABASE_URL, with fake Upstash and webhook receivers, driven by
+mixed traffic (see scenarios.py).
+
+The broker is --redis-url when given, else kombu's SQLAlchemy transport in the
+same Postgres (no Redis needed; it creates kombu_queue/kombu_message tables
+there, and it is polled, so idle queues add up to a second of latency). The schema is brought up to date with `alembic upgrade
+head`, and LTSEED- products are seeded once and kept between runs. Products created by uploads and CRUD are removed
+afterwards unless --keep-data.
+
+Prints p50/p95/p99 latency and throughput per operation. Each run is appended
+to --history and compared with the last run that used the same profile.
+
+Usage (from backend/):
+    python -m loadtest.run [--duration 60] [--uploads 1 --rows 20000 --viewers 3]
+        [--searchers 8] [--crud 4] [--webhook-latency-ms 50 --webhook-error-rate 0.05]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from app.config import settings
+from .fakes import FakeUpstash, FakeWebhookReceiver
+from .report import Recorder, append_run, previous_run, print_table
+from . import scenarios
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WEBHOOK_EVENTS = ["product.created", "product.updated", "product.deleted", "import.completed"]
+WEBHOOK_SECRET = "loadtest-secret"
+WEBHOOK_PATH = "/loadtest-hook"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _seed(engine, count: int) -> int:
+    with engine.begin() as conn:
+        have = conn.execute(text("SELECT count(*) FROM products WHERE sku_lower LIKE :p"), {"p": scenarios.SEED_PREFIX.lower() + "%"}).scalar()
+        if have < count:
+            words = "ARRAY[" + ",".join(f"'{w}'" for w in scenarios.WORDS) + "]"
+            conn.execute(text(
+                f"""
+                INSERT INTO products (sku, sku_lower, name, description, price_cents, active, created_at, updated_at)
+                SELECT :prefix || i, lower(:prefix) || i, ({words})[1 + i % {len(scenarios.WORDS)}] || ' seed ' || i,
+                       'seeded product', 100 + i % 10000, true, now(), now()
+                FROM generate_series(:start, :stop - 1) AS i
+                ON CONFLICT (sku_lower) DO NOTHING
+                """
+            ), {"prefix": scenarios.SEED_PREFIX, "start": have, "stop": count})
+            conn.execute(text("ANALYZE products"))
+    return count
+
+
+def _drop_stale_webhooks(engine):
+    # Left behind by an interrupted run; deliveries to its dead receiver would clog the queue
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM webhooks WHERE url LIKE :p"), {"p": "http://127.0.0.1:%" + WEBHOOK_PATH})
+
+
+def _cleanup(engine):
+    with engine.begin() as conn:
+        for prefix in (scenarios.UPLOAD_PREFIX, scenarios.CRUD_PREFIX):
+            conn.execute(text("DELETE FROM products WHERE sku_lower LIKE :p"), {"p": prefix.lower() + "%"})
+
+
+def _start(name: str, args: list, env: dict, logs: str) -> subprocess.Popen:
+    log = open(os.path.join(logs, f"{name}.log"), "wb")
+    return subprocess.Popen(args, cwd=BACKEND, env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+
+
+def _stop(processes: list):
+    for proc in processes:
+        if proc.poll() is None:
+            os.killpg(proc.pid, signal.SIGTERM)
+    for proc in processes:
+        try:
+            proc.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+
+
+def _wait_ready(base_url: str, processes: list, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for proc in processes:
+            if proc.poll() is not None:
+                raise SystemExit(f"{proc.args[2]} exited early; see its log")
+        try:
+            if httpx.get(base_url + "/", timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise SystemExit("API did not come up")
+
+
+async def _drive(args, base_url: str, receiver, seeded: int) -> tuple:
+    recorder = Recorder()
+    ctx = scenarios.Context(base_url, recorder, time.monotonic() + args.duration, receiver)
+    jobs = (
+        [scenarios.uploads(ctx, args.rows, args.viewers, args.import_timeout) for _ in range(args.uploads)]
+        + [scenarios.search(ctx, seeded) for _ in range(args.searchers)]
+        + [scenarios.crud(ctx) for _ in range(args.crud)]
+    )
+    started = time.monotonic()
+    # Uploads may finish their last import after the deadline; that time still counts
+    await asyncio.gather(*jobs)
+    elapsed = time.monotonic() - started
+    # Let the last webhooks arrive (retries of failed deliveries back off for longer)
+    grace = time.monotonic() + args.webhook_grace
+    while time.monotonic() < grace and any(k not in receiver.arrivals for k in ctx.crud_sent):
+        await asyncio.sleep(0.5)
+    scenarios.webhook_latencies(ctx)
+    await ctx.close()
+    return recorder, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=60, help="seconds of traffic")
+    parser.add_argument("--uploads", type=int, default=1, help="concurrent uploaders")
+    parser.add_argument("--rows", type=int, default=20000, help="rows per uploaded CSV")
+    parser.add_argument("--viewers", type=int, default=3, help="WebSocket viewers per upload")
+    parser.add_argument("--searchers", type=int, default=8)
+    parser.add_argument("--crud", type=int, default=4, help="concurrent create/update/delete loops")
+    parser.add_argument("--seed-products", type=int, default=50000)
+    parser.add_argument("--api-workers", type=int, default=1)
+    parser.add_argument("--webhook-workers", type=int, default=8, help="threads of the webhooks worker")
+    parser.add_argument("--webhook-latency-ms", type=float, default=50)
+    parser.add_argument("--webhook-jitter-ms", type=float, default=50)
+    parser.add_argument("--webhook-error-rate", type=float, default=0.05)
+    parser.add_argument("--webhook-grace", type=float, default=30, help="max seconds to wait for webhooks after the run")
+    parser.add_argument("--import-timeout", type=float, default=600, help="max seconds without progress messages")
+    parser.add_argument("--redis-url", default="", help="broker; default is kombu's SQLAlchemy transport in DATABASE_URL")
+    parser.add_argument("--history", default=os.path.join(BACKEND, "loadtest", "results", "history.jsonl"))
+    parser.add_argument("--label", default="", help="free-form note stored with the run")
+    parser.add_argument("--keep-data", action="store_true", help="leave uploaded/CRUD products in place")
+    args = parser.parse_args()
+
+    if not settings.DATABASE_URL.startswith("postgresql"):
+        raise SystemExit("DATABASE_URL must point at a local Postgres")
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=BACKEND, check=True)
+    engine = create_engine(settings.DATABASE_URL)
+    seeded = _seed(engine, args.seed_products)
+    _drop_stale_webhooks(engine)
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    upstash = FakeUpstash().start()
+    receiver = FakeWebhookReceiver(args.webhook_latency_ms, args.webhook_jitter_ms, args.webhook_error_rate, WEBHOOK_SECRET).start()
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        "UPSTASH_REDIS_REST_URL": upstash.url,
+        "UPSTASH_REDIS_REST_TOKEN": upstash.token,
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "WEBHOOK_SECRET": WEBHOOK_SECRET,
+        "DATABASE_REPLICA_URLS": "",
+    }
+    if args.redis_url:
+        env.update(REDIS_URL=args.redis_url, CELERY_BROKER_URL=args.redis_url, CELERY_RESULT_BACKEND=args.redis_url)
+    else:
+        env.update(
+            CELERY_BROKER_URL="sqla+" + settings.DATABASE_URL,
+            CELERY_RESULT_BACKEND=f"file://{os.path.join(workdir, 'results')}",
+        )
+        os.makedirs(os.path.join(workdir, "results"))
+    celery = [sys.executable, "-m", "celery", "-A", "app.celery_worker.celery_app", "worker", "--loglevel=warning"]
+    # With a polled transport, acks from pool threads are only flushed between polls: once the
+    # prefetch window is full the worker idles out the 2s poll timeout, so give the threads a deeper one
+    threads_prefetch = [] if args.redis_url else ["--prefetch-multiplier", "16"]
+    processes = []
+    hooks = []
+    try:
+        processes.append(_start("api", [sys.executable, "-m", "uvicorn", "app.app:app", "--port", str(port),
+                                        "--workers", str(args.api_workers), "--log-level", "warning"], env, workdir))
+        processes.append(_start("worker-imports", celery + ["-Q", settings.CELERY_IMPORTS_QUEUE, "-c", "1", "-n", "imports@%h"], env, workdir))
+        processes.append(_start("worker-webhooks", celery + [
+            "-Q", f"{settings.CELERY_WEBHOOKS_QUEUE},{settings.CELERY_CONTROL_QUEUE}",
+            "-P", "threads", "-c", str(args.webhook_workers), "-n", "webhooks@%h", *threads_prefetch,
+        ], env, workdir))
+        _wait_ready(base_url, processes)
+        hooks = httpx.post(f"{base_url}/webhooks", json={"url": receiver.url + WEBHOOK_PATH, "events": WEBHOOK_EVENTS}, timeout=10).json()
+
+        print(f"load test: {args.duration:.0f}s against {base_url}, logs in {workdir}")
+        recorder, elapsed = asyncio.run(_drive(args, base_url, receiver, seeded))
+    finally:
+        for hook in hooks:
+            try:
+                httpx.delete(f"{base_url}/webhooks/{hook['id']}", timeout=5)
+            except httpx.HTTPError:
+                pass
+        _stop(processes)
+        upstash.stop()
+        receiver.stop()
+        _drop_stale_webhooks(engine)
+        if not args.keep_data:
+            _cleanup(engine)
+
+    profile = {k: v for k, v in vars(args).items() if k not in ("history", "label", "keep_data", "webhook_grace", "import_timeout")}
+    profile["broker"] = "redis" if args.redis_url else "postgres"
+    results = recorder.summary(elapsed)
+    previous = previous_run(args.history, profile)
+    print_table(results, previous)
+    webhooks = receiver.summary()
+    print(f"webhook receiver: {webhooks}")
+    print(f"upstash commands: {dict(upstash.commands)}")
+    append_run(args.history, profile, results, {"label": args.label, "elapsed": round(elapsed, 1), "webhooks": webhooks})
+    print(f"recorded in {args.history}")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# loadtest/scenarios.py
+"""
+Traffic generators. Each runs as `concurrency` independent loops until the
+deadline, recording every operation's latency in a Recorder:
+
+  uploads   POST /upload-csv of a generated CSV, then `viewers` WebSocket
+            clients follow the job on /ws/import-progress/{id}
+            (upload.request, ws.first_message, ws.complete = upload to done)
+  search    GET /products with a search term, a SKU lookup or plain paging
+  crud      POST, PUT and DELETE /products, each firing a webhook
+            (webhook.e2e = API response to arrival at the receiver)
+"""
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import httpx
+import websockets
+
+SEED_PREFIX = "LTSEED-"
+UPLOAD_PREFIX = "LTUP-"
+CRUD_PREFIX = "LTCRUD-"
+WORDS = ("alpha", "bravo", "cobalt", "delta", "ember", "fjord", "garnet", "harbor", "indigo", "juniper", "kelvin", "lumen")
+
+
+def csv_payload(rows: int, tag: str) -> bytes:
+    lines = ["sku,name,description,price"]
+    for i in range(rows):
+        word = WORDS[i % len(WORDS)]
+        lines.append(f"{UPLOAD_PREFIX}{tag}-{i},{word} item {i},generated {word} product,{(i % 5000) / 100 + 1:.2f}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class Context:
+    def __init__(self, base_url: str, recorder, deadline: float, receiver=None):
+        self.base_url = base_url
+        self.ws_url = "ws" + base_url[len("http"):]
+        self.recorder = recorder
+        self.deadline = deadline
+        self.receiver = receiver
+        self.client = httpx.AsyncClient(base_url=base_url, timeout=60)
+        self.crud_sent = {}  # (event, sku) -> when the API answered
+        self.rng = random.Random()
+
+    def running(self) -> bool:
+        return time.monotonic() < self.deadline
+
+    async def timed(self, operation: str, request):
+        """Await an httpx request, recording its latency (or an error for non-2xx/exceptions)."""
+        started = time.perf_counter()
+        try:
+            response = await request
+        except Exception:
+            self.recorder.error(operation)
+            return None
+        if response.status_code >= 400:
+            self.recorder.error(operation)
+            return None
+        self.recorder.add(operation, time.perf_counter() - started)
+        return response
+
+    async def close(self):
+        await self.client.aclose()
+
+
+async def _view(ctx: Context, job_id: int, uploaded_at: float, timeout: float):
+    started = time.perf_counter()
+    first = None
+    try:
+        async with websockets.connect(f"{ctx.ws_url}/ws/import-progress/{job_id}", open_timeout=10) as ws:
+            while True:
+                message = json.loads(await asyncio.wait_for(ws.recv(), timeout))
+                if first is None:
+                    first = time.perf_counter()
+                    ctx.recorder.add("ws.first_message", first - started)
+                status = message.get("status")
+                if status in ("complete", "failed"):
+                    if status == "complete":
+                        ctx.recorder.add("ws.complete", time.perf_counter() - uploaded_at)
+                    else:
+                        ctx.recorder.error("ws.complete")
+                    return
+    except Exception:
+        ctx.recorder.error("ws.complete")
+
+
+async def uploads(ctx: Context, rows: int, viewers: int, import_timeout: float):
+    while ctx.running():
+        tag = uuid.uuid4().hex[:8]
+        uploaded_at = time.perf_counter()
+        response = await ctx.timed("upload.request", ctx.client.post(
+            "/upload-csv", files={"file": (f"loadtest-{tag}.csv", csv_payload(rows, tag), "text/csv")},
+        ))
+        if response is None:
+            await asyncio.sleep(1)
+            continue
+        job_id = response.json()["job_id"]
+        # Viewers connect right after the upload, like the UI does; the loop waits for the import
+        await asyncio.gather(*(_view(ctx, job_id, uploaded_at, import_timeout) for _ in range(max(1, viewers))))
+
+
+async def search(ctx: Context, seeded: int):
+    while ctx.running():
+        kind = ctx.rng.random()
+        if kind < 0.6:
+            await ctx.timed("search.q", ctx.client.get("/products", params={"q": ctx.rng.choice(WORDS), "per_page": 50}))
+        elif kind < 0.8 and seeded:
+            sku = f"{SEED_PREFIX}{ctx.rng.randrange(seeded)}"
+            await ctx.timed("search.sku", ctx.client.get("/products", params={"sku": sku}))
+        else:
+            await ctx.timed("search.page", ctx.client.get("/products", params={"page": ctx.rng.randint(1, 20), "per_page": 50}))
+
+
+async def crud(ctx: Context):
+    while ctx.running():
+        sku = f"{CRUD_PREFIX}{uuid.uuid4().hex[:12]}"
+        body = {"sku": sku, "name": f"{ctx.rng.choice(WORDS)} crud", "description": "load test", "price_cents": 1999}
+        response = await ctx.timed("crud.create", ctx.client.post("/products", json=body))
+        if response is None:
+            await asyncio.sleep(0.5)
+            continue
+        ctx.crud_sent[("product.created", sku)] = time.time()
+        product_id = response.json()["id"]
+        body["price_cents"] = 2499
+        if await ctx.timed("crud.update", ctx.client.put(f"/products/{product_id}", json={**body, "active": True})):
+            ctx.crud_sent[("product.updated", sku)] = time.time()
+        if await ctx.timed("crud.delete", ctx.client.delete(f"/products/{product_id}")):
+            ctx.crud_sent[("product.deleted", sku)] = time.time()
+
+
+def webhook_latencies(ctx: Context):
+    """Record webhook.e2e for every product event that reached the receiver; count the rest as errors."""
+    arrivals = ctx.receiver.arrivals if ctx.receiver else {}
+    for key, sent in ctx.crud_sent.items():
+        arrived = arrivals.get(key)
+        if arrived is None:
+            ctx.recorder.error("webhook.e2e")
+        else:
+            ctx.recorder.add("webhook.e2e", max(0.0, arrived - sent))
@@ -0,0 +1,28 @@
+import os
+import tempfile
+
+# Tests run against a throwaway SQLite database and in-memory broker, configured before app is imported
+_workdir = tempfile.mkdtemp(prefix="catalog-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/catalog.db"
+os.environ["UPLOAD_DIR"] = os.path.join(_workdir, "uploads")
+os.environ["CELERY_BROKER_URL"] = "memory://"
+os.environ["CELERY_RESULT_BACKEND"] = "cache+memory://"
+os.environ.setdefault("UPSTASH_REDIS_REST_URL", "http://127.0.0.1:1")
+os.environ.setdefault("UPSTASH_REDIS_REST_TOKEN", "test")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app import models
+    from app.app import app
+    from app.database import engine
+
+    models.Base.metadata.create_all(bind=engine)  # alembic owns the schema in real deployments
+    with engine.begin() as conn:
+        conn.execute(models.CacheGeneration.__table__.insert(), [{"name": n, "value": 0} for n in ("catalog", "jobs", "webhooks")])
+    with TestClient(app) as c:
+        yield c
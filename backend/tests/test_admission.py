@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import admission
+from app.admission import SkuProfile, overlaps, queue_estimates, throughput
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _job(skus=(), mode="upsert"):
+    profile = SkuProfile()
+    for sku in skus:
+        profile.add(sku)
+    return {"mode": mode, **profile.fields()}
+
+
+def test_overlapping_feeds():
+    assert overlaps(_job(["A-1", "B-2"]), _job(["b-2", "C-3"]))  # sku_lower, case-insensitive
+
+
+def test_disjoint_ranges():
+    assert not overlaps(_job(["A-1", "A-9"]), _job(["B-1", "B-9"]))
+
+
+def test_interleaved_ranges_with_disjoint_bitmaps():
+    a, b = _job(["A-1", "C-1"]), _job(["B-1"])
+    assert a["sku_min"] < b["sku_min"] < a["sku_max"]
+    assert not overlaps(a, b)
+
+
+def test_feed_without_skus_overlaps_nothing():
+    assert not overlaps(_job([]), _job(["A-1"]))
+    assert not overlaps(_job(["A-1"]), _job(["", "x" * 1000]))
+
+
+@pytest.mark.parametrize("mode", ["delta", "replace"])
+def test_unbounded_modes_overlap_everything(mode):
+    assert overlaps(_job([], mode=mode), _job(["Z-1"]))
+    assert overlaps(_job(["A-1"]), _job([], mode=mode))
+
+
+def _active(job_id, status, total_bytes=1000, processed_bytes=0, started=None):
+    return {
+        "id": job_id, "status": status, "total_bytes": total_bytes, "processed_bytes": processed_bytes,
+        "started_at": None if started is None else NOW - timedelta(seconds=started),
+    }
+
+
+def test_queue_without_throughput_history(monkeypatch):
+    monkeypatch.setattr(admission.settings, "IMPORT_MAX_CONCURRENT", 1)
+    active = [_active(3, "queued"), _active(1, "running", started=5), _active(2, "queued")]
+    assert queue_estimates(active, throughput([]), NOW) == {
+        1: {"queue_position": 0, "eta_seconds": None},
+        2: {"queue_position": 1, "eta_seconds": None},
+        3: {"queue_position": 2, "eta_seconds": None},
+    }
+
+
+def test_queue_plays_out_over_slots(monkeypatch):
+    monkeypatch.setattr(admission.settings, "IMPORT_MAX_CONCURRENT", 2)
+    recent = [{"total_bytes": 1000, "started_at": NOW - timedelta(seconds=20), "updated_at": NOW - timedelta(seconds=10)}]
+    rate = throughput(recent)
+    assert rate == 100
+    active = [
+        _active(1, "running", total_bytes=1000, processed_bytes=500, started=10),  # 50 B/s, 10s left
+        _active(2, "queued", total_bytes=300),  # free slot: 3s
+        _active(3, "queued", total_bytes=1000),  # after #2: 3s + 10s
+    ]
+    assert queue_estimates(active, rate, NOW) == {
+        1: {"queue_position": 0, "eta_seconds": 10},
+        2: {"queue_position": 1, "eta_seconds": 3},
+        3: {"queue_position": 2, "eta_seconds": 13},
+    }
@@ -0,0 +1,90 @@
+import builtins
+import gzip
+import zipfile
+
+import pytest
+
+from app.compression import UnsupportedUpload, UploadReader, check_upload, compression_for, open_upload_text
+
+CSV = "sku,name,description,price\nZ-1,zipped,,1\n"
+
+
+def _write(tmp_path, name, compression=None, data=CSV.encode()):
+    path = tmp_path / name
+    if compression == "gzip":
+        data = gzip.compress(data)
+    elif compression == "zstd":
+        data = pytest.importorskip("zstandard").ZstdCompressor().compress(data)
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.parametrize("name,compression", [
+    ("feed.csv", None), ("FEED.CSV.GZ", "gzip"), ("feed.csv.zst", "zstd"), ("feed.zip", "zip"),
+])
+def test_compression_for(name, compression):
+    assert compression_for(name) == compression
+
+
+@pytest.mark.parametrize("name", ["feed.txt", "feed.gz", "feed.csv.bz2", "feed.tar"])
+def test_compression_for_rejects_other_suffixes(name):
+    with pytest.raises(UnsupportedUpload):
+        compression_for(name)
+
+
+@pytest.mark.parametrize("name,compression", [("feed.csv", None), ("feed.csv.gz", "gzip"), ("feed.csv.zst", "zstd")])
+def test_reads_decompressed(tmp_path, name, compression):
+    path = _write(tmp_path, name, compression)
+    check_upload(path)
+    with open_upload_text(path) as f:
+        assert f.read() == CSV
+        assert f.buffer.bytes_read == f.buffer.total_bytes
+
+
+def test_reads_single_member_zip(tmp_path):
+    path = tmp_path / "feed.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("dir/", "")
+        zf.writestr("dir/feed.csv", CSV)
+    check_upload(str(path))
+    with open_upload_text(str(path)) as f:
+        assert f.read() == CSV
+
+
+def test_rejects_multi_member_zip(tmp_path):
+    path = tmp_path / "feed.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("a.csv", CSV)
+        zf.writestr("b.csv", CSV)
+    with pytest.raises(UnsupportedUpload, match="exactly one"):
+        check_upload(str(path))
+
+
+@pytest.mark.parametrize("name", ["feed.zip", "feed.csv.gz", "feed.csv.zst"])
+def test_rejects_mislabelled_upload(tmp_path, name):
+    with pytest.raises(UnsupportedUpload):
+        check_upload(_write(tmp_path, name))
+
+
+def test_corrupt_gzip_fails_while_reading(tmp_path):
+    data = gzip.compress(CSV.encode() * 100)
+    path = _write(tmp_path, "feed.csv.gz", data=data[:len(data) // 2])
+    check_upload(path)  # the magic is intact
+    with UploadReader(path) as reader, pytest.raises(EOFError):
+        reader.read()
+
+
+def test_zstd_without_zstandard(tmp_path, monkeypatch):
+    real_import = builtins.__import__
+
+    def no_zstandard(name, *args, **kwargs):
+        if name == "zstandard":
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    path = _write(tmp_path, "feed.csv.zst", data=b"\x28\xb5\x2f\xfd")
+    monkeypatch.setattr(builtins, "__import__", no_zstandard)
+    with pytest.raises(UnsupportedUpload, match="zstandard"):
+        check_upload(path)
+    with pytest.raises(UnsupportedUpload, match="zstandard"):
+        UploadReader(path)
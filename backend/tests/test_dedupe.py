@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+
+from app import app as app_module, crud
+from app.config import settings
+from app.database import SessionLocal
+
+FEED = b"sku,name,description,price\nDUP-1,one,,1.00\nDUP-2,two,,2.00\n"
+
+
+def _upload(client, mode):
+    r = client.post("/upload-csv", params={"mode": mode}, files={"file": ("feed.csv", FEED)})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_same_bytes_in_another_mode_is_not_a_duplicate(client, monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_DEDUPE_MODE", "reuse")
+    first = _upload(client, "upsert")
+    db = SessionLocal()
+    try:
+        crud.update_import_job(db, first["job_id"], status="complete", total_rows=2, processed_rows=2, rejected_rows=0)
+    finally:
+        db.close()
+
+    # SQLite refuses mode=replace at upload (422); look like Postgres to reach the duplicate check
+    with monkeypatch.context() as m:
+        m.setattr(app_module, "import_engine", SimpleNamespace(dialect=SimpleNamespace(name="postgresql")))
+        replace = _upload(client, "replace")
+    assert "duplicate_of" not in replace
+
+    again = _upload(client, "upsert")
+    assert again["duplicate_of"] == first["job_id"]
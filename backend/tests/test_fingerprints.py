@@ -0,0 +1,34 @@
+from app.fingerprints import FingerprintIndex, sku_key
+from app.parsers import copy_field
+
+
+def _index(tmp_path):
+    index = FingerprintIndex(str(tmp_path / "fingerprints" / "products.sqlite3"))
+    index.begin({})
+    return index
+
+
+def test_copy_field_decodes_escapes():
+    assert copy_field("A\\\\B") == "A\\B"
+    assert copy_field("x\\ty") == "x\ty"
+    assert copy_field("plain") == "plain"
+
+
+def test_backslash_sku_is_not_missing(tmp_path):
+    index = _index(tmp_path)
+    try:
+        # The COPY field A\\B loads as sku_lower a\b
+        index.filter_block("A\\\\B\tname\t\t100\t\n")
+        assert sku_key("A\\\\B") == "a\\b"
+        assert index.missing([(1, "a\\b"), (2, "gone")]) == [2]
+    finally:
+        index.discard()
+
+
+def test_forgotten_backslash_sku_is_not_missing(tmp_path):
+    index = _index(tmp_path)
+    try:
+        index.forget("C\\\\D")  # a row the database refused, as its COPY field
+        assert index.missing([(1, "c\\d")]) == []
+    finally:
+        index.discard()
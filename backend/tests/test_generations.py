@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from app import crud, models
+from app.config import settings
+from app.database import SessionLocal
+
+
+def _silence_active_jobs():
+    db = SessionLocal()
+    try:
+        db.query(models.ImportJob).filter(models.ImportJob.status.in_(("queued", "running"))).update(
+            {"updated_at": datetime.utcnow() - timedelta(seconds=settings.IMPORT_STALE_SECONDS + 60)},
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_oversized_upload_fails_its_job(client, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_BYTES", 10)
+    r = client.post("/upload-csv", files={"file": ("big.csv", b"sku,name,description,price\n" * 10)})
+    assert r.status_code == 413
+    job = client.get("/import-jobs").json()["jobs"][0]
+    assert job["status"] == "failed"
+    assert job["error"] == r.json()["detail"]
+
+
+def test_stale_active_job_does_not_disable_etags(client):
+    _silence_active_jobs()
+    assert client.get("/import-jobs").headers.get("etag")
+
+    db = SessionLocal()
+    try:
+        job_id = crud.create_import_job(db, original_filename="live.csv").id
+    finally:
+        db.close()
+    assert client.get("/import-jobs").headers.get("etag") is None  # a live import: no ETag
+
+    _silence_active_jobs()
+    assert client.get("/import-jobs").headers.get("etag")
+    db = SessionLocal()
+    try:
+        crud.update_import_job(db, job_id, status="failed")
+    finally:
+        db.close()
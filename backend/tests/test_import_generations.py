@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import select
+
+from app import crud, generations, models, tasks
+from app.database import SessionLocal
+
+
+@pytest.fixture
+def counters(client):
+    def read():
+        db = SessionLocal()
+        try:
+            return dict(db.execute(select(models.CacheGeneration.name, models.CacheGeneration.value)).all())
+        finally:
+            db.close()
+    return read
+
+
+def _job(path, **fields):
+    db = SessionLocal()
+    try:
+        job = crud.create_import_job(db, original_filename="feed.csv", file_path=str(path), **fields)
+        return job.id
+    finally:
+        db.close()
+
+
+def test_import_bumps_only_what_it_changed(tmp_path, counters):
+    feed = tmp_path / "feed.csv"
+    feed.write_text("sku,name,description,price\nGEN-1,one,,1.00\nGEN-2,two,,2.00\n")
+    job_id = _job(feed)
+
+    before = counters()
+    tasks.import_csv_task.apply(args=(str(feed), job_id), throw=True)
+    after = counters()
+    assert after[generations.CATALOG] == before[generations.CATALOG] + 1
+    assert after[generations.JOBS] == before[generations.JOBS] + 1
+
+    # A redelivered message for the finished job is skipped and changes nothing
+    tasks.import_csv_task.apply(args=(str(feed), job_id), throw=True)
+    assert counters() == after
+
+
+def test_failed_import_bumps_jobs_only(tmp_path, counters):
+    feed = tmp_path / "feed.csv"
+    feed.write_text("sku,name,description,price\nGEN-3,three,,3.00\n")
+    job_id = _job(feed, mode="replace")  # needs Postgres: fails before loading anything
+
+    before = counters()
+    with pytest.raises(ValueError):
+        tasks.import_csv_task.apply(args=(str(feed), job_id), throw=True)
+    after = counters()
+    assert after[generations.CATALOG] == before[generations.CATALOG]
+    assert after[generations.JOBS] == before[generations.JOBS] + 1
+
+
+def test_job_write_and_bump_commit_together(tmp_path, counters):
+    job_id = _job(tmp_path / "feed.csv")
+    before = counters()
+    db = SessionLocal()
+    try:
+        crud.update_import_job(db, job_id, processed_rows=5)
+        assert not db.in_transaction()
+    finally:
+        db.close()
+    assert counters()[generations.JOBS] == before[generations.JOBS] + 1
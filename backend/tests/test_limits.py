@@ -0,0 +1,51 @@
+import time
+
+from app import limits
+from app.limits import Slot, lease_held
+
+
+class FakeRedis:
+    def __init__(self):
+        self.leases = {}
+
+    def eval(self, script, numkeys, key, now, limit, expires, token, ttl):
+        self.leases[token] = expires
+        return 1
+
+    def zadd(self, key, mapping, xx=False):
+        self.leases.update(mapping)
+
+    def pexpire(self, key, ttl):
+        pass
+
+    def zrem(self, key, token):
+        self.leases.pop(token, None)
+
+    def zcount(self, key, low, high):
+        return sum(1 for expires in self.leases.values() if expires >= low)
+
+
+def test_keep_alive_renews_until_release(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(limits, "_client", client)
+    slot = Slot("test", 1, lease_seconds=0.3)
+    assert slot.acquire()
+    first = client.leases[slot.token]
+    slot.keep_alive()
+    time.sleep(0.5)  # past the first lease, with no renew() from the holder
+    assert client.leases[slot.token] > first
+    slot.release()
+    assert slot.token not in client.leases
+    assert slot._heartbeat is None
+
+
+def test_lease_held(monkeypatch):
+    monkeypatch.setattr(limits, "_client", False)
+    assert lease_held("job") is None  # no Redis: unknown
+    monkeypatch.setattr(limits, "_client", FakeRedis())
+    slot = Slot("job", 1, lease_seconds=60)
+    assert lease_held("job") is False
+    slot.acquire()
+    assert lease_held("job") is True
+    slot.release()
+    assert lease_held("job") is False
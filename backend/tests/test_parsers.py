@@ -0,0 +1,55 @@
+import pytest
+
+from app.parsers import ENGINES, resolve_engine_name
+from app.validation import RejectsWriter
+
+pytest.importorskip("pyarrow")
+
+HEADER = "sku,name,description,price"
+FEEDS = {
+    "quoting": HEADER + '\nQ-1,"Widget, large","says ""hi""",1.00\nQ-2,"two\nlines",,"$2,000.50"\n',
+    "bom": "﻿" + HEADER + "\nB-1,bom,,3\n",
+    "rejects": HEADER + "\nR-1,,,1\n,nameless,,2\nR-3,bad price,,abc\nR-4,ok,,4\n",
+    "ragged": HEADER + "\nG-1,short\nG-2,long,desc,5,surplus\nG-3,fine,,6\n",
+    "extra_columns": HEADER + ",Color,colour,size\nX-1,attr,,7,Red,red,\nX-2,plain,,8,,,\n",
+    "escapes": HEADER + "\nE-1,tab\there,back\\slash,9\n",
+}
+
+
+def _run(engine, path, tmp_path):
+    rejects_path = tmp_path / f"{engine}-rejects.csv"
+    with RejectsWriter(str(rejects_path)) as rejects, ENGINES[engine](str(path), rejects=rejects) as parser:
+        blocks = []
+        while (block := parser.read_block(2)) is not None:
+            blocks.append(block)
+        rows = parser.count_rows()
+    rejects_text = rejects_path.read_text(encoding="utf-8") if rejects_path.exists() else ""
+    return "".join(text for text, _ in blocks), sum(n for _, n in blocks), rows, rejects.rejected, rejects_text
+
+
+@pytest.mark.parametrize("feed", sorted(FEEDS))
+def test_engines_agree(feed, tmp_path):
+    path = tmp_path / f"{feed}.csv"
+    path.write_bytes(FEEDS[feed].encode("utf-8"))
+    python = _run("python", path, tmp_path)
+    assert python[1] > 0
+    assert _run("pyarrow", path, tmp_path) == python
+
+
+def test_rejects_and_attributes(tmp_path):
+    path = tmp_path / "feed.csv"
+    path.write_bytes((FEEDS["rejects"] + "").encode("utf-8"))
+    text, loaded, total, rejected, rejects_text = _run("python", path, tmp_path)
+    assert (loaded, total, rejected) == (1, 4, 3)
+    assert text.startswith("R-4\tok\t\t400\t")
+    assert "missing name" in rejects_text and "invalid price" in rejects_text
+
+    path.write_bytes(FEEDS["extra_columns"].encode("utf-8"))
+    text = _run("pyarrow", path, tmp_path)[0]
+    assert text.splitlines()[0] == 'X-1\tattr\t\t700\t{"Color": "Red", "colour": "red"}'
+
+
+def test_auto_engine_prefers_pyarrow():
+    assert resolve_engine_name("auto") == "pyarrow"
+    with pytest.raises(ValueError):
+        resolve_engine_name("pandas")
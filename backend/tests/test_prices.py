@@ -0,0 +1,70 @@
+import pytest
+
+from app.prices import MAX_PRICE_CENTS, InvalidPrice, PriceNormalizer
+
+CASES = [
+    ("19.99", 1999),
+    ("-5", -500),
+    (".5", 50),
+    ("$1,234.50", 123450),
+    ("1 234.50 EUR", 123450),
+    ("US$ 7", 700),
+    ("-$3.10", -310),
+    ("  42  ", 4200),
+    ("1e3", 100000),
+    ("-2.5E1", -2500),
+    ("0.005", 1),
+    ("0.004", 0),
+    ("1.994", 199),
+    ("1.995", 200),
+    ("-1.995", -200),
+    ("", None),
+    ("   ", None),
+]
+REJECTS = ["abc", "1.2.3", "1,23,4", "12,34", "1,2345", "$", "-", ".", "5-", "1e", "e3", str(MAX_PRICE_CENTS + 1)]
+
+
+@pytest.mark.parametrize("value,cents", CASES)
+def test_parse_strict(value, cents):
+    assert PriceNormalizer(".").parse_strict(value) == cents
+
+
+@pytest.mark.parametrize("value", REJECTS)
+def test_parse_strict_rejects(value):
+    with pytest.raises(InvalidPrice):
+        PriceNormalizer(".").parse_strict(value)
+
+
+def test_comma_decimal_separator():
+    normalizer = PriceNormalizer(",")
+    assert normalizer.parse_strict("1.234,56 €") == 123456
+    assert normalizer.parse_strict("0,5") == 50
+    with pytest.raises(InvalidPrice):
+        normalizer.parse_strict("1,234.56")
+
+
+def test_parse_counts_rejects_not_blanks():
+    normalizer = PriceNormalizer(".")
+    assert [normalizer.parse(v) for v in ("1", "", "abc", None)] == [100, None, None, None]
+    assert (normalizer.parsed, normalizer.rejected, normalizer.samples) == (1, 1, ["abc"])
+
+
+@pytest.mark.parametrize("separator", [".", ","])
+def test_parse_arrow_matches_parse_strict(separator):
+    pa = pytest.importorskip("pyarrow")
+    values = [v for v, _ in CASES] + REJECTS + ["1.234,56", "0,5", " 1 ", "1'000.25", str(MAX_PRICE_CENTS)]
+    strict = PriceNormalizer(separator)
+    expected = []
+    for value in values:
+        try:
+            cents = strict.parse_strict(value)
+        except InvalidPrice:
+            cents = None
+        expected.append("" if cents is None else str(cents))
+
+    vectorized = PriceNormalizer(separator)
+    assert vectorized.parse_arrow(pa.array(values, pa.string())).to_pylist() == expected
+    scalar = PriceNormalizer(separator)
+    for value in values:
+        scalar.parse(value)
+    assert (vectorized.parsed, vectorized.rejected) == (scalar.parsed, scalar.rejected)
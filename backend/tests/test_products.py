@@ -0,0 +1,22 @@
+from app import models
+from app.database import SessionLocal
+
+
+def test_attribute_filters_on_sqlite(client):
+    db = SessionLocal()
+    try:
+        db.add_all([
+            models.Product(sku="ATTR-1", sku_lower="attr-1", name="red small", attributes={"color": "red", "size": "S"}),
+            models.Product(sku="ATTR-2", sku_lower="attr-2", name="red large", attributes={"color": "red", "size": "L"}),
+            models.Product(sku="ATTR-3", sku_lower="attr-3", name="plain", attributes=None),
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    r = client.get("/products", params={"attr.color": "red", "q": "red"})
+    assert r.status_code == 200, r.text
+    assert sorted(p["sku"] for p in r.json()["items"]) == ["ATTR-1", "ATTR-2"]
+
+    r = client.get("/products", params={"attr.color": "red", "attr.size": "L"})
+    assert [p["sku"] for p in r.json()["items"]] == ["ATTR-2"]
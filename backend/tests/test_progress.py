@@ -0,0 +1,32 @@
+import time
+from datetime import datetime, timedelta
+
+from app import crud, models
+from app.database import SessionLocal
+from app.progress import Heartbeat
+
+
+def _updated_at(job_id):
+    db = SessionLocal()
+    try:
+        return db.get(models.ImportJob, job_id).updated_at
+    finally:
+        db.close()
+
+
+def test_heartbeat_touches_running_job(client):
+    db = SessionLocal()
+    try:
+        running = crud.create_import_job(db, original_filename="a.csv").id
+        queued = crud.create_import_job(db, original_filename="b.csv").id
+        long_ago = datetime.utcnow() - timedelta(hours=1)
+        db.query(models.ImportJob).filter(models.ImportJob.id == running).update({"status": "running", "updated_at": long_ago})
+        db.query(models.ImportJob).filter(models.ImportJob.id == queued).update({"updated_at": long_ago})
+        db.commit()
+    finally:
+        db.close()
+
+    with Heartbeat(running, interval=0.05), Heartbeat(queued, interval=0.05):
+        time.sleep(0.3)
+    assert _updated_at(running) > long_ago + timedelta(minutes=30)
+    assert _updated_at(queued) == long_ago  # only running jobs are kept alive
@@ -0,0 +1,52 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine
+
+from app import models
+from app.sinks import SQLiteSink
+from app.validation import RejectsWriter
+
+
+@pytest.fixture
+def sink(tmp_path):
+    path = tmp_path / "catalog.db"
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(engine, tables=[models.Product.__table__])
+    engine.dispose()
+    conn = sqlite3.connect(path)
+    yield SQLiteSink(conn)
+    conn.close()
+
+
+def _skus(sink):
+    return [row[0] for row in sink.conn.execute("SELECT sku FROM products ORDER BY sku")]
+
+
+def _block(*skus, bad=None):
+    lines = [f"{sku}\tname {sku}\t\t100\t" for sku in skus]
+    if bad is not None:
+        lines.insert(bad[0], bad[1])
+    return "".join(line + "\n" for line in lines)
+
+
+@pytest.mark.parametrize("bad_line", [
+    "BAD\tescaped tab\\\t\t100\t",  # COPY would refuse the escaped delimiter
+    "BAD\t\t\t100\t",  # empty name loads as NULL and violates NOT NULL
+])
+def test_bisection_rejects_only_the_bad_row(sink, bad_line):
+    skus = [f"S-{i:02d}" for i in range(9)]
+    rejects = RejectsWriter()
+    loaded = sink.load(_block(*skus, bad=(5, bad_line)), rejects)
+    assert loaded == 9
+    assert rejects.rejected == 1
+    assert list(rejects.reasons) == ["database error"]
+    assert _skus(sink) == skus
+
+
+def test_clean_block_loads_in_one_write(sink):
+    rejects = RejectsWriter()
+    assert sink.load(_block("A", "B", "a"), rejects) == 3
+    assert rejects.rejected == 0
+    # last row per SKU wins, case-insensitively
+    assert _skus(sink) == ["B", "a"]
@@ -0,0 +1,21 @@
+import pytest
+
+FEED = b"sku,name,description,price\nU-1,one,,1\n"
+
+
+def _job_count(client):
+    return len(client.get("/import-jobs").json()["jobs"])
+
+
+@pytest.mark.parametrize("params", [{"mode": "delta"}, {"mode": "replace"}, {"profile": "true"}])
+def test_sqlite_refuses_postgres_only_options(client, params):
+    before = _job_count(client)
+    r = client.post("/upload-csv", params=params, files={"file": ("feed.csv", FEED)})
+    assert r.status_code == 422
+    assert "SQLite" in r.json()["detail"]
+    assert _job_count(client) == before  # refused before a job is created
+
+
+def test_unknown_mode_is_a_bad_request(client):
+    r = client.post("/upload-csv", params={"mode": "merge"}, files={"file": ("feed.csv", FEED)})
+    assert r.status_code == 400
@@ -0,0 +1,109 @@
+import hashlib
+import hmac
+import json
+
+import httpx
+import pytest
+
+from app import webhooks
+from app.webhooks import CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(webhooks, "redis_client", lambda: None)
+    monkeypatch.setattr(webhooks, "_local_circuits", {})
+    monkeypatch.setattr(webhooks.time, "time", clock.time)
+    monkeypatch.setattr(webhooks.settings, "WEBHOOK_BREAKER_FAILURES", 3)
+    monkeypatch.setattr(webhooks.settings, "WEBHOOK_BREAKER_COOLDOWN_SECONDS", 60)
+    monkeypatch.setattr(webhooks.settings, "WEBHOOK_BREAKER_MAX_COOLDOWN_SECONDS", 100)
+    monkeypatch.setattr(webhooks.settings, "LIMIT_RETRY_SECONDS", 5)
+    return clock
+
+
+def test_opens_after_threshold_of_consecutive_failures(clock):
+    breaker = CircuitBreaker("http://receiver/hook")
+    breaker.record(False)
+    breaker.record(False)
+    breaker.record(True)  # a success resets the count
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.wait_seconds(probe_lease=30) == 0
+    breaker.record(False)
+    assert breaker.wait_seconds(probe_lease=30) == 60
+    assert CircuitBreaker("http://other/hook").wait_seconds(probe_lease=30) == 0
+
+
+def test_half_open_probe_after_cooldown(clock):
+    breaker = CircuitBreaker("http://receiver/hook")
+    for _ in range(3):
+        breaker.record(False)
+    clock.now += 59
+    assert breaker.wait_seconds(probe_lease=30) == 1
+    breaker.record(False)  # in flight when the circuit opened: not counted again
+
+    clock.now += 1
+    assert breaker.wait_seconds(probe_lease=30) == 0  # this delivery probes
+    assert breaker.wait_seconds(probe_lease=30) == 5  # the rest stay parked meanwhile
+    breaker.record(False)
+    assert breaker.wait_seconds(probe_lease=30) == 100  # re-opened, cooldown doubled (capped)
+
+    clock.now += 100
+    assert breaker.wait_seconds(probe_lease=30) == 0
+    breaker.record(True)
+    assert breaker.wait_seconds(probe_lease=30) == 0
+    assert webhooks._local_circuits[breaker.key] == {}
+
+
+def test_probe_lease_expires(clock):
+    breaker = CircuitBreaker("http://receiver/hook")
+    for _ in range(3):
+        breaker.record(False)
+    clock.now += 60
+    assert breaker.wait_seconds(probe_lease=30) == 0
+    clock.now += 31  # the probe never reported back
+    assert breaker.wait_seconds(probe_lease=30) == 0
+
+
+def test_disabled_breaker_never_parks(clock, monkeypatch):
+    monkeypatch.setattr(webhooks.settings, "WEBHOOK_BREAKER_FAILURES", 0)
+    breaker = CircuitBreaker("http://receiver/hook")
+    for _ in range(10):
+        breaker.record(False)
+    assert breaker.wait_seconds(probe_lease=30) == 0
+
+
+def test_signature_covers_the_bytes_sent(monkeypatch):
+    monkeypatch.setattr(webhooks.settings, "WEBHOOK_SECRET", "s3cret")
+    sent = []
+
+    def receiver(request):
+        sent.append(request)
+        return httpx.Response(204)
+
+    monkeypatch.setattr(webhooks, "_client", httpx.Client(transport=httpx.MockTransport(receiver)))
+    body = webhooks.encode("product.created", {"sku": "Ü-1", "price": 1.5})
+    result = webhooks.send("http://receiver/hook", "product.created", body, "delivery-1")
+
+    assert result["success"] and result["status"] == 204
+    request = sent[0]
+    assert request.content == body
+    expected = hmac.new(b"s3cret", request.content, hashlib.sha256).hexdigest()
+    assert request.headers["X-Signature"] == expected
+    assert request.headers["X-Signature-Alg"] == "HMAC-SHA256"
+    assert request.headers["X-Delivery-Id"] == "delivery-1"
+    assert json.loads(request.content) == {"event": "product.created", "data": {"sku": "Ü-1", "price": 1.5}}
+
+
+def test_unsigned_without_secret(monkeypatch):
+    monkeypatch.setattr(webhooks.settings, "WEBHOOK_SECRET", "")
+    assert "X-Signature" not in webhooks.headers_for("product.created", b"{}", "delivery-1")
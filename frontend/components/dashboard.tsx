@@ -13,9 +13,19 @@ interface ImportJob {
   status: string
   processed_rows: number
   total_rows: number
+  rejected_rows?: number
   percent: number
   original_filename?: string
   error?: string
+  queue_position?: number | null
+  eta_seconds?: number | null
+  wait_reason?: string | null
+}
+
+function formatEta(seconds: number) {
+  if (seconds < 60) return `${seconds}s`
+  if (seconds < 3600) return `${Math.round(seconds / 60)}m`
+  return `${Math.floor(seconds / 3600)}h ${Math.round((seconds % 3600) / 60)}m`
 }
 
 export default function Dashboard() {
@@ -188,7 +198,7 @@ export default function Dashboard() {
               </div>
               <p className="text-xs text-muted-foreground">Maximum 5GB • CSV format • You can upload another file while imports run</p>
             </div>
-            <input ref={inputRef} type="file" accept=".csv" className="hidden" onChange={handleFileChange} />
+            <input ref={inputRef} type="file" accept=".csv,.gz,.zst,.zip" className="hidden" onChange={handleFileChange} />
           </label>
 
           {/* Uploading State */}
@@ -322,11 +332,49 @@ export default function Dashboard() {
                   />
                 </div>
                 <div className="flex justify-between text-xs text-muted-foreground mb-1">
-                  <span>{displayProcessed}/{job.total_rows} rows</span>
+                  <span>{job.total_rows ? `${displayProcessed}/${job.total_rows}` : displayProcessed} rows</span>
                   <span>{displayPercent}%</span>
                 </div>
+                {(job.status === 'queued' || job.status === 'running') && (job.queue_position || job.eta_seconds != null) && (
+                  <p className="text-xs text-muted-foreground">
+                    {job.queue_position ? `#${job.queue_position} in queue` : 'Importing'}
+                    {job.eta_seconds != null && ` · done in ~${formatEta(job.eta_seconds)}`}
+                    {job.wait_reason && ` · waiting: ${job.wait_reason}`}
+                  </p>
+                )}
                 {job.error && <p className="text-xs text-destructive">{job.error}</p>}
-                {job.status === 'failed' && (
+                {!!job.rejected_rows && (
+                  <p className="text-xs text-muted-foreground">
+                    {job.rejected_rows} rows rejected ·{" "}
+                    <a className="underline" href={`${API_BASE_URL}/import-jobs/${job.id}/rejects`}>
+                      Download rejects CSV
+                    </a>
+                  </p>
+                )}
+                {(job.status === 'running' || job.status === 'paused') && (
+                  <div className="mt-2 flex gap-2">
+                    <button
+                      className="text-xs px-2 py-1 border border-border rounded hover:bg-[#1a1a1a]"
+                      onClick={async () => {
+                        const action = job.status === 'running' ? 'pause' : 'resume'
+                        await fetch(`${API_BASE_URL}/import-jobs/${job.id}/${action}`, { method: 'POST' })
+                        fetchJobs()
+                      }}
+                    >
+                      {job.status === 'running' ? 'Pause' : 'Resume'}
+                    </button>
+                    <button
+                      className="text-xs px-2 py-1 border border-border rounded hover:bg-[#1a1a1a]"
+                      onClick={async () => {
+                        await fetch(`${API_BASE_URL}/import-jobs/${job.id}/cancel`, { method: 'POST' })
+                        fetchJobs()
+                      }}
+                    >
+                      Cancel
+                    </button>
+                  </div>
+                )}
+                {(job.status === 'failed' || job.status === 'canceled') && (
                   <form
                     onSubmit={async (e) => {
                       e.preventDefault()
@@ -42,15 +42,17 @@ export default function FileUpload() {
             const msg = JSON.parse(ev.data)
             const processed = msg.processed || 0
             const total = msg.total || 0
-            const pct = total ? Math.floor((processed / total) * 100) : 0
+            const pct = typeof msg.percent === "number"
+              ? Math.floor(msg.percent)
+              : total ? Math.floor((processed / total) * 100) : 0
             setProgress(pct)
             setStatusText(msg.message || msg.status || "")
             if (msg.status === "complete") {
               ws.close()
               setStatus("success")
-            } else if (msg.status === "failed") {
+            } else if (msg.status === "failed" || msg.status === "paused" || msg.status === "canceled") {
               ws.close()
-              setErrorMessage(msg.message || "Import failed")
+              setErrorMessage(msg.message || `Import ${msg.status}`)
               setStatus("error")
             }
           } catch { }
@@ -95,7 +97,7 @@ export default function FileUpload() {
               </div>
               <p className="text-xs text-muted-foreground">Maximum 500MB • CSV format</p>
             </div>
-            <input type="file" accept=".csv" className="hidden" onChange={handleFileChange} />
+            <input type="file" accept=".csv,.gz,.zst,.zip" className="hidden" onChange={handleFileChange} />
           </label>
         )}
 